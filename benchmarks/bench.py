@@ -0,0 +1,337 @@
+"""
+benchmark suite for the match report pipeline on synthetic Statsbomb style data
+
+times and memory profiles each public function and the full per match report
+across data scales, stores results as json and compares them against a baseline
+
+    python benchmarks/bench.py --scales match,matchweek --save
+    python benchmarks/bench.py --baseline benchmarks/results/baseline.json
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from match_report import (batch, binning, data_loader, density, kpis, network, pass_net, percentiles,
+                          playing_time, possessions, render, synthetic, utils)
+
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+RESULTS_DIR = os.path.join(HERE, 'results')
+DATA_DIR = os.path.join(HERE, '.data')
+
+# name -> synthetic_season arguments
+SCALES = {
+    'match': dict(n_leagues=1, teams_per_league=2, rounds=1),
+    'matchweek': dict(n_leagues=1, teams_per_league=20, rounds=1),
+    'season': dict(n_leagues=1, teams_per_league=20, rounds=None),
+    'multi-league': dict(n_leagues=4, teams_per_league=20, rounds=None),
+}
+
+
+def scale_events(scale):
+    # synthetic events for a scale (cached on disk, generation is slow for seasons)
+    path = os.path.join(DATA_DIR, scale + '.pkl')
+    if os.path.exists(path):
+        return pd.read_pickle(path)
+    os.makedirs(DATA_DIR, exist_ok=True)
+    events = synthetic.synthetic_season(**SCALES[scale])
+    events.to_pickle(path)
+    return events
+
+
+class Context:
+    # inputs shared by the benchmark cases of a scale
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.all_events = data_loader.event_selector(raw)
+        self.teams = list(self.all_events['team_name'].dropna().unique())
+        self.positions = {name: self.all_events[self.all_events['player_position_name'].isin(p)]
+                          for name, p in kpis.POSITION_GROUPS.items()}
+        self.pressures = self.all_events[self.all_events['event_type_name']=='Pressure']
+        self.passes = self.all_events[(self.all_events['event_type_name']=='Pass')&
+                                      (self.all_events['outcome_name'].isnull())]
+        self.matches = [m for _, m in raw.groupby('match_id', sort=False)]
+        self.stints = playing_time.stints(raw)
+        self.ordered = possessions.sort_events(self.all_events)
+        self.possessions = possessions.possession_table(self.ordered)
+
+        # first team of each match: lineup, events and completed passes
+        self.networks = []
+        for m in self.matches:
+            team = m['team_name'].dropna().iloc[0]
+            lineup = batch.starting_lineup(m, team)
+            events = data_loader.event_selector(m)
+            events = events[(events['possession_team_name']==team)&
+                            (events['player_name'].isin(lineup['formation_player_name']))]
+            passes = events[(events['event_type_name']=='Pass')&(events['outcome_name'].isnull())]
+            self.networks.append((passes, events, lineup))
+
+
+def _pitch(ctx):
+    fig, ax = utils.statsbomb_pitch_plot(12, 8)
+    plt.close(fig)
+
+
+def _cumulative(ctx):
+    utils.cumulative_event_line(ctx.pressures, (5,5), (8,4), 'r')
+    plt.close('all')
+
+
+def _hist2d(ctx):
+    fig, ax = utils.statsbomb_pitch_plot(12, 8)
+    utils.event_2dhist(ctx.pressures, (5,5), 'Reds')
+    plt.close('all')
+
+
+def _pass_network_combinations(ctx):
+    for passes, events, lineup in ctx.networks:
+        pass_net.pass_network_combinations_df(passes, events, lineup, 'cool')
+
+
+def _pass_combination_counts(ctx):
+    for passes, events, lineup in ctx.networks:
+        pass_net.pass_combination_counts(passes, lineup)
+
+
+def _pass_combination_xgc(ctx):
+    for passes, events, lineup in ctx.networks:
+        pass_net.pass_combination_xgc(events, lineup)
+
+
+def _pass_network_timeline(ctx):
+    for passes, events, lineup in ctx.networks:
+        pass_net.pass_network_timeline(passes, events, lineup, 'cool')
+
+
+def _pass_network(ctx):
+    for passes, events, lineup in ctx.networks:
+        utils.pass_network(events)
+
+
+def _pipeline(ctx):
+    for m in ctx.matches:
+        batch.match_tables(m)
+
+
+# name -> function of a Context
+# not benchmarked: functions writing files (render.render_batch, percentiles.build_store,
+# possessions.load_table, the parquet and result caches) and the streaming classes
+# (live.LiveKpis, chunked), which reduce with the kpi functions timed here
+CASES = {
+    'data_loader.event_selector': lambda ctx: data_loader.event_selector(ctx.raw),
+    'data_loader.event_selector[Pass]': lambda ctx: data_loader.event_selector(ctx.raw, 'Pass'),
+    'kpis.team_kpi': lambda ctx: kpis.team_kpi(ctx.all_events, ctx.teams),
+    'kpis.fwds_kpis': lambda ctx: kpis.fwds_kpis(ctx.positions['fwds']),
+    'kpis.wb_kpis': lambda ctx: kpis.wb_kpis(ctx.positions['wb']),
+    'kpis.cm_kpis': lambda ctx: kpis.cm_kpis(ctx.positions['cm']),
+    'kpis.cb_kpis': lambda ctx: kpis.cb_kpis(ctx.positions['cb']),
+    'pass_net.pass_xgc': lambda ctx: pass_net.pass_xgc(ctx.all_events),
+    'pass_net.pass_network_combinations_df': _pass_network_combinations,
+    'kpis.season_kpis': lambda ctx: kpis.season_kpis(ctx.all_events),
+    'pass_net.pass_combination_counts': _pass_combination_counts,
+    'pass_net.pass_combination_xgc': _pass_combination_xgc,
+    'pass_net.pass_network_timeline': _pass_network_timeline,
+    'utils.pass_network': _pass_network,
+    'utils.pass_network_windows': lambda ctx: utils.pass_network_windows(ctx.all_events),
+    'binning.zone_counts': lambda ctx: binning.zone_counts(ctx.pressures, (12,8), binning.PITCH_RANGE),
+    'binning.zone_counts_by': lambda ctx: binning.zone_counts_by(ctx.all_events, ['match_id','player_name']),
+    'binning.zone_stats': lambda ctx: binning.zone_stats(ctx.all_events, by=['match_id','team_name']),
+    'density.kde': lambda ctx: density.kde(ctx.pressures),
+    'density.kde_by': lambda ctx: density.kde_by(ctx.passes, ['match_id','player_name']),
+    'network.network_metrics': lambda ctx: network.network_metrics(ctx.passes, ['match_id','team_name']),
+    'percentiles.estimate_minutes': lambda ctx: percentiles.estimate_minutes(ctx.all_events),
+    'percentiles.per90_tables': lambda ctx: percentiles.per90_tables(ctx.raw, stint_table=ctx.stints),
+    'playing_time.stints': lambda ctx: playing_time.stints(ctx.raw),
+    'playing_time.position_minutes': lambda ctx: playing_time.position_minutes(ctx.stints),
+    'playing_time.stint_kpis': lambda ctx: playing_time.stint_kpis(ctx.all_events, ctx.stints),
+    'possessions.possession_table': lambda ctx: possessions.possession_table(ctx.ordered),
+    'possessions.xg_chain': lambda ctx: possessions.xg_chain(ctx.ordered, ctx.possessions,
+                                                             ['match_id','player_name']),
+    'possessions.possession_kpis': lambda ctx: possessions.possession_kpis(ctx.possessions,
+                                                                           ['match_id','team_name']),
+    'utils.statsbomb_pitch_plot': _pitch,
+    'utils.cumulative_event_line': _cumulative,
+    'utils.event_2dhist': _hist2d,
+    'pipeline.match_tables': _pipeline,
+}
+
+
+def clear_caches():
+    # memoised results of earlier runs, so each run times the work and not a cache hit
+    binning._CACHE.clear()
+    density.grid.cache_clear()
+    density.kernel.cache_clear()
+    render.pitch_image.cache_clear()
+
+
+def measure(func, ctx, repeat):
+    """
+    time and memory profile one case, module caches are cleared before every run
+
+    Out
+    -------
+    result : dict of min/median seconds over repeat runs and peak traced memory (MB)
+
+    """
+
+    # memory on a separate run, tracemalloc slows the timed runs down
+    clear_caches()
+    gc.collect()
+    tracemalloc.start()
+    func(ctx)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    times = []
+    for _ in range(repeat):
+        clear_caches()
+        gc.collect()
+        start = time.perf_counter()
+        func(ctx)
+        times.append(time.perf_counter() - start)
+
+    return {'seconds_min': min(times),
+            'seconds_median': float(np.median(times)),
+            'peak_mb': peak/1e6}
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=HERE,
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return 'unknown'
+
+
+def run(scales, cases=None, repeat=3, progress=True):
+    """
+    run the benchmark cases for each scale
+
+    Arg
+    ------
+    scales : list of SCALES keys
+    cases : list of substrings to select cases (None runs all)
+    repeat : int timed runs per case
+
+    Out
+    -------
+    report : dict of meta data and results[scale][case]
+
+    """
+
+    report = {
+        'meta': {'commit': git_commit(),
+                 'date': time.strftime('%Y-%m-%d %H:%M:%S'),
+                 'python': platform.python_version(),
+                 'pandas': pd.__version__,
+                 'numpy': np.__version__,
+                 'machine': platform.machine(),
+                 'repeat': repeat},
+        'results': {},
+    }
+
+    for scale in scales:
+        raw = scale_events(scale)
+        ctx = Context(raw)
+        report['results'][scale] = {'_events': len(raw), '_matches': len(ctx.matches)}
+        for name, func in CASES.items():
+            if cases and not any(c in name for c in cases):
+                continue
+            r = measure(func, ctx, repeat)
+            report['results'][scale][name] = r
+            if progress:
+                print('%-12s %-42s %9.4fs %9.1fMB' % (scale, name, r['seconds_min'], r['peak_mb']))
+
+    return report
+
+
+def compare(report, baseline, threshold=1.2):
+    """
+    compare results against a baseline report
+
+    Arg
+    ------
+    report, baseline : dicts from run
+    threshold : float time ratio above which a case counts as a regression
+
+    Out
+    -------
+    df : pandas df of baseline/current times and memory with ratios and a regression flag
+
+    """
+
+    rows = []
+    for scale, cases in report['results'].items():
+        for name, r in cases.items():
+            if name.startswith('_'):
+                continue
+            b = baseline['results'].get(scale, {}).get(name)
+            if b is None:
+                continue
+            rows.append({'scale': scale, 'case': name,
+                         'base_s': b['seconds_min'], 'now_s': r['seconds_min'],
+                         'time_ratio': r['seconds_min']/b['seconds_min'] if b['seconds_min'] > 0 else np.nan,
+                         'base_mb': b['peak_mb'], 'now_mb': r['peak_mb'],
+                         'mem_ratio': r['peak_mb']/b['peak_mb'] if b['peak_mb'] > 0 else np.nan})
+
+    df = pd.DataFrame(rows, columns=['scale','case','base_s','now_s','time_ratio',
+                                     'base_mb','now_mb','mem_ratio'])
+    df['regression'] = (df['time_ratio'] > threshold) | (df['mem_ratio'] > threshold)
+
+    return df
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='match report benchmarks')
+    parser.add_argument('--scales', default='match,matchweek',
+                        help='comma separated scales: %s' % ','.join(SCALES))
+    parser.add_argument('--cases', default=None, help='comma separated substrings of case names')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--save', nargs='?', const='', default=None,
+                        help='save results to benchmarks/results/<name>.json (default name: commit)')
+    parser.add_argument('--baseline', default=None, help='results json to compare against')
+    parser.add_argument('--threshold', type=float, default=1.2,
+                        help='time/memory ratio counted as a regression')
+    parser.add_argument('--fail-on-regression', action='store_true')
+    args = parser.parse_args(argv)
+
+    cases = args.cases.split(',') if args.cases else None
+    report = run(args.scales.split(','), cases, args.repeat)
+
+    if args.save is not None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        path = os.path.join(RESULTS_DIR, (args.save or report['meta']['commit']) + '.json')
+        with open(path, 'w') as f:
+            json.dump(report, f, indent=1)
+        print('results saved to %s' % path)
+
+    if args.baseline is not None:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        df = compare(report, baseline, args.threshold)
+        print('\ncompared with %s (%s)' % (baseline['meta']['commit'], baseline['meta']['date']))
+        with pd.option_context('display.width', 200, 'display.max_rows', None):
+            print(df.round(4).to_string(index=False))
+        if args.fail_on_regression and df['regression'].any():
+            return 1
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
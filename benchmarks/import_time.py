@@ -0,0 +1,120 @@
+"""
+import time benchmark for the compute modules
+
+each module is imported in a fresh interpreter, the time on top of importing pandas/numpy
+is reported and the run fails if a compute module pulls in a plotting library
+(or takes longer than --max-ms on top of pandas)
+
+    python benchmarks/import_time.py
+    python benchmarks/import_time.py --save --baseline benchmarks/results/imports-<commit>.json
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+RESULTS_DIR = os.path.join(HERE, 'results')
+
+# modules that must import with only pandas/numpy
+COMPUTE_MODULES = ['match_report.data_loader', 'match_report.match_events', 'match_report.kpis',
+                   'match_report.pass_net', 'match_report.binning', 'match_report.live',
+                   'match_report.result_cache', 'match_report.batch', 'match_report.utils',
+                   'match_report.profiling', 'match_report.density', 'match_report.percentiles',
+                   'match_report.playing_time', 'match_report.service',
+                   'match_report.possessions']
+
+# plotting modules, imported for reference
+PLOT_MODULES = ['match_report.render']
+
+HEAVY = ['matplotlib', 'seaborn', 'scipy', 'pyarrow']
+
+_SCRIPT = '''
+import json, sys, time
+import numpy, pandas
+before = set(sys.modules)
+start = time.perf_counter()
+import %s
+print(json.dumps({'seconds': time.perf_counter() - start,
+                  'heavy': [m for m in %r if m in sys.modules and m not in before]}))
+'''
+
+
+def import_time(module, repeat=5):
+    """
+    time to import a module in a fresh interpreter, after pandas and numpy
+
+    Out
+    -------
+    result : dict of min/median seconds and the heavy modules it imported
+             (beyond those pandas already imports)
+
+    """
+
+    times, heavy = [], []
+    for _ in range(repeat):
+        out = subprocess.check_output([sys.executable, '-c', _SCRIPT % (module, HEAVY)], cwd=ROOT)
+        r = json.loads(out.decode().strip().splitlines()[-1])
+        times.append(r['seconds'])
+        heavy = r['heavy']
+
+    return {'seconds_min': min(times), 'seconds_median': float(np.median(times)), 'heavy': heavy}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='match report import times')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--max-ms', type=float, default=200.0,
+                        help='import time allowed on top of pandas/numpy for compute modules')
+    parser.add_argument('--save', action='store_true', help='save to benchmarks/results/imports-<commit>.json')
+    parser.add_argument('--baseline', default=None, help='results json to compare against')
+    parser.add_argument('--threshold', type=float, default=1.5, help='time ratio counted as a regression')
+    args = parser.parse_args(argv)
+
+    results = {}
+    failed = []
+    for module in COMPUTE_MODULES + PLOT_MODULES:
+        r = results[module] = import_time(module, args.repeat)
+        flag = ''
+        if module in COMPUTE_MODULES:
+            if r['heavy']:
+                flag = 'FAIL imports %s' % ','.join(r['heavy'])
+            elif r['seconds_min']*1000 > args.max_ms:
+                flag = 'FAIL over %.0fms' % args.max_ms
+        if flag:
+            failed.append(module)
+        print('%-28s %8.1fms  %s' % (module, r['seconds_min']*1000, flag))
+
+    if args.baseline is not None:
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+        for module, r in results.items():
+            b = baseline.get(module)
+            if b is None or b['seconds_min'] <= 0:
+                continue
+            ratio = r['seconds_min']/b['seconds_min']
+            # ignore noise on very fast imports
+            regressed = ratio > args.threshold and r['seconds_min'] - b['seconds_min'] > 0.01
+            if regressed and module in COMPUTE_MODULES:
+                failed.append(module)
+            print('%-28s %8.2fx baseline%s' % (module, ratio, '  REGRESSION' if regressed else ''))
+
+    if args.save:
+        sys.path.insert(0, HERE)
+        from bench import git_commit
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        path = os.path.join(RESULTS_DIR, 'imports-%s.json' % git_commit())
+        with open(path, 'w') as f:
+            json.dump({'meta': {'commit': git_commit(), 'python': sys.version.split()[0]},
+                       'results': results}, f, indent=1)
+        print('results saved to %s' % path)
+
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,6 @@
+import sys
+
+from match_report.batch import main
+
+
+sys.exit(main())
@@ -0,0 +1,321 @@
+import argparse
+import contextlib
+import glob
+import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+from match_report import data_loader
+from match_report import kpis
+from match_report import pass_net
+from match_report import profiling
+from match_report.result_cache import ResultCache, Source
+
+
+# positional kpi functions (positions in kpis.POSITION_GROUPS)
+POSITION_KPIS = {
+    'fwds': kpis.fwds_kpis,
+    'wb': kpis.wb_kpis,
+    'cm': kpis.cm_kpis,
+    'cb': kpis.cb_kpis,
+}
+
+
+def find_match_files(source):
+    """
+    list match csv files from a directory or a glob pattern
+
+    Arg
+    ------
+    source : str (directory or glob) or list of these
+
+    Out
+    -------
+    files : sorted list of paths
+
+    """
+
+    if isinstance(source, (list, tuple)):
+        files = []
+        for s in source:
+            files.extend(find_match_files(s))
+        return sorted(set(files))
+
+    if os.path.isdir(source):
+        return sorted(glob.glob(os.path.join(source, '*.csv')))
+
+    return sorted(glob.glob(source))
+
+
+def starting_lineup(raw_csv, team):
+    # first 11 formation rows for the team (starting XI)
+    lineup = raw_csv[raw_csv['team_name']==team][['formation_player_name',
+                                                  'formation_position_name']].dropna()
+    return lineup[:11].reset_index(drop=True)
+
+
+@profiling.profiled
+def match_tables(raw_csv, color_scale='cool', cache=None):
+    """
+    compute the report tables for a single match
+
+    Arg
+    ------
+    raw_csv : pandas df of raw statsbomb events for one match
+    color_scale : matplotlib cmap (or name) for the pass network colours
+    cache : ResultCache, reuse event selection, kpi and pass network results of earlier runs
+
+    Out
+    -------
+    tables : dict of table name -> pandas df
+
+    """
+
+    def call(func, *args):
+        if cache is None:
+            return func(*args)
+        return cache.call(func, *args)
+
+    all_events = call(data_loader.event_selector, raw_csv)
+    teams = list(all_events['team_name'].dropna().unique())
+
+    tables = {}
+
+    # team kpis (one row per team)
+    tables['team_kpis'] = call(kpis.team_kpi, all_events, teams).transpose()
+
+    # positional kpis (one row per player)
+    for name, kpi_func in POSITION_KPIS.items():
+        positions = kpis.POSITION_GROUPS[name]
+        pos_events = all_events[all_events['player_position_name'].isin(positions)]
+        if len(pos_events) > 0:
+            tables[name + '_kpis'] = call(kpi_func, pos_events)
+
+    # pass networks for each team (from the deduplicated events)
+    networks = []
+    for team in teams:
+        lineup = starting_lineup(raw_csv, team)
+        team_events = all_events[(all_events['possession_team_name']==team)&
+                                 (all_events['player_name'].isin(lineup['formation_player_name']))]
+        passes = team_events[(team_events['event_type_name']=='Pass')&
+                             (team_events['outcome_name'].isnull())]
+        if len(passes) == 0:
+            continue
+        pn = call(pass_net.pass_network_combinations_df, passes, team_events, lineup, color_scale)
+        pn.insert(0, 'team_name', team)
+        networks.append(pn)
+    if networks:
+        tables['pass_network'] = pd.concat(networks).reset_index(drop=True)
+
+    return tables
+
+
+def process_match(path, color_scale='cool', cache_dir=None, result_dir=None, profile=None):
+    """
+    load and compute the report tables for one match file
+    errors are caught and returned so one bad match does not stop a batch
+
+    Arg
+    ------
+    path : str path to match csv
+    color_scale : matplotlib cmap (or name) for the pass network colours
+    cache_dir : str, load via the typed parquet cache in this directory (None reads the csv)
+    result_dir : str, ResultCache directory, an unchanged match file is not reloaded or recomputed
+    profile : None, 'time' to record the profiled calls (profiling.Profiler) or 'memory' to
+              record their peak memory as well
+
+    Out
+    -------
+    result : dict with match, tables, rows, seconds, error (None if ok) and profile
+             (list of call records, empty when not profiling)
+
+    """
+
+    start = time.perf_counter()
+    result = {'match': os.path.splitext(os.path.basename(path))[0],
+              'path': path, 'tables': {}, 'rows': 0, 'error': None, 'profile': []}
+    prof = profiling.Profiler(memory=profile == 'memory')
+    try:
+        with (prof if profile is not None else contextlib.nullcontext()), prof.match(result['match']):
+            if cache_dir is None:
+                load = _read_csv
+            else:
+                load = lambda p: data_loader.load_events(p, cache_dir=cache_dir)
+            if result_dir is None:
+                raw_csv = load(path)
+                result['rows'] = len(raw_csv)
+                result['tables'] = match_tables(raw_csv, color_scale)
+            else:
+                cache = ResultCache(result_dir)
+                rows, tables = cache.call(_cached_match, Source(path, load), color_scale, cache)
+                result['rows'] = rows
+                result['tables'] = tables
+    except Exception:
+        result['error'] = traceback.format_exc()
+    result['profile'] = prof.records
+    result['seconds'] = time.perf_counter() - start
+
+    return result
+
+
+def _read_csv(path):
+    # raw match csv, recorded as a stage when profiling
+    with profiling.stage('read_csv') as s:
+        raw_csv = pd.read_csv(path, low_memory=False)
+        s.rows_out = len(raw_csv)
+    return raw_csv
+
+
+def _cached_match(raw_csv, color_scale, cache):
+    # row count and tables of a match, whole result cached by process_match
+    return len(raw_csv), match_tables(raw_csv, color_scale, cache)
+
+
+def write_tables(results, out_dir):
+    """
+    write the tables of all matches to one csv per table, keyed by match
+
+    Arg
+    ------
+    results : list of process_match results
+    out_dir : str output directory
+
+    Out
+    -------
+    paths : dict of table name -> written path
+
+    """
+
+    os.makedirs(out_dir, exist_ok=True)
+
+    combined = {}
+    for r in results:
+        for name, table in r['tables'].items():
+            # keep named index levels (player, team) as columns, drop a plain row index
+            t = table.reset_index(drop=table.index.names == [None])
+            t.insert(0, 'match', r['match'])
+            combined.setdefault(name, []).append(t)
+
+    paths = {}
+    for name, tables in combined.items():
+        paths[name] = os.path.join(out_dir, name + '.csv')
+        pd.concat(tables, ignore_index=True).to_csv(paths[name], index=False)
+
+    failures = pd.DataFrame([{'match': r['match'], 'path': r['path'], 'error': r['error']}
+                             for r in results if r['error'] is not None],
+                            columns=['match','path','error'])
+    paths['failures'] = os.path.join(out_dir, 'failures.csv')
+    failures.to_csv(paths['failures'], index=False)
+
+    return paths
+
+
+def run_batch(source, out_dir, workers=None, color_scale='cool', cache_dir=None, progress=True,
+              result_dir=None, profile_path=None, profile_memory=False):
+    """
+    compute report tables for many matches in parallel and write them to out_dir
+
+    Arg
+    ------
+    source : directory, glob pattern or list of these
+    out_dir : str output directory
+    workers : int number of worker processes (None uses all cpus)
+    color_scale : matplotlib cmap name for the pass network colours
+    cache_dir : str, parquet cache directory (None reads the csvs directly)
+    progress : bool print a line per finished match
+    result_dir : str, ResultCache directory so reruns skip unchanged matches (None computes all)
+    profile_path : str, write per call timings of every match to this json (see profiling.save),
+                   plus a .folded flame summary next to it (None does not profile)
+    profile_memory : bool, record peak memory per call as well (slower)
+
+    Out
+    -------
+    summary : dict of counts, timings and output paths
+
+    """
+
+    files = find_match_files(source)
+    start = time.perf_counter()
+
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        profile = None if profile_path is None else 'memory' if profile_memory else 'time'
+        futures = {pool.submit(process_match, f, color_scale, cache_dir, result_dir, profile): f
+                   for f in files}
+        for future in as_completed(futures):
+            try:
+                r = future.result()
+            except Exception:
+                # worker died (e.g. out of memory), isolate to this match
+                f = futures[future]
+                r = {'match': os.path.splitext(os.path.basename(f))[0], 'path': f,
+                     'tables': {}, 'rows': 0, 'seconds': 0.0,
+                     'error': traceback.format_exc(), 'profile': []}
+            results.append(r)
+            if progress:
+                status = 'ok' if r['error'] is None else 'FAILED'
+                print('[%d/%d] %s %s (%.2fs)' % (len(results), len(files),
+                                                 r['match'], status, r['seconds']))
+
+    results.sort(key=lambda r: r['path'])
+    paths = write_tables(results, out_dir)
+    if profile_path is not None:
+        records = [rec for r in results for rec in r['profile']]
+        paths['profile'] = profiling.save(records, profile_path)
+        paths['flame'] = profiling.save(records, os.path.splitext(profile_path)[0] + '.folded')
+    elapsed = time.perf_counter() - start
+
+    ok = [r for r in results if r['error'] is None]
+    rows = sum(r['rows'] for r in ok)
+    summary = {
+        'matches': len(results),
+        'succeeded': len(ok),
+        'failed': len(results) - len(ok),
+        'events': rows,
+        'seconds': elapsed,
+        'matches_per_sec': len(results)/elapsed if elapsed > 0 else 0.0,
+        'events_per_sec': rows/elapsed if elapsed > 0 else 0.0,
+        'outputs': paths,
+    }
+
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='match_report',
+        description='Compute team kpis, positional kpis and pass networks for a batch of Statsbomb match csvs')
+    parser.add_argument('source', nargs='+', help='directory or glob of match csv files')
+    parser.add_argument('-o', '--out', default='match_report_output', help='output directory')
+    parser.add_argument('-w', '--workers', type=int, default=None, help='number of worker processes')
+    parser.add_argument('--cmap', default='cool', help='matplotlib cmap for pass network colours')
+    parser.add_argument('--cache', default=None, help='parquet cache directory for the loaded matches')
+    parser.add_argument('--results', default=None,
+                        help='result cache directory, unchanged matches are not recomputed')
+    parser.add_argument('--clear-results', action='store_true', help='empty the result cache first')
+    parser.add_argument('--profile', default=None,
+                        help='write per function timings of every match to this json file')
+    parser.add_argument('--profile-memory', action='store_true',
+                        help='record peak memory per function as well (slower)')
+    parser.add_argument('-q', '--quiet', action='store_true', help='no per match progress')
+    args = parser.parse_args(argv)
+
+    if args.results is not None and args.clear_results:
+        ResultCache(args.results).clear()
+
+    summary = run_batch(args.source, args.out, workers=args.workers,
+                        color_scale=args.cmap, cache_dir=args.cache,
+                        progress=not args.quiet, result_dir=args.results,
+                        profile_path=args.profile, profile_memory=args.profile_memory)
+
+    print('%d matches (%d ok, %d failed) in %.1fs: %.2f matches/s, %.0f events/s'
+          % (summary['matches'], summary['succeeded'], summary['failed'],
+             summary['seconds'], summary['matches_per_sec'], summary['events_per_sec']))
+    print('tables written to %s' % args.out)
+    if args.profile is not None:
+        print('profile written to %s' % summary['outputs']['profile'])
+
+    return 1 if summary['failed'] else 0
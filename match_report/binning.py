@@ -0,0 +1,226 @@
+import hashlib
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from match_report.match_events import as_frame
+
+
+# statsbomb pitch ((x min, x max), (y min, y max))
+PITCH_RANGE = ((0, 120), (0, 80))
+
+# memoised zone counts, keyed on the binned coordinates and the grid
+_CACHE = OrderedDict()
+CACHE_SIZE = 256
+
+
+def bin_edges(x, y, bins, extent=None):
+    """
+    x and y bin edges of a grid
+    with extent=None and integer bins the edges span the data, as np.histogram2d
+
+    Arg
+    ------
+    x, y : arrays of coordinates
+    bins : (int,int) or (x edges, y edges)
+    extent : ((x0,x1),(y0,y1)) or None
+
+    Out
+    -------
+    xedges, yedges : np arrays
+
+    """
+
+    edges = []
+    for v, b, r in zip((x, y), bins, (None, None) if extent is None else extent):
+        if np.ndim(b) == 1:
+            edges.append(np.asarray(b, dtype=float))
+        else:
+            edges.append(np.histogram_bin_edges(v, bins=int(b), range=r))
+    return edges[0], edges[1]
+
+
+def cell_index(x, y, xedges, yedges):
+    """
+    flat grid cell (x bin * ny + y bin) of each point, -1 outside the grid
+    the last bin includes its right edge, as np.histogram2d
+
+    """
+
+    nx, ny = len(xedges)-1, len(yedges)-1
+    ix = np.searchsorted(xedges, x, side='right') - 1
+    iy = np.searchsorted(yedges, y, side='right') - 1
+    # points on the last edge belong to the last bin
+    ix[x == xedges[-1]] = nx - 1
+    iy[y == yedges[-1]] = ny - 1
+    valid = (ix >= 0) & (ix < nx) & (iy >= 0) & (iy < ny)
+    return np.where(valid, ix*ny + iy, -1)
+
+
+def _coords(events, columns):
+    # float coordinates without missing locations
+    df = as_frame(events)
+    x = np.asarray(df[columns[0]], dtype=float)
+    y = np.asarray(df[columns[1]], dtype=float)
+    valid = ~(np.isnan(x) | np.isnan(y))
+    return x, y, valid
+
+
+def group_codes(df, by):
+    """
+    group code of each row (-1 for missing keys) and the sorted group keys
+
+    Arg
+    ------
+    df : pandas df
+    by : column name or list of column names, None for one group
+
+    Out
+    -------
+    codes : np array of int64
+    groups : pandas index (MultiIndex for several columns), None when by is None
+
+    """
+
+    if by is None:
+        return np.zeros(len(df), dtype=np.int64), None
+    keys = [by] if isinstance(by, str) else list(by)
+    if len(keys) == 1:
+        codes, groups = pd.factorize(df[keys[0]], sort=True)
+        return codes, pd.Index(groups, name=keys[0])
+    # a row missing any key is in no group, as for a single column
+    ok = df[keys].notna().all(axis=1).to_numpy()
+    mi = pd.MultiIndex.from_frame(df.loc[ok, keys].astype(object))
+    found, groups = pd.factorize(mi, sort=True)
+    codes = np.full(len(df), -1, dtype=np.int64)
+    codes[ok] = found
+    return codes, pd.MultiIndex.from_tuples(groups, names=keys)
+
+
+def _key(*arrays, **params):
+    h = hashlib.blake2b(digest_size=16)
+    for a in arrays:
+        h.update(np.ascontiguousarray(a).tobytes())
+    return h.hexdigest(), repr(sorted(params.items()))
+
+
+def zone_counts(events, bins=(5,5), extent=None, columns=('location_x','location_y')):
+    """
+    event counts per zone of a grid, memoised per (events, grid)
+
+    Arg
+    ------
+    events : pandas df (or MatchEvents)
+    bins : (int,int) or (x edges, y edges)
+    extent : ((x0,x1),(y0,y1)), None spans the data (as np.histogram2d)
+    columns : coordinate columns
+
+    Out
+    -------
+    counts : np array (nx, ny), read only
+    xedges, yedges : np arrays
+
+    """
+
+    x, y, valid = _coords(events, columns)
+    x, y = x[valid], y[valid]
+    key = _key(x, y, bins=repr(bins), extent=extent)
+    if key in _CACHE:
+        _CACHE.move_to_end(key)
+        return _CACHE[key]
+
+    xedges, yedges = bin_edges(x, y, bins, extent)
+    idx = cell_index(x, y, xedges, yedges)
+    nx, ny = len(xedges)-1, len(yedges)-1
+    counts = np.bincount(idx[idx >= 0], minlength=nx*ny).reshape(nx, ny).astype(float)
+    counts.setflags(write=False)
+
+    _CACHE[key] = (counts, xedges, yedges)
+    if len(_CACHE) > CACHE_SIZE:
+        _CACHE.popitem(last=False)
+
+    return counts, xedges, yedges
+
+
+def zone_counts_by(events, by, bins=(5,5), extent=PITCH_RANGE, columns=('location_x','location_y')):
+    """
+    zone counts for many subsets (e.g. per player, team or half) in a single bincount
+
+    Arg
+    ------
+    events : pandas df (or MatchEvents)
+    by : column name or list of column names to split by
+    bins : (int,int) or (x edges, y edges)
+    extent : ((x0,x1),(y0,y1)) shared by every subset (None spans all the data)
+    columns : coordinate columns
+
+    Out
+    -------
+    counts : np array (groups, nx, ny)
+    groups : pandas index of the group keys
+    xedges, yedges : np arrays
+
+    """
+
+    df = as_frame(events)
+    x, y, valid = _coords(df, columns)
+    xedges, yedges = bin_edges(x[valid], y[valid], bins, extent)
+    nx, ny = len(xedges)-1, len(yedges)-1
+
+    codes, groups = group_codes(df, by)
+
+    idx = cell_index(x, y, xedges, yedges)
+    ok = valid & (idx >= 0) & (codes >= 0)
+    flat = codes[ok]*(nx*ny) + idx[ok]
+    counts = np.bincount(flat, minlength=len(groups)*nx*ny).reshape(len(groups), nx, ny)
+
+    return counts.astype(float), groups, xedges, yedges
+
+
+def zone_stats(events, bins=(5,5), by=None, extent=PITCH_RANGE, columns=('location_x','location_y')):
+    """
+    tabular zone counts, one row per (group,) zone
+
+    Arg
+    ------
+    events : pandas df (or MatchEvents)
+    bins : (int,int) or (x edges, y edges)
+    by : column name(s) to split by, None for all events
+    extent : ((x0,x1),(y0,y1))
+    columns : coordinate columns
+
+    Out
+    -------
+    df : pandas df of group keys, zone_x, zone_y, x0, x1, y0, y1, count and share
+         (fraction of the group's events in the zone)
+
+    """
+
+    if by is None:
+        counts, xedges, yedges = zone_counts(events, bins, extent, columns)
+        counts = counts[np.newaxis]
+        groups = None
+    else:
+        counts, groups, xedges, yedges = zone_counts_by(events, by, bins, extent, columns)
+
+    g, nx, ny = counts.shape
+    gi, ix, iy = np.meshgrid(np.arange(g), np.arange(nx), np.arange(ny), indexing='ij')
+    totals = counts.sum(axis=(1,2))
+
+    df = pd.DataFrame({'zone_x': ix.ravel(), 'zone_y': iy.ravel(),
+                       'x0': xedges[ix.ravel()], 'x1': xedges[ix.ravel()+1],
+                       'y0': yedges[iy.ravel()], 'y1': yedges[iy.ravel()+1],
+                       'count': counts.ravel()})
+    with np.errstate(invalid='ignore', divide='ignore'):
+        df['share'] = counts.ravel()/np.repeat(totals, nx*ny)
+
+    if groups is not None:
+        keys = groups.take(gi.ravel())
+        if isinstance(keys, pd.MultiIndex):
+            for i, name in enumerate(keys.names):
+                df.insert(i, name, keys.get_level_values(i))
+        else:
+            df.insert(0, keys.name, keys)
+
+    return df
@@ -0,0 +1,226 @@
+import numpy as np
+import pandas as pd
+
+from match_report import kpis
+from match_report.data_loader import ANALYSIS_COLUMNS
+from match_report.match_events import as_frame, duplicate_key_hash
+
+
+# partial sums of this many chunks are merged together
+COMBINE_EVERY = 16
+
+
+class DuplicateFilter:
+    """
+    drops duplicate events (data_loader.DUPLICATE_KEY) across a stream of chunks
+    only the 64-bit key hashes of the rows kept are remembered
+
+    Arg
+    ------
+    scope : column the key is unique within ('match_id', duplicates are per match as with
+            event_selector on each match) or None for one key space over the whole stream
+    contiguous : bool, the events of a scope value are together in the stream (true for
+                 exports ordered by match), hashes are forgotten once its events have passed,
+                 so memory is bounded by the matches in a chunk
+
+    """
+
+    def __init__(self, scope='match_id', contiguous=True):
+        self.scope = scope
+        self.contiguous = contiguous
+        self._seen = {}
+        self.dropped = 0
+
+    def __call__(self, chunk):
+        """
+        rows of a chunk not seen before (in this or an earlier chunk)
+
+        Arg
+        ------
+        chunk : pandas df of events
+
+        Out
+        -------
+        df : pandas df
+
+        """
+
+        h = duplicate_key_hash(chunk)
+        if self.scope is None:
+            scopes = np.zeros(len(chunk), dtype=np.int64)
+            values = [None]
+        else:
+            scopes, values = pd.factorize(chunk[self.scope], use_na_sentinel=False)
+
+        # first occurrence in the chunk
+        keep = ~pd.DataFrame({'s': scopes, 'h': h}).duplicated().to_numpy()
+
+        seen = {}
+        for code, value in enumerate(values):
+            rows = scopes == code
+            old = self._seen.get(value, np.empty(0, dtype=np.uint64))
+            keep[rows] &= ~np.isin(h[rows], old)
+            seen[value] = np.union1d(old, h[rows & keep])
+
+        if self.contiguous:
+            self._seen = seen
+        else:
+            self._seen.update(seen)
+
+        self.dropped += int((~keep).sum())
+        return chunk[keep]
+
+
+def read_chunks(path, chunksize=250000, columns=None):
+    """
+    read a csv or parquet event export in chunks
+
+    Arg
+    ------
+    path : str
+    chunksize : int rows per chunk
+    columns : list of columns, or a key of ANALYSIS_COLUMNS (None reads all)
+
+    Out
+    -------
+    generator of pandas dfs
+
+    """
+
+    if isinstance(columns, str):
+        columns = ANALYSIS_COLUMNS[columns]
+
+    if path.endswith('.parquet'):
+        import pyarrow.parquet as pq
+        f = pq.ParquetFile(path)
+        if columns is not None:
+            columns = [c for c in columns if c in f.schema_arrow.names]
+        for batch in f.iter_batches(batch_size=chunksize, columns=columns):
+            yield batch.to_pandas()
+        return
+
+    if columns is not None:
+        header = pd.read_csv(path, nrows=0).columns
+        columns = [c for c in columns if c in header]
+    for chunk in pd.read_csv(path, chunksize=chunksize, usecols=columns, low_memory=False):
+        yield chunk
+
+
+def read_events(path, chunksize=250000, columns=None, scope='match_id', contiguous=True):
+    # deduplicated event chunks of an export (see read_chunks and DuplicateFilter)
+    dedup = DuplicateFilter(scope, contiguous)
+    for chunk in read_chunks(path, chunksize, columns):
+        chunk = dedup(chunk)
+        if len(chunk):
+            yield chunk
+
+
+def _combine(parts):
+    # sum partial sums over their (shared) index
+    if len(parts) == 1:
+        return parts[0]
+    combined = pd.concat(parts)
+    return combined.groupby(level=list(range(combined.index.nlevels)), observed=True).sum()
+
+
+class ChunkedKpis:
+    """
+    kpi tables (as kpis.season_kpis) from events arriving in chunks
+    only the grouped partial sums are kept between chunks
+
+    Arg
+    ------
+    by : column(s) grouped ahead of player/team ('match_id', None for a single match)
+    teams : list of team names for the team table (None for every team)
+    kpi_sets : dict of name -> (metrics, by, finish), defaults to kpis.KPI_SETS
+
+    """
+
+    def __init__(self, by='match_id', teams=None, kpi_sets=None):
+        self.by = by
+        self.teams = teams
+        self.kpi_sets = kpis.KPI_SETS if kpi_sets is None else kpi_sets
+        self._parts = {name: [] for name in self.kpi_sets}
+
+    def update(self, events):
+        # add a chunk of (deduplicated) events
+        part = kpis.season_sums(events, self.by, self.teams, self.kpi_sets)
+        for name, sums in part.items():
+            parts = self._parts[name]
+            parts.append(sums)
+            # merged every few chunks, rather than aligned with the running total every chunk
+            if len(parts) >= COMBINE_EVERY:
+                self._parts[name] = [_combine(parts)]
+
+    def tables(self):
+        # kpi tables of every event so far (empty tables before any chunk)
+        if not any(self._parts.values()):
+            self.update(pd.DataFrame(columns=ANALYSIS_COLUMNS['kpis']))
+        sums = {name: _combine(parts) for name, parts in self._parts.items()}
+        return kpis.season_finish(sums, self.kpi_sets)
+
+
+class ChunkedPassCounts:
+    """
+    completed pass counts per (match, team, passer, recipient) from events arriving in chunks
+
+    Arg
+    ------
+    by : column(s) grouped ahead of passer/recipient
+
+    """
+
+    def __init__(self, by=('match_id','team_name')):
+        self.by = [by] if isinstance(by, str) else list(by)
+        self._parts = []
+
+    def update(self, events):
+        # add a chunk of (deduplicated) events
+        df = as_frame(events)
+        passes = df[(df['event_type_name']=='Pass')&(df['outcome_name'].isnull())]
+        part = passes.groupby(self.by+['player_name','pass_recipient_name'],
+                              observed=True).size()
+        self._parts.append(part)
+        if len(self._parts) >= COMBINE_EVERY:
+            self._parts = [_combine(self._parts)]
+
+    def table(self):
+        # long df of by columns, player_name, pass_recipient_name and pass_count
+        if not self._parts:
+            return pd.DataFrame(columns=self.by+['player_name','pass_recipient_name','pass_count'])
+        counts = _combine(self._parts).astype(np.int64).rename('pass_count')
+        return counts.reset_index()
+
+
+def season_tables(path, chunksize=250000, by='match_id', teams=None, scope='match_id',
+                  contiguous=True):
+    """
+    kpi tables and pass counts of an event export too large for memory, in one pass
+    over its chunks, duplicates are dropped across chunk edges
+
+    Arg
+    ------
+    path : str csv or parquet export
+    chunksize : int rows per chunk
+    by : column(s) grouped ahead of player/team
+    teams : list of team names for the team table (None for every team)
+    scope, contiguous : see DuplicateFilter
+
+    Out
+    -------
+    tables : dict of kpi set name -> pandas df (as kpis.season_kpis) plus 'pass_counts'
+
+    """
+
+    columns = list(dict.fromkeys(ANALYSIS_COLUMNS['kpis'] + ANALYSIS_COLUMNS['pass_net']))
+    kpi_acc = ChunkedKpis(by, teams)
+    pass_acc = ChunkedPassCounts(([] if by is None else [by] if isinstance(by, str) else list(by))
+                                 + ['team_name'])
+    for chunk in read_events(path, chunksize, columns, scope, contiguous):
+        kpi_acc.update(chunk)
+        pass_acc.update(chunk)
+
+    tables = kpi_acc.tables()
+    tables['pass_counts'] = pass_acc.table()
+
+    return tables
@@ -1,31 +1,168 @@
+import os
+
+import numpy as np
 import pandas as pd
 
+from match_report.match_events import DUPLICATE_KEY, MatchEvents, duplicate_key_codes
+from match_report.profiling import profiled
+
+
+# low cardinality string columns stored as categoricals
+CATEGORICAL_COLUMNS = ['event_type_name','type_name','team_name','possession_team_name',
+                       'player_name','player_position_name','pass_recipient_name',
+                       'play_pattern_name','outcome_name','pass_height_name',
+                       'formation_player_name','formation_position_name']
+
+# pitch coordinates stored as float32
+FLOAT32_COLUMNS = ['location_x','location_y','end_location_x','end_location_y']
+
+# columns needed by each analysis (for column projection on load)
+ANALYSIS_COLUMNS = {
+    'kpis': DUPLICATE_KEY + ['match_id','team_name','player_position_name','type_name',
+                             'outcome_name','end_location_x','end_location_y','xg',
+                             'pass_cross','aerial_won'],
+    'pass_net': DUPLICATE_KEY + ['match_id','team_name','possession_team_name','possession',
+                                 'period','minute','second','pass_recipient_name','outcome_name',
+                                 'xg','formation_player_name','formation_position_name'],
+    'pitch': DUPLICATE_KEY + ['match_id','team_name','possession_team_name','period',
+                              'outcome_name','end_location_x','end_location_y','duration'],
+    'possessions': DUPLICATE_KEY + ['match_id','team_name','possession_team_name','possession',
+                                    'outcome_name','xg','minute','second'],
+}
+
+
+@profiled
 def event_selector(raw_csv,event_type=None):
     """
-    select specified event from raw csv. drop duplicate data
-    
+    select specified event(s) from raw csv. drop duplicate data
+    duplicates are found from one int64 code of the DUPLICATE_KEY columns per row,
+    computed once per match for a MatchEvents
+
+    Arg
+    ------
+    raw_csv : pandas df or MatchEvents
+    event_type : str or list of str (several types in one pass), None for every event
+
+    Out
+    -------
+    events : pandas df, or a MatchEvents selection (no rows copied) for a MatchEvents
+
+    """
+
+    types = [event_type] if isinstance(event_type, str) else event_type
+
+    if isinstance(raw_csv, MatchEvents):
+        # event type rows from the precomputed index
+        if types is not None:
+            raw_csv = raw_csv.select(event_type_name=list(types))
+        return raw_csv.unique()
+
+    if types is None:
+        keep = ~pd.Series(duplicate_key_codes(raw_csv)).duplicated().to_numpy()
+        return raw_csv[keep]
+
+    events = raw_csv[raw_csv['event_type_name'].isin(list(types)).to_numpy()].reset_index()
+    # drop duplicates
+    keep = ~pd.Series(duplicate_key_codes(events)).duplicated().to_numpy()
+
+    return events[keep]
+
+
+@profiled
+def optimise_dtypes(raw_csv):
+    """
+    convert string columns to categoricals and coordinates to float32
+
+    Arg
+    ------
+    raw_csv : pandas df of raw events
+
+    Out
+    -------
+    df : pandas df with compact dtypes
+
+    """
+
+    df = raw_csv.copy()
+    for col in CATEGORICAL_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+    for col in FLOAT32_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype(np.float32)
+
+    return df
+
+
+def parquet_path(csv_path, cache_dir=None):
+    # cache file for a raw csv
+    name = os.path.splitext(os.path.basename(csv_path))[0] + '.parquet'
+    if cache_dir is None:
+        return os.path.join(os.path.dirname(csv_path), name)
+    return os.path.join(cache_dir, name)
+
+
+@profiled
+def csv_to_parquet(csv_path, cache_dir=None):
+    """
+    convert a raw statsbomb csv into a typed parquet cache file
+
+    Arg
+    ------
+    csv_path : str
+    cache_dir : str (defaults to the csv directory)
+
+    Out
+    -------
+    path : str path to the parquet file
+
+    """
+
+    path = parquet_path(csv_path, cache_dir)
+    if cache_dir is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+
+    df = optimise_dtypes(pd.read_csv(csv_path, low_memory=False))
+    # write to a temp file first so readers never see a partial cache
+    tmp = path + '.%d.tmp' % os.getpid()
+    df.to_parquet(tmp, index=False)
+    os.replace(tmp, path)
+
+    return path
+
+
+@profiled
+def load_events(path, columns=None, cache_dir=None):
+    """
+    load match events via the parquet cache, reading only the needed columns
+    csvs are converted to parquet on first load (or when the csv is newer than the cache)
+
     Arg
     ------
-    event_type : str
-    
+    path : str path to a raw csv or a parquet cache file
+    columns : list of columns, or a key of ANALYSIS_COLUMNS (None loads all)
+    cache_dir : str (defaults to the csv directory)
+
     Out
     -------
     events : pandas df
-    
-    """
-    
-    if event_type != None:
-        events =raw_csv[raw_csv['event_type_name']==event_type].reset_index()
-
-        # drop duplicates
-        events.drop_duplicates(subset=['timestamp','player_name',
-                                       'event_type_name','location_x', 'location_y'],
-                               inplace=True)
-    elif event_type == None:
-        events = raw_csv.drop_duplicates(subset=['timestamp',
-                                                 'player_name','event_type_name',
-                                                 'location_x', 'location_y'])
-    else:
-        raise KeyError('Enter properly')
-    
-    return events
\ No newline at end of file
+
+    """
+
+    if path.endswith('.csv'):
+        cache = parquet_path(path, cache_dir)
+        if (not os.path.exists(cache)
+                or os.path.getmtime(cache) < os.path.getmtime(path)):
+            cache = csv_to_parquet(path, cache_dir)
+        path = cache
+
+    if isinstance(columns, str):
+        columns = ANALYSIS_COLUMNS[columns]
+
+    if columns is not None:
+        # project onto the columns this file has
+        import pyarrow.parquet as pq
+        available = set(pq.read_schema(path).names)
+        columns = [c for c in columns if c in available]
+
+    return pd.read_parquet(path, columns=columns)
@@ -0,0 +1,206 @@
+from functools import lru_cache
+
+import numpy as np
+
+from match_report.binning import PITCH_RANGE, group_codes
+from match_report.match_events import as_frame
+
+
+# density grid cells, one per pitch unit of the 120x80 Statsbomb pitch
+GRID_SHAPE = (120, 80)
+
+# scott bandwidths are rounded to this many pitch units so their kernels are shared
+BW_STEP = 0.25
+
+# smallest scott bandwidth in pitch units, groups of one point (or one location) use it
+MIN_BW = 2.0
+
+
+@lru_cache(maxsize=None)
+def grid(shape=GRID_SHAPE, extent=PITCH_RANGE):
+    """
+    density grid cell edges and centres (cached)
+
+    Arg
+    ------
+    shape : (nx, ny) cells
+    extent : ((x0,x1),(y0,y1))
+
+    Out
+    -------
+    xedges, yedges, xc, yc : np arrays (read only)
+
+    """
+
+    xedges, yedges = (np.linspace(lo, hi, n+1) for n, (lo, hi) in zip(shape, extent))
+    arrays = (xedges, yedges, (xedges[1:] + xedges[:-1])/2, (yedges[1:] + yedges[:-1])/2)
+    for a in arrays:
+        a.setflags(write=False)
+    return arrays
+
+
+@lru_cache(maxsize=256)
+def kernel(n, lo, hi, bw):
+    """
+    gaussian kernel matrix between the n cell centres of an axis (cached)
+    K[i,k] = normal pdf of (centre i - centre k) with standard deviation bw
+
+    Out
+    -------
+    K : np array (n, n), read only
+
+    """
+
+    c = np.linspace(lo, hi, n+1)
+    c = (c[1:] + c[:-1])/2
+    d = np.subtract.outer(c, c)/bw
+    K = np.exp(-0.5*d*d)/(bw*np.sqrt(2*np.pi))
+    K.setflags(write=False)
+    return K
+
+
+def linear_bins(x, y, codes, n_groups, weights=None, shape=GRID_SHAPE, extent=PITCH_RANGE):
+    """
+    weights of points shared between the four nearest cell centres (linear binning),
+    so the binned density is accurate well below the cell size
+
+    Arg
+    ------
+    x, y : arrays of coordinates (no missing values)
+    codes : array of group codes (0..n_groups-1)
+    n_groups : int
+    weights : array of point weights (None for 1)
+
+    Out
+    -------
+    H : np array (n_groups, nx, ny)
+
+    """
+
+    (nx, ny), ((x0, x1), (y0, y1)) = shape, extent
+    w = np.ones(len(x)) if weights is None else np.asarray(weights, dtype=float)
+
+    # position in cell centre units, clipped to the outer centres
+    u = np.clip((x - x0)/(x1 - x0)*nx - 0.5, 0, nx-1)
+    v = np.clip((y - y0)/(y1 - y0)*ny - 0.5, 0, ny-1)
+    i, j = np.minimum(u.astype(np.int64), nx-2), np.minimum(v.astype(np.int64), ny-2)
+    fu, fv = u - i, v - j
+
+    base = (codes*nx + i)*ny + j
+    H = np.zeros(n_groups*nx*ny)
+    for di, dj, f in ((0, 0, (1-fu)*(1-fv)), (1, 0, fu*(1-fv)), (0, 1, (1-fu)*fv), (1, 1, fu*fv)):
+        H += np.bincount(base + di*ny + dj, weights=w*f, minlength=len(H))
+
+    return H.reshape(n_groups, nx, ny)
+
+
+def scott_bandwidth(x, y, codes, n_groups, weights=None):
+    """
+    scott's rule bandwidth of each group (n^(-1/6) times the x and y standard deviations,
+    as gaussian_kde without the x/y correlation)
+
+    Out
+    -------
+    bw : np array (n_groups, 2)
+
+    """
+
+    w = np.ones(len(x)) if weights is None else np.asarray(weights, dtype=float)
+    n = np.bincount(codes, weights=w, minlength=n_groups)
+    bw = np.zeros((n_groups, 2))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        for k, v in enumerate((x, y)):
+            mean = np.bincount(codes, weights=w*v, minlength=n_groups)/n
+            var = np.bincount(codes, weights=w*v*v, minlength=n_groups)/n - mean**2
+            bw[:, k] = np.sqrt(np.maximum(var, 0))*n**(-1/6)
+    return bw
+
+
+def _convolve(H, bw, shape, extent):
+    # H[g] smoothed by separable kernels, Kx @ H[g] @ Ky, groups sharing a bandwidth in one product
+    (nx, ny), ((x0, x1), (y0, y1)) = shape, extent
+    out = np.zeros_like(H)
+    pairs, inverse = np.unique(bw, axis=0, return_inverse=True)
+    for k, (bx, by) in enumerate(pairs):
+        sel = np.nonzero(inverse.ravel() == k)[0]
+        if bx <= 0 or by <= 0:
+            # a single point (or one location) per group, left as binned
+            out[sel] = H[sel]*nx*ny/((x1 - x0)*(y1 - y0))
+            continue
+        out[sel] = kernel(nx, x0, x1, bx) @ H[sel] @ kernel(ny, y0, y1, by)
+    return out
+
+
+def kde_by(events, by=None, bw='scott', weights=None, shape=GRID_SHAPE, extent=PITCH_RANGE,
+           columns=('location_x','location_y')):
+    """
+    gaussian kde surfaces for many subsets (e.g. per player, team or half) in one call
+    evaluated on a fixed pitch grid from linearly binned points, each surface is
+    renormalised over the pitch so it integrates to 1 (kernel mass past the touchlines
+    is spread over the pitch rather than lost)
+
+    Arg
+    ------
+    events : pandas df (or MatchEvents)
+    by : column name(s) to split by, None for one surface
+    bw : float bandwidth in pitch units shared by every group (one cached kernel),
+         or 'scott' for each group's own (rounded to BW_STEP, at least MIN_BW)
+    weights : column of point weights (e.g. 'xg'), None counts events
+    shape : (nx, ny) grid cells
+    extent : ((x0,x1),(y0,y1))
+    columns : coordinate columns
+
+    Out
+    -------
+    density : np array (groups, nx, ny), or (nx, ny) when by is None
+    groups : pandas index of the group keys (None when by is None)
+    xc, yc : np arrays of cell centres, so plt.contourf(xc, yc, density.T) draws a surface
+
+    """
+
+    df = as_frame(events)
+    x = np.asarray(df[columns[0]], dtype=float)
+    y = np.asarray(df[columns[1]], dtype=float)
+    valid = ~(np.isnan(x) | np.isnan(y))
+    codes, groups = group_codes(df, by)
+    n_groups = 1 if groups is None else len(groups)
+    w = None if weights is None else np.nan_to_num(np.asarray(df[weights], dtype=float))
+
+    ok = valid & (codes >= 0)
+    x, y, codes = x[ok], y[ok], codes[ok]
+    w = None if w is None else w[ok]
+
+    H = linear_bins(x, y, codes, n_groups, w, shape, extent)
+    if isinstance(bw, str):
+        bws = np.round(scott_bandwidth(x, y, codes, n_groups, w)/BW_STEP)*BW_STEP
+        bws = np.maximum(np.nan_to_num(bws), MIN_BW)
+    else:
+        bws = np.full((n_groups, 2), float(bw))
+    density = _convolve(H, bws, shape, extent)
+
+    # renormalise over the pitch (cell area times the sum of each surface)
+    (nx, ny), ((x0, x1), (y0, y1)) = shape, extent
+    total = density.sum(axis=(1, 2))*(x1 - x0)*(y1 - y0)/(nx*ny)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        density = np.where(total[:, None, None] > 0, density/total[:, None, None], 0.)
+
+    xc, yc = grid(shape, extent)[2:]
+    if groups is None:
+        return density[0], None, xc, yc
+    return density, groups, xc, yc
+
+
+def kde(events, bw='scott', weights=None, shape=GRID_SHAPE, extent=PITCH_RANGE,
+        columns=('location_x','location_y')):
+    """
+    gaussian kde surface of event locations on the pitch grid (see kde_by)
+
+    Out
+    -------
+    density : np array (nx, ny)
+    xc, yc : np arrays of cell centres
+
+    """
+
+    density, _, xc, yc = kde_by(events, None, bw, weights, shape, extent, columns)
+    return density, xc, yc
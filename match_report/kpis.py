@@ -1,268 +1,542 @@
 import pandas as pd
 import numpy as np
+from collections import namedtuple
 
+from match_report.match_events import MatchEvents, INDEX_COLUMNS, as_frame
+from match_report.profiling import profiled
 
 
+# a kpi is a row predicate plus an aggregation
+# column=None counts the rows matching the predicate, otherwise the column is summed over them
+# predicate=None matches every row
+Metric = namedtuple('Metric', ['name', 'predicate', 'column'])
 
-def fwds_kpis(cfs):
+
+class EventMasks:
     """
-    calulate kpis for forwards
-    
+    memoised boolean masks over an events df
+    each (op, column, value) mask is only evaluated once per frame
+
     Arg
     ------
-    cfs : pandas df of forward events
-    
+    df : pandas df of events (or MatchEvents, whose integer codes are used where possible)
+
+    """
+
+    def __init__(self, df):
+        self.events = df if isinstance(df, MatchEvents) else None
+        self.df = as_frame(df)
+        self._cache = {}
+
+    def _code_mask(self, op, col, value):
+        # compare precomputed integer codes instead of values
+        codes = self.events.codes(col)
+        c = self.events.code(col, value)
+        if op == 'ne':
+            return codes != c
+        return codes == c
+
+    def _mask(self, op, col, value=None):
+        key = (op, col, value)
+        if key not in self._cache:
+            if (self.events is not None and col in INDEX_COLUMNS
+                    and op in ('eq','ne','isnull')):
+                self._cache[key] = self._code_mask(op, col, value)
+                return self._cache[key]
+            s = self.df[col]
+            if op == 'eq':
+                m = s == value
+            elif op == 'ne':
+                m = s != value
+            elif op == 'ge':
+                m = s >= value
+            elif op == 'le':
+                m = s <= value
+            elif op == 'gt':
+                m = s > value
+            elif op == 'isnull':
+                m = s.isnull()
+            self._cache[key] = np.asarray(m, dtype=bool)
+        return self._cache[key]
+
+    def eq(self, col, value):
+        return self._mask('eq', col, value)
+
+    def ne(self, col, value):
+        return self._mask('ne', col, value)
+
+    def ge(self, col, value):
+        return self._mask('ge', col, value)
+
+    def le(self, col, value):
+        return self._mask('le', col, value)
+
+    def gt(self, col, value):
+        return self._mask('gt', col, value)
+
+    def isnull(self, col):
+        return self._mask('isnull', col)
+
+    def values(self, col):
+        # numeric column with nan as 0 (for sums)
+        key = ('values', col, None)
+        if key not in self._cache:
+            self._cache[key] = np.nan_to_num(np.asarray(self.df[col], dtype=float))
+        return self._cache[key]
+
+
+def indicator_matrix(df, metrics, masks=None):
+    """
+    evaluate every metric predicate once into a (rows, metrics) matrix
+
+    Arg
+    ------
+    df : pandas df of events
+    metrics : list of Metric
+    masks : EventMasks (optional, shares masks between calls)
+
     Out
     -------
-    df : pandas df of kpis
-    
+    values : np array (rows, metrics)
+    hit : np array of bool, rows matched by at least one metric
+
+    """
+
+    if masks is None:
+        masks = EventMasks(df)
+
+    n = len(df)
+    values = np.zeros((n, len(metrics)))
+    hit = np.zeros(n, dtype=bool)
+    for j, m in enumerate(metrics):
+        if m.predicate is None:
+            mask = np.ones(n, dtype=bool)
+        else:
+            mask = m.predicate(masks)
+        hit |= mask
+        if m.column is None:
+            values[:, j] = mask
+        else:
+            values[:, j] = np.where(mask, masks.values(m.column), 0)
+
+    return values, hit
+
+
+def kpi_sums(df, metrics, by='player_name', masks=None):
+    """
+    grouped partial sums for a set of kpis
+    partial sums of different event batches can be added together (see kpi_finish)
+
+    Arg
+    ------
+    df : pandas df of events
+    metrics : list of Metric
+    by : str or list of str, columns to group by
+         (pandas series of keys aligned with df can be given in place of column names)
+    masks : EventMasks (optional)
+
+    Out
+    -------
+    df : pandas df of metric sums plus matched row counts (_hit, _n<j>), one row per group
+
+    """
+
+    if masks is None:
+        masks = EventMasks(df)
+    df = masks.df
+    values, hit = indicator_matrix(df, metrics, masks)
+
+    names = [m.name for m in metrics]
+    table = pd.DataFrame(values, columns=names)
+    table['_hit'] = hit
+    # matched row counts for summed metrics (counted metrics already are counts)
+    for j, m in enumerate(metrics):
+        if m.column is not None and m.predicate is not None:
+            table['_n%d' % j] = m.predicate(masks)
+
+    def key(k):
+        return (k if isinstance(k, pd.Series) else df[k]).reset_index(drop=True)
+
+    if isinstance(by, (str, pd.Series)):
+        keys = key(by)
+    else:
+        keys = [key(k) for k in by]
+
+    return table.groupby(keys, observed=True).sum()
+
+
+def kpi_finish(sums, metrics):
     """
-    
-    cfs_df = cfs[['xg','event_type_name','play_pattern_name','player_name',
-       'player_position_name', 'location_x', 'location_y', 'end_location_x',
-       'end_location_y','under_pressure', 'outcome_name','counterpress','aerial_won']]
-    
-    # xg,shots, box_touches, pressures, aerials
-    xg = cfs_df.groupby(['player_name'])['xg'].sum()
-    shots = cfs_df[cfs_df['event_type_name']=='Shot'].groupby(['player_name'])['event_type_name'].count()
-    box_touches = cfs_df[(cfs_df['location_x']>=99.6)
-      &(cfs_df['location_y']>=17.67)
-      &(cfs_df['location_y']<=65.75)
-      &(cfs_df['event_type_name']!='Pressure')].groupby(['player_name'])['player_name'].count()
-    
-    pressures = (cfs_df[(cfs_df['event_type_name']=='Pressure')].
-                 groupby(['player_name'])['event_type_name'].count())
-    
-    aerials = cfs_df[(cfs_df['aerial_won']>0)].groupby(['player_name'])['aerial_won'].count()
-    
-    dribbles = (cfs_df[(cfs_df['event_type_name']=='Dribble')
-                      &(cfs_df['outcome_name']=='Complete')]
-                .groupby(['player_name'])['player_name'].count())
-    
-    df = pd.concat([xg,shots,box_touches,pressures,dribbles,aerials],axis=1)
-    df.columns = ['xg','shots','box_touches','pressures','succ. dribbles','aerials_won']
+    turn grouped partial sums into a kpi table
+
+    Arg
+    ------
+    sums : pandas df from kpi_sums (or the sum of several)
+    metrics : list of Metric
+
+    Out
+    -------
+    df : pandas df of kpis, one row per group with at least one matching event
+
+    """
+
+    out = sums[sums['_hit'] > 0].copy()
+
+    # groups with no matching rows are nan, as with a groupby per metric
+    for j, m in enumerate(metrics):
+        if m.column is None:
+            out[m.name] = out[m.name].astype('int64').where(out[m.name] > 0)
+        elif m.predicate is not None:
+            out[m.name] = out[m.name].where(out['_n%d' % j] > 0)
+
+    return out[[m.name for m in metrics]]
+
+
+def kpi_table(df, metrics, by='player_name'):
+    """
+    calculate a set of kpis with a single grouped reduction
+
+    Arg
+    ------
+    df : pandas df of events
+    metrics : list of Metric
+    by : str or list of str, columns to group by
+
+    Out
+    -------
+    df : pandas df of kpis, one row per group with at least one matching event
+         (in concat_order for a single by column, sorted by group otherwise)
+
+    """
+
+    table = kpi_finish(kpi_sums(df, metrics, by), metrics)
+    if isinstance(by, str):
+        table = table.iloc[concat_order(table, metrics)]
+    return table
+
+
+def concat_order(table, metrics):
+    """
+    row order of a pd.concat(axis=1) of one groupby per metric, as the single match
+    kpi tables were built: groups in order of the first metric they have a value for,
+    then in group order
+
+    Out
+    -------
+    order : np array of row positions
+
+    """
+
+    present = table[[m.name for m in metrics]].notna().to_numpy()
+    first = np.where(present.any(axis=1), present.argmax(axis=1), len(metrics))
+    return np.argsort(first, kind='stable')
+
+
+def kpi_keys(df, name, by, teams=None):
+    """
+    group keys of a kpi set, nan for rows outside its position group (or teams)
+    lets every kpi set be reduced from the same unfiltered events
+
+    Arg
+    ------
+    df : pandas df of events
+    name : str key of KPI_SETS
+    by : str or list of str, columns to group by
+    teams : list of team names (None keeps every team)
+
+    Out
+    -------
+    keys : list of pandas series aligned with df
+
+    """
+
+    keys = [df[c] for c in ([by] if isinstance(by, str) else by)]
+    if name in POSITION_GROUPS:
+        keep = df['player_position_name'].isin(POSITION_GROUPS[name])
+    elif teams is not None:
+        keep = df['team_name'].isin(list(teams))
+    else:
+        return keys
+    # a nan key drops the row from the groupby
+    keys[-1] = keys[-1].where(keep)
+
+    return keys
+
+
+# shared predicates
+def _passes(m):
+    return m.eq('event_type_name', 'Pass')
+
+def _pass_complete(m):
+    return _passes(m) & m.isnull('outcome_name')
+
+def _pass_incomp(m):
+    return _passes(m) & m.eq('outcome_name', 'Incomplete')
+
+def _crosses(m):
+    return _passes(m) & m.eq('pass_cross', True)
+
+def _deep_prog(m):
+    # passes carries dribbles into final 3rd
+    return (_passes(m)
+            | m.eq('event_type_name', 'Dribble')
+            | (m.eq('event_type_name', 'Carries') & m.ge('location_x', 80)))
+
+def _box_touches(m):
+    return (m.ge('location_x', 99.6)
+            & m.ge('location_y', 17.67)
+            & m.le('location_y', 65.75)
+            & m.ne('event_type_name', 'Pressure'))
+
+def _succ_dribbles(m):
+    return m.eq('event_type_name', 'Dribble') & m.eq('outcome_name', 'Complete')
+
+def _event(name):
+    return lambda m: m.eq('event_type_name', name)
+
+
+FWDS_METRICS = [
+    Metric('xg', None, 'xg'),
+    Metric('goals', lambda m: m.eq('event_type_name', 'Shot') & m.eq('outcome_name', 'Goal'), None),
+    Metric('shots', _event('Shot'), None),
+    Metric('box_touches', _box_touches, None),
+    Metric('pressures', _event('Pressure'), None),
+    Metric('succ. dribbles', _succ_dribbles, None),
+    Metric('aerials_won', lambda m: m.gt('aerial_won', 0), None),
+]
+
+WB_METRICS = [
+    Metric('tack', lambda m: m.eq('type_name', 'Tackle'), None),
+    Metric('pressures', _event('Pressure'), None),
+    Metric('crosses', _crosses, None),
+    Metric('deep_prog', _deep_prog, None),
+    Metric('pass_comp', _pass_complete, None),
+    Metric('pass_incomp', _pass_incomp, None),
+    Metric('succ. dribbles', _succ_dribbles, None),
+    Metric('aerials_won', lambda m: m.gt('aerial_won', 0), None),
+    Metric('fouls_won', _event('Foul Won'), None),
+]
+
+CM_METRICS = [
+    Metric('pass_comp', _pass_complete, None),
+    Metric('pass_incomp', _pass_incomp, None),
+    Metric('deep prog.', _deep_prog, None),
+    Metric('succ. dribbles', _succ_dribbles, None),
+    Metric('fouls_won', _event('Foul Won'), None),
+    Metric('pressures', _event('Pressure'), None),
+    Metric('tack', lambda m: m.eq('type_name', 'Tackle'), None),
+    Metric('int', _event('Interception'), None),
+]
+
+CB_METRICS = [
+    Metric('pass_comp', _pass_complete, None),
+    Metric('pass_incomp', _pass_incomp, None),
+    Metric('pressures', _event('Pressure'), None),
+    Metric('fouls_won', _event('Foul Won'), None),
+    Metric('tack', lambda m: m.eq('type_name', 'Tackle'), None),
+    Metric('int', _event('Interception'), None),
+    Metric('aerials_won', lambda m: m.gt('aerial_won', 0), None),
+    Metric('clearances', _event('Clearance'), None),
+]
+
+TEAM_METRICS = [
+    Metric('xg', None, 'xg'),
+    Metric('shots', _event('Shot'), None),
+    Metric('box_touches', _box_touches, None),
+    Metric('pressures', _event('Pressure'), None),
+    Metric('deep prog', _deep_prog, None),
+    Metric('crosses', _crosses, None),
+    Metric('pass comp', _pass_complete, None),
+    Metric('pass incomp', _pass_incomp, None),
+]
+
+
+# player_position_name groups for the positional kpis
+POSITION_GROUPS = {
+    'fwds': ['Left Center Forward','Right Center Forward','Center Forward'],
+    'wb': ['Left Back','Right Back','Left Wing Back','Right Wing Back'],
+    'cm': ['Center Defensive Midfield','Left Center Midfield','Right Center Midfield'],
+    'cb': ['Center Back','Left Center Back','Right Center Back'],
+}
+
+
+def _fwds_finish(df):
     df['shot_touch%'] = (df['shots']/df['box_touches'])*100
     df['xg/shot'] = df['xg']/df['shots']
-    df['goals'] = [0,1]
-    
+
     df = df.fillna(0)
     df = df[['goals','xg','shots','xg/shot','shot_touch%','box_touches','pressures','succ. dribbles','aerials_won']]
-    
+
     return round(df,2)
 
-def wb_kpis(wbs):
-    # calc kpis for wb
-    
-    cfs_df = wbs[['xg','event_type_name','type_name','play_pattern_name','player_name',
-       'player_position_name', 'location_x', 'location_y', 'end_location_x','pass_cross',
-       'end_location_y','under_pressure', 'outcome_name','counterpress','aerial_won']]
-    
-    # xg,shots, box_touches, pressures, aerials
-    tackles = cfs_df[cfs_df['type_name']=='Tackle'].groupby(['player_name'])['type_name'].count()
-    intercepts = (cfs_df[cfs_df['event_type_name']=='Interception']
-                  .groupby(['player_name'])['event_type_name'].count())
-    
-    pressures = (cfs_df[(cfs_df['event_type_name']=='Pressure')].
-             groupby(['player_name'])['event_type_name'].count())
-    
-    crosses = (cfs_df[(cfs_df['event_type_name']=='Pass')&
-                     (cfs_df['pass_cross']==True)].
-             groupby(['player_name'])['event_type_name'].count())
-    
-    # passes carries dribbles into final 3rd
-    deep_prog = (cfs_df[(cfs_df['event_type_name']=='Pass')
-                        |(cfs_df['event_type_name']=='Dribble')
-                       |(cfs_df['event_type_name']=='Carries')
-                       &(cfs_df['location_x']>=80)].
-             groupby(['player_name'])['event_type_name'].count())
-    
-    pass_complete =  (cfs_df[(cfs_df['event_type_name']=='Pass')&
-                     (cfs_df['outcome_name'].isnull())].
-             groupby(['player_name'])['event_type_name'].count())
-    
-    pass_incomp = (cfs_df[(cfs_df['event_type_name']=='Pass')&
-                     (cfs_df['outcome_name']=='Incomplete')].
-             groupby(['player_name'])['event_type_name'].count())
-
-    dribbles = (cfs_df[(cfs_df['event_type_name']=='Dribble')
-                      &(cfs_df['outcome_name']=='Complete')]
-                .groupby(['player_name'])['player_name'].count())
-    
-    aerials = cfs_df[(cfs_df['aerial_won']>0)].groupby(['player_name'])['aerial_won'].count()
-    
-    fouls = (cfs_df[(cfs_df['event_type_name']=='Foul Won')]
-                .groupby(['player_name'])['player_name'].count())
-    
-    # create df    
-    df = pd.concat([tackles,pressures,crosses,deep_prog,pass_complete
-                    ,pass_incomp,dribbles,aerials,fouls],axis=1)
-    df.columns = ['tack','pressures','crosses','deep_prog','pass_comp',
-                  'pass_incomp','succ. dribbles','aerials_won','fouls_won']
+
+def _wb_finish(df):
     df['pass_%'] = (df['pass_comp']/(df['pass_incomp']+df['pass_comp']))*100
     df = df.fillna(0)
-    
+
     df = df[['tack','pressures','crosses','deep_prog','pass_%','succ. dribbles','aerials_won','fouls_won']]
-    
+
     return round(df,2)
 
 
-def cm_kpis(cms):
-    # calc kpis for wb
-    
-    cfs_df = cms[['xg','event_type_name','type_name','play_pattern_name','player_name',
-       'player_position_name', 'location_x', 'location_y', 'end_location_x','pass_cross',
-       'end_location_y','under_pressure', 'outcome_name','counterpress','aerial_won']]
-    
-    # xg,shots, box_touches, pressures, aerials
-    pass_complete =  (cfs_df[(cfs_df['event_type_name']=='Pass')&
-                     (cfs_df['outcome_name'].isnull())].
-             groupby(['player_name'])['event_type_name'].count())
-    
-    pass_incomp = (cfs_df[(cfs_df['event_type_name']=='Pass')&
-                     (cfs_df['outcome_name']=='Incomplete')].
-             groupby(['player_name'])['event_type_name'].count())
-    
-    # passes carries dribbles into final 3rd
-    deep_prog = (cfs_df[(cfs_df['event_type_name']=='Pass')
-                        |(cfs_df['event_type_name']=='Dribble')
-                       |(cfs_df['event_type_name']=='Carries')
-                       &(cfs_df['location_x']>=80)].
-             groupby(['player_name'])['event_type_name'].count())
-    
-    dribbles = (cfs_df[(cfs_df['event_type_name']=='Dribble')
-                      &(cfs_df['outcome_name']=='Complete')]
-                .groupby(['player_name'])['player_name'].count())
-    
-    fouls = (cfs_df[(cfs_df['event_type_name']=='Foul Won')]
-            .groupby(['player_name'])['player_name'].count())
-
-    pressures = (cfs_df[(cfs_df['event_type_name']=='Pressure')].
-             groupby(['player_name'])['event_type_name'].count())
-    
-    
-    tackles = cfs_df[cfs_df['type_name']=='Tackle'].groupby(['player_name'])['type_name'].count()
-    intercepts = (cfs_df[cfs_df['event_type_name']=='Interception']
-                  .groupby(['player_name'])['event_type_name'].count())
-    
-    
-    # create df    
-    df = pd.concat([pass_complete,pass_incomp,deep_prog,dribbles,fouls
-                    ,pressures,tackles,intercepts],axis=1)
-    df.columns = ['pass_comp','pass_incomp','deep prog.','succ. dribbles','fouls_won',
-                 'pressures','tack','int']
+def _cm_finish(df):
     df['pass_%'] = (df['pass_comp']/(df['pass_incomp']+df['pass_comp']))*100
-    
+
     df = df.fillna(0)
     df = df[['pass_%','deep prog.','succ. dribbles','fouls_won','pressures','tack']]
-    
+
     return round(df,2)
 
 
-def cb_kpis(cbs):
-    # calc kpis for wb
-    
-    cfs_df = cbs[['xg','event_type_name','type_name','play_pattern_name','player_name',
-       'player_position_name', 'location_x', 'location_y', 'end_location_x','pass_cross',
-       'end_location_y','under_pressure', 'outcome_name','counterpress','aerial_won',
-                 'pass_height_name','under_pressure']]
-    
-    # xg,shots, box_touches, pressures, aerials
-    pass_complete =  (cfs_df[(cfs_df['event_type_name']=='Pass')&
-                     (cfs_df['outcome_name'].isnull())].
-             groupby(['player_name'])['event_type_name'].count())
-    
-    pass_incomp = (cfs_df[(cfs_df['event_type_name']=='Pass')&
-                     (cfs_df['outcome_name']=='Incomplete')].
-             groupby(['player_name'])['event_type_name'].count())
-    
-    pressures = (cfs_df[(cfs_df['event_type_name']=='Pressure')].
-         groupby(['player_name'])['event_type_name'].count())
-    
-    fouls = (cfs_df[(cfs_df['event_type_name']=='Foul Won')]
-        .groupby(['player_name'])['player_name'].count())
-    
-    tackles = cfs_df[cfs_df['type_name']=='Tackle'].groupby(['player_name'])['player_name'].count()
-    intercepts = (cfs_df[cfs_df['event_type_name']=='Interception']
-                  .groupby(['player_name'])['event_type_name'].count())
-    
-    aerials = cfs_df[(cfs_df['aerial_won']>0)].groupby(['player_name'])['aerial_won'].count()   
-    
-    clear = (cfs_df[(cfs_df['event_type_name']=='Clearance')]
-        .groupby(['player_name'])['player_name'].count())
-    
-#     # create df    
-    df = pd.concat([pass_complete,pass_incomp,pressures,fouls,
-                    tackles,intercepts,aerials,clear],axis=1)
-    df.columns = ['pass_comp','pass_incomp','pressures','fouls_won',
-                 'tack','int','aerials_won','clearances']
+def _cb_finish(df):
     df['pass_%'] = (df['pass_comp']/(df['pass_incomp']+df['pass_comp']))*100
-    
+
     df = df.fillna(0)
-    
+
     df = df[['pass_%','pressures','fouls_won',
                  'tack','aerials_won','clearances']]
-    
+
     return round(df,2)
 
-def team_kpi(all_events):
+
+def _team_finish(df):
+    df['shot_touch%'] = (df['shots']/df['box_touches'])*100
+    df['xg/shot'] = df['xg']/df['shots']
+    df['pass%'] = (df['pass comp']/(df['pass comp']+df['pass incomp']))*100
+
+    df = round(df[['xg','shots','xg/shot','box_touches','shot_touch%','deep prog'
+          ,'crosses','pressures','pass%']],2)
+
+    return df
+
+
+def _team_table(df):
+    # one column per team
+    return _team_finish(df).transpose()
+
+
+# name -> (metrics, group by column, ratios/ordering applied to the kpi table rows)
+KPI_SETS = {
+    'fwds': (FWDS_METRICS, 'player_name', _fwds_finish),
+    'wb': (WB_METRICS, 'player_name', _wb_finish),
+    'cm': (CM_METRICS, 'player_name', _cm_finish),
+    'cb': (CB_METRICS, 'player_name', _cb_finish),
+    'team': (TEAM_METRICS, 'team_name', _team_finish),
+}
+
+
+@profiled
+def fwds_kpis(cfs, by='player_name'):
+    """
+    calulate kpis for forwards
+
+    Arg
+    ------
+    cfs : pandas df of forward events
+    by : str or list of str, e.g. ['match_id','player_name'] for one row per player per match
+
+    Out
+    -------
+    df : pandas df of kpis
+
+    """
+
+    # goals, xg, shots, box_touches, pressures, dribbles, aerials
+    return _fwds_finish(kpi_table(cfs, FWDS_METRICS, by))
+
+@profiled
+def wb_kpis(wbs, by='player_name'):
+    # calc kpis for wb
+    return _wb_finish(kpi_table(wbs, WB_METRICS, by))
+
+
+@profiled
+def cm_kpis(cms, by='player_name'):
+    # calc kpis for cm
+    return _cm_finish(kpi_table(cms, CM_METRICS, by))
+
+
+@profiled
+def cb_kpis(cbs, by='player_name'):
+    # calc kpis for cb
+    return _cb_finish(kpi_table(cbs, CB_METRICS, by))
+
+@profiled
+def team_kpi(all_events, teams=None, by='team_name'):
     """
     calulate kpis for each team across the whol match
-    
+
     Arg
     ------
     all_events : all_events df
-    
+    teams : list of team names (None for every team in the events)
+    by : str or list of str, e.g. ['match_id','team_name'] for one column per team per match
+
     Out
     -------
-    df : pandas df
-    
+    df : pandas df, one column per team
+
     """
-    
-    teams_df = all_events[((all_events['team_name']=='Fleetwood Town')
-                 |(all_events['team_name']=='Wycombe Wanderers'))]
-    
+
+    if teams is None:
+        teams_df = all_events
+    elif isinstance(all_events, MatchEvents):
+        teams_df = all_events.select(team_name=list(teams))
+    else:
+        teams_df = all_events[all_events['team_name'].isin(list(teams))]
+
     # calculate kpis
-    pressures = (teams_df[(teams_df['event_type_name']=='Pressure')].
-         groupby(['team_name'])['event_type_name'].count())
+    return _team_table(kpi_table(teams_df, TEAM_METRICS, by))
 
-    crosses = (teams_df[(teams_df['event_type_name']=='Pass')&
-                     (teams_df['pass_cross']==True)].
-             groupby(['team_name'])['event_type_name'].count())
 
-    # passes carries dribbles into final 3rd
-    deep_prog = (teams_df[(teams_df['event_type_name']=='Pass')
-                        |(teams_df['event_type_name']=='Dribble')
-                       |(teams_df['event_type_name']=='Carries')
-                       &(teams_df['location_x']>=80)].
-             groupby(['team_name'])['event_type_name'].count())
-
-    pass_complete =  (teams_df[(teams_df['event_type_name']=='Pass')&
-                     (teams_df['outcome_name'].isnull())].
-             groupby(['team_name'])['event_type_name'].count())
-
-    pass_incomp = (teams_df[(teams_df['event_type_name']=='Pass')&
-                     (teams_df['outcome_name']=='Incomplete')].
-             groupby(['team_name'])['event_type_name'].count())
-
-    xg = teams_df.groupby(['team_name'])['xg'].sum()
-
-    shots = teams_df[teams_df['event_type_name']=='Shot'].groupby(['team_name'])['event_type_name'].count()
-
-    box_touches = teams_df[(teams_df['location_x']>=99.6)
-      &(teams_df['location_y']>=17.67)
-      &(teams_df['location_y']<=65.75)
-      &(teams_df['event_type_name']!='Pressure')].groupby(['team_name'])['team_name'].count()
-    
-    
-    # combine kpis
-    df = pd.concat([xg,shots,box_touches,pressures,deep_prog,crosses,pass_complete,pass_incomp],axis=1)
-    df.columns = ['xg','shots','box_touches','pressures','deep prog','crosses','pass comp','pass incomp']
+@profiled
+def season_kpis(all_events, by='match_id', teams=None, kpi_sets=None):
+    """
+    every kpi table for any number of matches in one pass over the events
+    rows are grouped by (match, player) for the positional kpis and (match, team) for the
+    team kpis, so a league's events are reduced without a call per fixture
 
-    df['shot_touch%'] = (df['shots']/df['box_touches'])*100
-    df['xg/shot'] = df['xg']/df['shots']
-    df['pass%'] = (df['pass comp']/(df['pass comp']+df['pass incomp']))*100
-    
-    df = round(df[['xg','shots','xg/shot','box_touches','shot_touch%','deep prog'
-          ,'crosses','pressures','pass%']].transpose(),2)
-    
-    return df
\ No newline at end of file
+    Arg
+    ------
+    all_events : all_events df (or MatchEvents) of one or more matches
+    by : str or list of str, columns grouped ahead of player/team (None for a single match)
+    teams : list of team names for the team table (None for every team)
+    kpi_sets : dict of name -> (metrics, by, finish), defaults to KPI_SETS
+               finish takes and returns a kpi table with one row per group
+
+    Out
+    -------
+    tables : dict of name -> pandas df, one row per (match, player) or (match, team)
+
+    """
+
+    kpi_sets = KPI_SETS if kpi_sets is None else kpi_sets
+    return season_finish(season_sums(all_events, by, teams, kpi_sets), kpi_sets)
+
+
+def season_sums(all_events, by='match_id', teams=None, kpi_sets=None):
+    # partial sums of every kpi set (see season_kpis), sums of event batches can be added
+    kpi_sets = KPI_SETS if kpi_sets is None else kpi_sets
+    outer = [] if by is None else ([by] if isinstance(by, str) else list(by))
+
+    # masks are shared between every kpi set
+    masks = EventMasks(all_events)
+    df = masks.df
+
+    sums = {}
+    for name, (metrics, key, finish) in kpi_sets.items():
+        sums[name] = kpi_sums(df, metrics, kpi_keys(df, name, outer+[key], teams), masks)
+        sums[name].index.names = outer+[key]
+
+    return sums
+
+
+def season_finish(sums, kpi_sets=None):
+    # kpi tables from season_sums (or the sum of several)
+    kpi_sets = KPI_SETS if kpi_sets is None else kpi_sets
+
+    tables = {}
+    for name, (metrics, key, finish) in kpi_sets.items():
+        tables[name] = finish(kpi_finish(sums[name], metrics))
+
+    return tables
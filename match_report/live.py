@@ -0,0 +1,109 @@
+import numpy as np
+import pandas as pd
+
+from match_report import kpis
+from match_report.match_events import DUPLICATE_KEY
+from match_report.match_events import as_frame
+
+
+class LiveKpis:
+    """
+    running team and positional kpis for a live match
+    events are ingested in batches (or one at a time) and only new events are processed,
+    tables are built on demand from per-player and per-team running sums
+
+    duplicate events (same timestamp, player, event type and location as
+    data_loader.event_selector) are only counted once, so replayed events are ignored
+
+    Arg
+    ------
+    teams : list of team names for the team table (None uses every team)
+    kpi_sets : dict of name -> (metrics, by, finish), defaults to kpis.KPI_SETS
+
+    """
+
+    def __init__(self, teams=None, kpi_sets=None):
+        self.teams = teams
+        self.kpi_sets = kpis.KPI_SETS if kpi_sets is None else kpi_sets
+        self.n_events = 0
+        self._seen = set()
+        self._sums = {}
+
+    def _new_rows(self, events):
+        # rows whose duplicate key has not been seen before
+        key = events[DUPLICATE_KEY].astype(object)
+        key = key.where(key.notna(), None)
+
+        keep = np.zeros(len(events), dtype=bool)
+        for i, k in enumerate(key.itertuples(index=False, name=None)):
+            if k not in self._seen:
+                self._seen.add(k)
+                keep[i] = True
+
+        return events[keep]
+
+    def update(self, events):
+        """
+        add new events to the running sums
+
+        Arg
+        ------
+        events : pandas df of events, or a single event as a dict / pandas series
+
+        Out
+        -------
+        n : int number of new (not duplicate) events
+
+        """
+
+        events = as_frame(events)
+        if isinstance(events, dict):
+            events = pd.DataFrame([events])
+        elif isinstance(events, pd.Series):
+            events = events.to_frame().T
+
+        new = self._new_rows(events)
+        if len(new) == 0:
+            return 0
+
+        # masks are shared between every kpi set
+        masks = kpis.EventMasks(new)
+        for name, (metrics, by, finish) in self.kpi_sets.items():
+            part = kpis.kpi_sums(new, metrics, kpis.kpi_keys(new, name, by, self.teams), masks)
+            part.index.names = [by] if isinstance(by, str) else by
+            if name in self._sums:
+                self._sums[name] = self._sums[name].add(part, fill_value=0)
+            else:
+                self._sums[name] = part
+
+        self.n_events += len(new)
+        return len(new)
+
+    def table(self, name):
+        """
+        current kpi table, as returned by the matching kpis function
+
+        Arg
+        ------
+        name : str key of kpi_sets ('fwds','wb','cm','cb','team')
+
+        Out
+        -------
+        df : pandas df
+
+        """
+
+        metrics, by, finish = self.kpi_sets[name]
+        if name in self._sums:
+            sums = self._sums[name]
+        else:
+            sums = pd.DataFrame(columns=[m.name for m in metrics]+['_hit'], dtype=float)
+            sums.index.name = by
+
+        table = finish(kpis.kpi_finish(sums, metrics))
+        # one column per team, as team_kpi
+        return table.transpose() if name == 'team' else table
+
+    def tables(self):
+        # every current kpi table
+        return {name: self.table(name) for name in self.kpi_sets}
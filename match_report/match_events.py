@@ -0,0 +1,254 @@
+import numpy as np
+import pandas as pd
+
+
+# columns with precomputed integer codes and row indexes
+INDEX_COLUMNS = ['event_type_name','team_name','possession_team_name','player_name',
+                 'period','possession','outcome_name']
+
+# columns used to drop duplicate events
+DUPLICATE_KEY = ['timestamp','player_name','event_type_name','location_x','location_y']
+
+
+def duplicate_key_codes(df):
+    """
+    int64 code of the DUPLICATE_KEY of each row, equal codes for rows drop_duplicates
+    treats as duplicates. codes are only comparable within the frame
+    (see duplicate_key_hash for a key stable across frames)
+
+    Arg
+    ------
+    df : pandas df of events
+
+    Out
+    -------
+    codes : np array of int64 in [0, rows)
+
+    """
+
+    df = as_frame(df)
+    key = None
+    for col in DUPLICATE_KEY:
+        codes, uniques = pd.factorize(df[col])
+        if key is None:
+            key = codes + 1
+        else:
+            # re-factorized after each column so the combined code cannot overflow
+            key = pd.factorize(key*(len(uniques)+1) + codes+1)[0]
+    return key
+
+
+def duplicate_key_hash(df, extra=()):
+    """
+    64-bit hash of the DUPLICATE_KEY columns of each row (plus any extra columns)
+    equal for rows drop_duplicates treats as duplicates, across frames and column dtypes
+    (string, object or categorical columns, int or float coordinates in different csv chunks)
+
+    Arg
+    ------
+    df : pandas df of events
+    extra : list of columns added to the key
+
+    Out
+    -------
+    h : np array of uint64
+
+    """
+
+    df = as_frame(df)
+    key = {}
+    for col in DUPLICATE_KEY + list(extra):
+        s = df[col]
+        if pd.api.types.is_numeric_dtype(s) and not pd.api.types.is_bool_dtype(s):
+            key[col] = np.asarray(s, dtype=float)
+        else:
+            # strings hash the same as object, str or categorical (missing values too)
+            key[col] = s.to_numpy()
+    key = pd.DataFrame(key)
+
+    return pd.util.hash_pandas_object(key, index=False).to_numpy()
+
+
+class MatchEvents:
+    """
+    events container built once per loaded match
+    precomputes integer codes and row positions per value of INDEX_COLUMNS (lazily, once per column)
+    so selections like completed passes by a team in a period are index lookups rather than
+    string comparisons over the whole frame
+
+    selections share the parent's codes and hold row positions only,
+    the rows are copied out of the frame the first time .frame is used
+
+    every public function of data_loader, kpis, pass_net and utils accepts a MatchEvents
+    in place of a pandas df
+
+    Arg
+    ------
+    df : pandas df of events
+
+    """
+
+    def __init__(self, df, positions=None, parent=None):
+        self._df = df
+        self.positions = positions
+        if parent is None:
+            self._codes = {}
+            self._rows = {}
+            self._key = {}
+        else:
+            self._codes = parent._codes
+            self._rows = parent._rows
+            self._key = parent._key
+        self._frame = None
+
+    def __len__(self):
+        if self.positions is None:
+            return len(self._df)
+        return len(self.positions)
+
+    @property
+    def columns(self):
+        return self._df.columns
+
+    @property
+    def frame(self):
+        # pandas df of the selected rows
+        if self.positions is None:
+            return self._df
+        if self._frame is None:
+            self._frame = self._df.take(self.positions)
+        return self._frame
+
+    def __getitem__(self, key):
+        return self.frame[key]
+
+    def _full_codes(self, col):
+        # sorted codes of the whole frame (-1 for nan) and the values they refer to
+        if col not in self._codes:
+            self._codes[col] = pd.factorize(self._df[col], sort=True)
+        return self._codes[col]
+
+    def codes(self, col):
+        """
+        integer codes of a column for the selected rows (-1 for nan)
+
+        Arg
+        ------
+        col : str
+
+        Out
+        -------
+        codes : np array of int
+
+        """
+
+        codes = self._full_codes(col)[0]
+        if self.positions is None:
+            return codes
+        return codes[self.positions]
+
+    def code(self, col, value):
+        # code of a value (-1 for None/nan, -2 if the value does not occur)
+        if value is None or (isinstance(value, float) and np.isnan(value)):
+            return -1
+        uniques = self._full_codes(col)[1]
+        loc = pd.Index(uniques).get_indexer([value])[0]
+        return loc if loc >= 0 else -2
+
+    def _value_rows(self, col, value):
+        # sorted row positions of the whole frame with this value
+        if col not in self._rows:
+            codes, uniques = self._full_codes(col)
+            order = np.argsort(codes, kind='stable')
+            counts = np.bincount(codes+1, minlength=len(uniques)+1)
+            self._rows[col] = (order, np.concatenate([[0], np.cumsum(counts)]))
+        order, starts = self._rows[col]
+        c = self.code(col, value)
+        if c == -2:
+            return order[:0]
+        return order[starts[c+1]:starts[c+2]]
+
+    def rows(self, **criteria):
+        """
+        row positions matching every criteria
+        e.g. rows(event_type_name='Pass', outcome_name=None, team_name='Fleetwood Town', period=2)
+
+        Arg
+        ------
+        criteria : column=value or column=list of values (None matches nan)
+
+        Out
+        -------
+        positions : sorted np array of row positions in the full frame
+
+        """
+
+        positions = self.positions
+        for col, value in criteria.items():
+            if isinstance(value, (list, tuple, set)):
+                # unique, repeated values (or None and nan) give the same rows
+                r = np.unique(np.concatenate([self._value_rows(col, v) for v in value]
+                                             or [np.zeros(0, dtype=np.int64)]))
+            else:
+                r = self._value_rows(col, value)
+            if positions is None:
+                positions = r
+            else:
+                positions = np.intersect1d(positions, r, assume_unique=True)
+
+        if positions is None:
+            positions = np.arange(len(self._df))
+        return positions
+
+    def select(self, **criteria):
+        """
+        selection of the rows matching every criteria (see rows), without copying the frame
+
+        Out
+        -------
+        events : MatchEvents
+
+        """
+
+        return MatchEvents(self._df, self.rows(**criteria), parent=self)
+
+
+    def key_codes(self):
+        """
+        int64 DUPLICATE_KEY codes of the selected rows (computed once for the whole frame)
+
+        Out
+        -------
+        codes : np array of int64
+
+        """
+
+        if 'codes' not in self._key:
+            self._key['codes'] = duplicate_key_codes(self._df)
+        codes = self._key['codes']
+        if self.positions is None:
+            return codes
+        return codes[self.positions]
+
+    def unique(self):
+        """
+        selection without duplicate events (first occurrence of each DUPLICATE_KEY)
+
+        Out
+        -------
+        events : MatchEvents
+
+        """
+
+        keep = ~pd.Series(self.key_codes()).duplicated().to_numpy()
+        if keep.all():
+            return self
+        positions = np.arange(len(self._df)) if self.positions is None else self.positions
+        return MatchEvents(self._df, positions[keep], parent=self)
+
+
+def as_frame(events):
+    # pandas df from a MatchEvents (or a pandas df unchanged)
+    if isinstance(events, MatchEvents):
+        return events.frame
+    return events
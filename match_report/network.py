@@ -0,0 +1,241 @@
+import numpy as np
+import pandas as pd
+
+from match_report.binning import group_codes
+from match_report.match_events import as_frame
+
+
+def adjacency(passes, by=None, weight=None):
+    """
+    pass adjacency matrices, A[g,i,j] = passes (or summed weight) from player i to player j
+    players are coded within each group (sorted by name), groups with fewer players are
+    padded with empty rows and columns
+
+    Arg
+    ------
+    passes : pandas df (or MatchEvents) of completed passes with player_name and pass_recipient_name
+    by : column name(s) to build one network per group, e.g. ['match_id','team_name']
+         (None for a single network)
+    weight : column summed per link (None counts passes)
+
+    Out
+    -------
+    A : np array (groups, n, n), or (n, n) when by is None
+    players : np array (groups, n) of player names (None for padding), or (n,)
+    groups : pandas index of the group keys (None when by is None)
+
+    """
+
+    df = as_frame(passes)
+    # passes between two different players
+    df = df[df['player_name'].notna() & df['pass_recipient_name'].notna()
+            & (np.asarray(df['player_name'], dtype=object)
+               != np.asarray(df['pass_recipient_name'], dtype=object))]
+    g, groups = group_codes(df, by)
+    ok = g >= 0
+    df, g = df[ok], g[ok]
+    n_groups = 1 if groups is None else len(groups)
+
+    # (group, player) codes for passers and recipients together
+    names = np.concatenate([np.asarray(df['player_name'], dtype=object),
+                            np.asarray(df['pass_recipient_name'], dtype=object)])
+    gg = np.concatenate([g, g])
+    codes, uniques = pd.factorize(pd.MultiIndex.from_arrays([gg, names]), sort=True)
+    u_group = np.asarray(uniques.get_level_values(0), dtype=np.int64)
+    u_name = np.asarray(uniques.get_level_values(1), dtype=object)
+
+    # position of each player within its group
+    first = np.searchsorted(u_group, np.arange(n_groups))
+    local = np.arange(len(uniques)) - first[u_group]
+    n = int(local.max()) + 1 if len(local) else 0
+
+    players = np.full((n_groups, n), None, dtype=object)
+    players[u_group, local] = u_name
+
+    m = len(df)
+    i, j = local[codes[:m]], local[codes[m:]]
+    w = np.ones(m) if weight is None else np.nan_to_num(np.asarray(df[weight], dtype=float))
+    A = np.bincount((g*n + i)*n + j, weights=w, minlength=n_groups*n*n).reshape(n_groups, n, n)
+
+    if groups is None:
+        return A[0], players[0], None
+    return A, players, groups
+
+
+def eigenvector_centrality(A):
+    """
+    eigenvector centrality of the undirected (A + A.T) networks, unit length per network
+
+    Arg
+    ------
+    A : np array (..., n, n)
+
+    Out
+    -------
+    c : np array (..., n)
+
+    """
+
+    S = A + np.swapaxes(A, -1, -2)
+    _, vecs = np.linalg.eigh(S)
+    # leading eigenvector, sign made positive
+    c = np.abs(vecs[..., :, -1])
+    c[S.sum(axis=-1) == 0] = 0
+    return c
+
+
+def clustering(A):
+    """
+    clustering coefficient of each player in the undirected, unweighted networks
+    (linked pairs among a player's partners / possible pairs)
+
+    Arg
+    ------
+    A : np array (..., n, n)
+
+    Out
+    -------
+    c : np array (..., n)
+
+    """
+
+    U = ((A + np.swapaxes(A, -1, -2)) > 0).astype(float)
+    idx = np.arange(U.shape[-1])
+    U[..., idx, idx] = 0
+    triangles = np.einsum('...ij,...jk,...ki->...i', U, U, U)/2
+    k = U.sum(axis=-1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        c = triangles/(k*(k-1)/2)
+    return np.where(k > 1, c, 0.)
+
+
+def shortest_paths(A):
+    """
+    hop distances and number of shortest paths between players of the undirected networks
+    from powers of the adjacency matrix (walks of the shortest length are shortest paths)
+
+    Arg
+    ------
+    A : np array (..., n, n)
+
+    Out
+    -------
+    dist : np array (..., n, n) of hops (inf if not connected, 0 on the diagonal)
+    sigma : np array (..., n, n) of shortest path counts (1 on the diagonal)
+
+    """
+
+    U = ((A + np.swapaxes(A, -1, -2)) > 0).astype(float)
+    n = U.shape[-1]
+    idx = np.arange(n)
+    U[..., idx, idx] = 0
+
+    dist = np.full(U.shape, np.inf)
+    sigma = np.zeros(U.shape)
+    dist[..., idx, idx] = 0
+    sigma[..., idx, idx] = 1
+
+    walks = U.copy()
+    for k in range(1, n):
+        new = (walks > 0) & np.isinf(dist)
+        if not new.any():
+            break
+        dist[new] = k
+        sigma[new] = walks[new]
+        walks = walks @ U
+
+    return dist, sigma
+
+
+def betweenness(A):
+    """
+    betweenness centrality of each player in the undirected, unweighted networks
+    normalised by the (n-1)(n-2)/2 pairs of the other players of the network
+
+    Arg
+    ------
+    A : np array (..., n, n)
+
+    Out
+    -------
+    b : np array (..., n)
+
+    """
+
+    dist, sigma = shortest_paths(A)
+    n = A.shape[-1]
+    b = np.zeros(A.shape[:-1])
+    off = ~np.eye(n, dtype=bool)
+    for v in range(n):
+        # pairs (s,t) with a shortest path through v
+        d_sv = dist[..., :, v, None]
+        d_vt = dist[..., None, v, :]
+        through = np.isfinite(dist) & (d_sv + d_vt == dist) & off
+        through[..., v, :] = False
+        through[..., :, v] = False
+        with np.errstate(invalid='ignore', divide='ignore'):
+            frac = np.where(through, sigma[..., :, v, None]*sigma[..., None, v, :]/sigma, 0.)
+        b[..., v] = frac.sum(axis=(-1, -2))/2
+
+    # players in each network
+    size = ((A.sum(axis=-1) + A.sum(axis=-2)) > 0).sum(axis=-1, keepdims=True)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        b = b/((size-1)*(size-2)/2)
+    return np.where(size > 2, b, 0.)
+
+
+def network_metrics(passes, by=None, weight=None):
+    """
+    player and team network metrics for one or many pass networks in one call
+
+    Arg
+    ------
+    passes : pandas df (or MatchEvents) of completed passes
+    by : column name(s) for one network per group, e.g. ['match_id','team_name']
+    weight : column summed per link for strength (None counts passes)
+
+    Out
+    -------
+    players : pandas df, one row per (group,) player: degree_out, degree_in, strength_out,
+              strength_in, betweenness, eigenvector, clustering
+    teams : pandas df, one row per group: players, links, passes and density
+            (links / possible directed links)
+
+    """
+
+    A, names, groups = adjacency(passes, by, weight)
+    if groups is None:
+        A, names = A[np.newaxis], names[np.newaxis]
+
+    linked = A > 0
+    present = names != None
+    metrics = {
+        'degree_out': linked.sum(axis=-1),
+        'degree_in': linked.sum(axis=-2),
+        'strength_out': A.sum(axis=-1),
+        'strength_in': A.sum(axis=-2),
+        'betweenness': betweenness(A),
+        'eigenvector': eigenvector_centrality(A),
+        'clustering': clustering(A),
+    }
+
+    gi, pi = np.nonzero(present)
+    players = pd.DataFrame({'player_name': names[gi, pi]})
+    for name, values in metrics.items():
+        players[name] = values[gi, pi]
+
+    n = present.sum(axis=-1)
+    links = linked.sum(axis=(-1, -2)) - np.trace(linked, axis1=-2, axis2=-1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        density = np.where(n > 1, links/(n*(n-1)), 0.)
+    teams = pd.DataFrame({'players': n, 'links': links, 'passes': A.sum(axis=(-1, -2)),
+                          'density': density})
+
+    if groups is not None:
+        keys = groups.take(gi)
+        for k, name in enumerate(groups.names):
+            players.insert(k, name, keys.get_level_values(k))
+        teams.index = groups
+        teams = teams.reset_index()
+
+    return players, teams
@@ -1,52 +1,69 @@
 import pandas as pd
 import numpy as np
 import itertools
-import matplotlib.pyplot as plt
-import matplotlib.patheffects as mpe
-import matplotlib.cm as cm
-import matplotlib.colors as colors
 
+from match_report.match_events import as_frame
+from match_report.profiling import profiled
+
+
+# events counted as touches for average player locations
+TOUCH_EVENTS = ['Pass','Ball Receipt*','Carries','Shot','Ball Recovery','Clearance','Block',
+                'Goal Keeper','Miscontrol','Dribble','Interception']
+
+# match minute each period starts at (statsbomb timestamps restart each period)
+PERIOD_START_MINUTE = {1: 0, 2: 45, 3: 90, 4: 105, 5: 120}
+
+# full length of each period in minutes, before stoppage time (5 is the shoot out)
+PERIOD_MINUTES = {1: 45, 2: 45, 3: 15, 4: 15, 5: 0}
 
 
 def linear_color_scale(series,cmap,vmin,vmax):
+    # rgba colours of the whole series in one call, np array (n,4)
+    # matplotlib only imported when colours are needed
+    import matplotlib.cm as cm
+    import matplotlib.colors as colors
+
     norm = colors.Normalize(vmin, vmax, clip=True)
     mapper = cm.ScalarMappable(norm,cmap)
-    # convert to rgba
-    c = []
-    for i in series:
-        c.append(mapper.to_rgba(i))
-    return c
+    values = np.asarray(series,dtype=float)
+    return mapper.to_rgba(values).reshape(len(values),4)
 
 
+def rgba_columns(name):
+    # numeric colour columns of a table, e.g. xgc_color_r .. xgc_color_a
+    return [name+'_'+c for c in 'rgba']
 
+
+
+@profiled
 def player_ave_locations(df,color_scale):
     # locations based on average touches
+    df = as_frame(df)
     
     # team name and plyrs
     team_name = list(df['possession_team_name'].unique())
     lineup = list(df['player_name'].unique())
     
     # ave location of plyrs (based on touches)
-    touch_events = ['Pass','Ball Receipt*','Carries','Shot','Ball Recovery','Clearance','Block',
-               'Goal Keeper','Miscontrol','Dribble','Interception']
-    touches = df[df['event_type_name'].isin(touch_events)]
-    player_locs = touches.groupby('player_name')[['location_x','location_y']].mean()
-    player_touches = touches.groupby('player_name')['player_name'].count()
+    touches = df[df['event_type_name'].isin(TOUCH_EVENTS)]
+    player_locs = touches.groupby('player_name',observed=True)[['location_x','location_y']].mean()
+    player_touches = touches.groupby('player_name',observed=True)['player_name'].count()
     player_touches.name = 'touch_count'
     
     # xg 
-    player_locs['xg'] = df.groupby(['player_name'])['xg'].sum()
+    player_locs['xg'] = df.groupby(['player_name'],observed=True)['xg'].sum()
     
-    # linear color scale
-    player_locs['xg_colors'] = linear_color_scale(player_locs['xg'],color_scale,
-                                                  player_locs['xg'].min(),
-                                                  player_locs['xg'].max())
+    # linear color scale (rgba columns)
+    player_locs[rgba_columns('xg_color')] = linear_color_scale(player_locs['xg'],color_scale,
+                                                               player_locs['xg'].min(),
+                                                               player_locs['xg'].max())
     
     return player_locs.join(player_touches)
 
 
 def combination_finder(df):
     # search all combinations of list
+    df = as_frame(df)
     
     lineup = list(df['formation_player_name'].unique())
     
@@ -57,81 +74,192 @@ def combination_finder(df):
     return combs
 
 
+def pair_index(df,lineup):
+    """
+    unordered (player1, player2) pair position for each pass
+    pairs are numbered in the order of combination_finder
+
+    Arg
+    ------
+    df : pandas df with player_name and pass_recipient_name
+    lineup : df with formation_player_name
+
+    Out
+    -------
+    pairs : pandas df of player1, player2 (every lineup pair)
+    idx : np array of pair positions per row (-1 if not a lineup pair)
+
+    """
+
+    df = as_frame(df)
+    players = pd.Index(list(as_frame(lineup)['formation_player_name'].unique()))
+    n = len(players)
+
+    # same order as itertools.combinations
+    i, j = np.triu_indices(n, k=1)
+    pairs = pd.DataFrame({'player1':players.take(i),
+                          'player2':players.take(j)})
+
+    p = players.get_indexer(np.asarray(df['player_name'],dtype=object))
+    r = players.get_indexer(np.asarray(df['pass_recipient_name'],dtype=object))
+    lo = np.minimum(p,r)
+    hi = np.maximum(p,r)
+    valid = (lo >= 0) & (lo != hi)
+    idx = np.where(valid, lo*(2*n-lo-1)//2 + (hi-lo-1), -1)
+
+    return pairs, idx
+
+
+@profiled
 def pass_combination_counts(passes,lineup):
-    
-    combs = combination_finder(lineup)
-    
-    # pass counts
-    pass_combs= []   
-    for p1,p2 in combs:
-        p = (passes[((passes['player_name']==p1)&
-           (passes['pass_recipient_name']==p2))|
-          ((passes['player_name']==p2)&
-           (passes['pass_recipient_name']==p1))])[['player_name','pass_recipient_name','event_type_name']]
-        df = pd.DataFrame({'player1':p1,
-                  'player2':p2,
-                  'pass_count':len(p)},
-                 index=[0])
-        pass_combs.append(df)
-    
-    passes_df = pd.concat(pass_combs).reset_index(drop=True)
+    # completed pass counts for every lineup pair (either direction)
 
+    pairs, idx = pair_index(passes,lineup)
+    pairs['pass_count'] = np.bincount(idx[idx >= 0], minlength=len(pairs))
 
-    return passes_df
+    return pairs
 
 
-def pass_xgc(df):
-    # xg contribution for pass combinations
-    
-    # shot possessions
-    shot_possessions = df[df['event_type_name']=='Shot']['possession'].unique()
-    
-    # xg contribution per pass for each possession
-    xgc = []
-    for poss in shot_possessions:
-        d = df[df['possession']==poss].copy()
-        xg = d['xg'].sum()
-        passes = d.groupby(['player_name','pass_recipient_name'])['pass_recipient_name'].count()
-        xgc.append((xg/passes.sum())*passes)
-    
-    f = pd.concat(xgc).groupby(['player_name','pass_recipient_name']).sum()
-    f.name = 'xgc'
-    
+def possession_keys(df):
+    # possession ids restart each match
+    if 'match_id' in df.columns:
+        return ['match_id','possession']
+    return ['possession']
+
+
+def event_seconds(df):
+    """
+    match clock in seconds since kick off, with the periods laid end to end (as
+    playing_time.match_clock): statsbomb minutes restart at 45, 90 ... and timestamps at 0,
+    so first half stoppage time would otherwise overlap the start of the second half
+
+    a period starts on the clock after the previous period's full length (PERIOD_MINUTES)
+    or its last event when that is later, per match_id. compute the clock of frames that
+    are compared with each other in one call, a subset without stoppage time events can
+    start the next period earlier
+
+    Arg
+    ------
+    df : pandas df with period and minute/second (or timestamp), match_id when several matches
+
+    Out
+    -------
+    seconds : np array of float, aligned with df
+
+    """
+
+    if 'period' not in df.columns:
+        if 'minute' in df.columns and 'second' in df.columns:
+            # a single period
+            return (df['minute']*60 + df['second']).to_numpy(dtype=float)
+        raise ValueError('event_seconds needs minute and second, or timestamp and period')
+
+    period = np.asarray(df['period'])
+    # seconds since the period started
+    if 'minute' in df.columns and 'second' in df.columns:
+        start = pd.Series(period).map(PERIOD_START_MINUTE).to_numpy(dtype=float)*60
+        s = (df['minute']*60 + df['second']).to_numpy(dtype=float) - start
+    else:
+        s = pd.to_timedelta(df['timestamp'].astype(str)).dt.total_seconds().to_numpy()
+
+    keys = ['match_id'] if 'match_id' in df.columns else []
+    t = pd.DataFrame({k: np.asarray(df[k]) for k in keys})
+    t['period'] = period
+    t['s'] = s
+    length = t.groupby(keys+['period'])['s'].max()
+    full = length.index.get_level_values('period').map(PERIOD_MINUTES).to_numpy(dtype=float)*60
+    length = length.clip(lower=full)
+    # start of each period on the clock
+    offset = (length.groupby(level='match_id').cumsum() if keys else length.cumsum()) - length
+
+    idx = pd.MultiIndex.from_frame(t[keys+['period']]) if keys else pd.Index(period)
+    return s + offset.reindex(idx).to_numpy()
+
+
+def pass_xgc_rows(df,model='equal',half_life=10.0):
+    """
+    xg contribution of each pass row (see pass_xgc)
+
+    Out
+    -------
+    d : pandas df of player_name, pass_recipient_name and xgc, one row per event
+    sel : np array of bool, passes in a shot possession
+
+    """
+
+    df = as_frame(df)
+    keys = possession_keys(df)
+    d = df[keys+['player_name','pass_recipient_name']].reset_index(drop=True)
+    d['shot'] = np.asarray(df['event_type_name']=='Shot')
+    d['xg'] = np.asarray(df['xg'],dtype=float)
+
+    # passes are rows with a passer and a recipient
+    is_pass = np.asarray(d['player_name'].notna() & d['pass_recipient_name'].notna())
+    if model == 'equal':
+        d['w'] = is_pass.astype(float)
+    elif model == 'decay':
+        d['t'] = event_seconds(df)
+        t_end = d.groupby(keys,observed=True)['t'].transform('max').to_numpy()
+        d['w'] = np.where(is_pass, 0.5**((t_end-d['t'].to_numpy())/half_life), 0.)
+    else:
+        raise ValueError("model must be 'equal' or 'decay'")
+
+    # possession shots, xg and pass weights broadcast back to each row
+    poss = d.groupby(keys,observed=True)[['shot','xg','w']].transform('sum')
+    sel = is_pass & (poss['shot'] > 0).to_numpy() & (poss['w'] > 0).to_numpy()
+
+    d['xgc'] = (poss['xg']*d['w']/poss['w']).to_numpy()
+
+    return d, sel
+
+
+@profiled
+def pass_xgc(df,model='equal',half_life=10.0):
+    """
+    xg contribution for pass combinations
+    the xg of each shot possession is shared between the passes in it
+
+    Arg
+    ------
+    df : pandas df of events
+    model : 'equal' (same share per pass)
+            or 'decay' (share halves every half_life seconds before the end of the possession)
+    half_life : float seconds, for model='decay'
+
+    Out
+    -------
+    df : pandas df of player_name, pass_recipient_name, xgc
+
+    """
+
+    d, sel = pass_xgc_rows(df,model,half_life)
+    f = d[sel].groupby(['player_name','pass_recipient_name'],observed=True)['xgc'].sum()
+
     return pd.DataFrame(f).reset_index()
 
 
+@profiled
+def pass_combination_xgc(events,lineup,model='equal',half_life=10.0):
+    # xg contribution for every lineup pair (either direction), see pass_xgc for model
 
-def pass_combination_xgc(events,lineup):
-    
-    df = pass_xgc(events)
-    combs = combination_finder(lineup)
-    # pass counts
-    pass_combs= []   
-    for p1,p2 in combs:
-        p = (df[((df['player_name']==p1)&
-           (df['pass_recipient_name']==p2))|
-          ((df['player_name']==p2)&
-           (df['pass_recipient_name']==p1))])
-        d = pd.DataFrame({'player1':p1,
-                  'player2':p2,
-                  'xgc':p['xgc'].sum()},
-                 index=[0])
-        pass_combs.append(d)
-    
-    passes_df = pd.concat(pass_combs).reset_index(drop=True)
-    
-    
-    return passes_df
+    df = pass_xgc(events,model,half_life)
+    pairs, idx = pair_index(df,lineup)
+    valid = idx >= 0
+    pairs['xgc'] = np.bincount(idx[valid], weights=df['xgc'].to_numpy()[valid],
+                               minlength=len(pairs))
 
+    return pairs
 
-def pass_network_combinations_df(passes,events,lineup,color_scale):
-    # pass net counts, xgc and locations
+
+@profiled
+def pass_network_combinations_df(passes,events,lineup,color_scale,xgc_model='equal'):
+    # pass net counts, xgc and locations (xgc_model see pass_xgc)
     
     # pass counts
     passes = pass_combination_counts(passes,lineup)
     pass_df = passes[passes['pass_count']>0]
     # xg
-    pass_xgc = pass_combination_xgc(events,lineup)
+    pass_xgc = pass_combination_xgc(events,lineup,xgc_model)
     xgc_df = pass_xgc[pass_xgc['xgc']>0]
     
     # join with xgc info
@@ -147,9 +275,129 @@ def pass_network_combinations_df(passes,events,lineup,color_scale):
                                                                              'location_x':'loc_x2',
                                                                              'location_y':'loc_y2'}))
     )
-    master_df['xgc_colors'] = linear_color_scale(master_df['xgc'],
-                                                 color_scale,
-                                                 master_df['xgc'].min(),
-                                                 master_df['xgc'].max())
+    master_df[rgba_columns('xgc_color')] = linear_color_scale(master_df['xgc'],
+                                                              color_scale,
+                                                              master_df['xgc'].min(),
+                                                              master_df['xgc'].max())
     
-    return master_df
\ No newline at end of file
+    return master_df
+
+def rolling_windows(end,length=15,step=5):
+    # (start, end) minute windows of length every step, the last one covering end
+    n = int(max(end-length,0)//step) + 1
+    starts = np.arange(n)*step
+    if starts[-1] + length <= end:
+        starts = np.append(starts, starts[-1]+step)
+    return [(float(s), float(s+length)) for s in starts]
+
+
+def _window_sums(bucket,idx,weights,n_buckets,n_cols,lo,hi):
+    # sums of weights per window and column from running totals over time buckets
+    # each window is the running total at its end minus the running total at its start
+    ok = (bucket >= 0) & (bucket < n_buckets) & (idx >= 0)
+    per_bucket = np.bincount(bucket[ok]*n_cols + idx[ok], weights=weights[ok],
+                             minlength=n_buckets*n_cols).reshape(n_buckets,n_cols)
+    running = np.vstack([np.zeros((1,n_cols)), np.cumsum(per_bucket,axis=0)])
+    return running[hi] - running[lo]
+
+
+@profiled
+def pass_network_timeline(passes,events,lineup,color_scale,length=15,step=5,windows=None,
+                          xgc_model='equal'):
+    """
+    pass networks (as pass_network_combinations_df) for sliding windows of match time
+    events are binned once into the time buckets between window edges and the pair counts,
+    xgc and touch locations are running totals over the buckets, so each window costs a
+    subtraction rather than a pass over its events
+
+    xgc of a pass is taken from its whole possession, also when the possession
+    crosses a window edge
+
+    Arg
+    ------
+    passes : completed passes of the team
+    events : events of the team (touches, passes and shots)
+    lineup : df with formation_player_name
+    color_scale : matplotlib cmap (or name), colours scaled within each window
+    length, step : window length and step in minutes
+    windows : list of (start, end) minutes (end exclusive), overrides length and step
+    xgc_model : see pass_xgc
+
+    Out
+    -------
+    df : long df of window_start, window_end and the pass_network_combinations_df columns
+
+    """
+
+    passes = as_frame(passes)
+    events = as_frame(events)
+    # one clock for passes and events, so their periods start at the same time
+    cols = [c for c in ('match_id','period','minute','second','timestamp')
+            if c in passes.columns and c in events.columns]
+    t = event_seconds(pd.concat([passes[cols], events[cols]], ignore_index=True))/60
+    t_pass, t_event = t[:len(passes)], t[len(passes):]
+
+    if windows is None:
+        windows = rolling_windows(max(t_event.max(), t_pass.max()) if len(events) else length,
+                                  length, step)
+    starts = np.array([w[0] for w in windows], dtype=float)
+    ends = np.array([w[1] for w in windows], dtype=float)
+
+    # time buckets between every window edge
+    edges = np.unique(np.concatenate([starts, ends]))
+    n_buckets = len(edges) - 1
+    lo = np.searchsorted(edges, starts)
+    hi = np.searchsorted(edges, ends)
+
+    def bucket(t):
+        return np.searchsorted(edges, t, side='right') - 1
+
+    # pair counts
+    pairs, idx = pair_index(passes,lineup)
+    n_pairs = len(pairs)
+    counts = _window_sums(bucket(t_pass), idx, np.ones(len(passes)), n_buckets, n_pairs, lo, hi)
+
+    # xgc of every pass row in the events, and how many passes contribute
+    d, sel = pass_xgc_rows(events,xgc_model)
+    _, xidx = pair_index(d,lineup)
+    xidx = np.where(sel, xidx, -1)
+    b = bucket(t_event)
+    xgc = _window_sums(b, xidx, d['xgc'].to_numpy(), n_buckets, n_pairs, lo, hi)
+    n_xgc = _window_sums(b, xidx, np.ones(len(d)), n_buckets, n_pairs, lo, hi)
+    xgc = np.where(n_xgc > 0, xgc, 0.)
+
+    # touch locations per player
+    players = pd.Index(pd.unique(pairs[['player1','player2']].to_numpy().ravel()))
+    touch = np.asarray(events['event_type_name'].isin(TOUCH_EVENTS))
+    pidx = np.where(touch, players.get_indexer(np.asarray(events['player_name'],dtype=object)), -1)
+    x = np.asarray(events['location_x'],dtype=float)
+    y = np.asarray(events['location_y'],dtype=float)
+    pidx = np.where(np.isnan(x) | np.isnan(y), -1, pidx)
+    n_touch = _window_sums(b, pidx, np.ones(len(events)), n_buckets, len(players), lo, hi)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        loc_x = _window_sums(b, pidx, np.nan_to_num(x), n_buckets, len(players), lo, hi)/n_touch
+        loc_y = _window_sums(b, pidx, np.nan_to_num(y), n_buckets, len(players), lo, hi)/n_touch
+
+    # long table of linked pairs whose players have a location in the window
+    p1 = players.get_indexer(pairs['player1'])
+    p2 = players.get_indexer(pairs['player2'])
+    w, k = np.nonzero(((counts > 0) | (xgc > 0)) & (n_touch[:,p1] > 0) & (n_touch[:,p2] > 0))
+    df = pd.DataFrame({'window_start':starts[w], 'window_end':ends[w],
+                       'player1':pairs['player1'].to_numpy()[k],
+                       'player2':pairs['player2'].to_numpy()[k],
+                       'pass_count':counts[w,k].round().astype(np.int64),
+                       'xgc':xgc[w,k],
+                       'loc_x1':loc_x[w,p1[k]], 'loc_y1':loc_y[w,p1[k]],
+                       'loc_x2':loc_x[w,p2[k]], 'loc_y2':loc_y[w,p2[k]]})
+    df = df.sort_values(['window_start','window_end','player1','player2'],
+                        kind='mergesort').reset_index(drop=True)
+
+    # colours scaled within each window
+    cols = rgba_columns('xgc_color')
+    rgba = np.zeros((len(df),4))
+    for (s,e), rows in df.groupby(['window_start','window_end'],sort=False).indices.items():
+        v = df['xgc'].to_numpy()[rows]
+        rgba[rows] = linear_color_scale(v,color_scale,v.min(),v.max())
+    df[cols] = rgba
+
+    return df
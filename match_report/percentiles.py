@@ -0,0 +1,259 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from match_report import data_loader, kpis, playing_time
+from match_report.match_events import as_frame, duplicate_key_codes
+from match_report.playing_time import per90
+
+
+# kpi sets kept in a distribution store (the positional tables)
+POSITIONS = list(kpis.POSITION_GROUPS)
+
+
+def estimate_minutes(events, by='match_id'):
+    """
+    minutes each player spent in each position group, estimated as the time between
+    their first and last event in the group
+
+    Arg
+    ------
+    events : pandas df (or MatchEvents) with minute and second
+    by : column(s) grouped ahead of player_name (None for a single match)
+
+    Out
+    -------
+    minutes : pandas df, index (by, player_name), one column per position group
+
+    """
+
+    df = as_frame(events)
+    t = pd.Series(np.asarray(df['minute'], dtype=float) + np.asarray(df['second'], dtype=float)/60)
+    outer = [] if by is None else ([by] if isinstance(by, str) else list(by))
+
+    out = {}
+    for name in POSITIONS:
+        keys = [k.reset_index(drop=True) for k in kpis.kpi_keys(df, name, outer+['player_name'])]
+        span = t.groupby(keys, observed=True).agg(['min','max'])
+        out[name] = span['max'] - span['min']
+
+    minutes = pd.DataFrame(out).fillna(0)
+    minutes.index.names = outer+['player_name']
+    return minutes
+
+
+def _deduplicate(events):
+    # event_selector within each match, events legitimately identical across matches are kept
+    df = as_frame(events)
+    if 'match_id' not in df.columns:
+        return as_frame(data_loader.event_selector(events))
+    keep = ~pd.DataFrame({'m': np.asarray(df['match_id']),
+                          'k': duplicate_key_codes(df)}).duplicated().to_numpy()
+    return df[keep]
+
+
+def per90_tables(events, minutes=None, min_minutes=0, stint_table=None):
+    """
+    per 90 positional kpi tables, one row per player over every match in the events
+    minutes come from the lineups (playing_time.stints) unless minutes is given
+
+    Arg
+    ------
+    events : raw events (or MatchEvents) of one or more matches, duplicates are dropped
+             here (within each match) and the lineup rows give the stints
+    minutes : pandas df of minutes per (match_id, player_name) and position group,
+              e.g. estimate_minutes of the events (used instead of stints)
+    min_minutes : players with fewer minutes in a position group are left out of its table
+    stint_table : playing_time.stints of the matches (defaults to the stints of the events),
+                  events count in the position held at the time
+
+    Out
+    -------
+    tables : dict of position group -> pandas df of per 90 kpis plus minutes, index player_name
+
+    """
+
+    kpi_sets = {name: kpis.KPI_SETS[name] for name in POSITIONS}
+    if minutes is None and stint_table is None:
+        stint_table = lineup_stints(events)
+    df = _deduplicate(events)
+    if stint_table is not None:
+        df = df.assign(player_position_name=playing_time.event_positions(df, stint_table))
+        if minutes is None:
+            minutes = playing_time.position_minutes(stint_table)
+    tables = kpis.season_finish(kpis.season_sums(df, None, None, kpi_sets), kpi_sets)
+    total = minutes.groupby(level='player_name').sum()
+
+    out = {}
+    for name, table in tables.items():
+        m = total[name].reindex(table.index).fillna(0) if name in total else pd.Series(0., table.index)
+        table = per90(table, m)
+        table['minutes'] = m.to_numpy()
+        out[name] = table[(table['minutes'] > 0) & (table['minutes'] >= min_minutes)]
+
+    return out
+
+
+def lineup_stints(events):
+    """
+    playing_time.stints of raw events, checking every team of every match has a full
+    starting lineup (deduplicated events keep one lineup row per team)
+
+    Arg
+    ------
+    events : raw events (or MatchEvents)
+
+    Out
+    -------
+    df : pandas df of stints
+
+    """
+
+    df = as_frame(events)
+    s = playing_time.stints(df)
+    starters = s[s['start'] == 0].groupby(['match_id','team_name'])['player_name'].nunique()
+    teams = df[['match_id','team_name']].dropna().drop_duplicates()
+    found = starters.reindex(pd.MultiIndex.from_frame(teams)).fillna(0)
+    if (found < 11).any():
+        raise ValueError('incomplete lineups, pass the raw events (not event_selector output), '
+                         'a stint_table or minutes')
+    return s
+
+
+class DistributionStore:
+    """
+    league distributions of per 90 kpis by position group, saved in a directory
+    (meta.json plus one npz per position group of column sorted values and the player rows)
+    percentiles are searchsorted lookups, no events are needed once built
+
+        store = DistributionStore.build('league_store', percentiles.per90_tables(events))
+        DistributionStore('league_store').percentiles('cm', ['Player A','Player B'])
+
+    Arg
+    ------
+    path : str store directory
+
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, 'meta.json')) as f:
+            self.meta = json.load(f)
+        self._arrays = {}
+
+    @classmethod
+    def build(cls, path, tables, **meta):
+        """
+        write a store from per 90 tables
+
+        Arg
+        ------
+        path : str store directory
+        tables : dict of position group -> pandas df of per 90 kpis (index player_name),
+                 e.g. from per90_tables
+        meta : extra json values kept in meta.json (e.g. season='2019/20')
+
+        Out
+        -------
+        store : DistributionStore
+
+        """
+
+        os.makedirs(path, exist_ok=True)
+        positions = {}
+        for name, table in tables.items():
+            columns = [c for c in table.columns if c != 'minutes']
+            values = table[columns].to_numpy(dtype=float)
+            minutes = (table['minutes'].to_numpy(dtype=float) if 'minutes' in table
+                       else np.full(len(table), np.nan))
+            # write to a temp file first so readers never see a partial store
+            tmp = os.path.join(path, '%s.%d.tmp.npz' % (name, os.getpid()))
+            np.savez(tmp, sorted=np.sort(values, axis=0), values=values, minutes=minutes,
+                     players=np.asarray(table.index.astype(str), dtype=str))
+            os.replace(tmp, os.path.join(path, name + '.npz'))
+            positions[name] = {'kpis': columns, 'players': len(table)}
+
+        meta = dict(meta, positions=positions)
+        tmp = os.path.join(path, 'meta.json.%d.tmp' % os.getpid())
+        with open(tmp, 'w') as f:
+            json.dump(meta, f, indent=1)
+        os.replace(tmp, os.path.join(path, 'meta.json'))
+
+        return cls(path)
+
+    def kpis(self, position):
+        # kpi columns of a position group
+        return self.meta['positions'][position]['kpis']
+
+    def _load(self, position):
+        if position not in self._arrays:
+            with np.load(os.path.join(self.path, position + '.npz')) as f:
+                self._arrays[position] = {k: f[k] for k in f.files}
+        return self._arrays[position]
+
+    def players(self, position):
+        # per 90 kpis (and minutes) of every player in a position group's distribution
+        a = self._load(position)
+        table = pd.DataFrame(a['values'], columns=self.kpis(position),
+                             index=pd.Index(a['players'], name='player_name'))
+        table['minutes'] = a['minutes']
+        return table
+
+    def percentiles(self, position, values):
+        """
+        percentile (0-100) of kpi values within the stored distribution of a position group
+        the mean of the strict and weak ranks, as percentileofscore(kind='mean')
+
+        Arg
+        ------
+        position : str position group
+        values : list of player names in the store, or pandas df of per 90 kpis
+                 (e.g. per90 of this match's kpi tables)
+
+        Out
+        -------
+        df : pandas df of percentiles, one row per player and one column per kpi
+
+        """
+
+        columns = self.kpis(position)
+        if not isinstance(values, pd.DataFrame):
+            table = self.players(position)
+            values = table.loc[list(values), columns]
+        x = values.reindex(columns=columns).to_numpy(dtype=float)
+
+        s = self._load(position)['sorted']
+        n = len(s)
+        pct = np.full(x.shape, np.nan)
+        if n:
+            for j in range(len(columns)):
+                lo = np.searchsorted(s[:, j], x[:, j], side='left')
+                hi = np.searchsorted(s[:, j], x[:, j], side='right')
+                pct[:, j] = (lo + hi)/2/n*100
+        pct[np.isnan(x)] = np.nan
+
+        return pd.DataFrame(pct, index=values.index, columns=columns)
+
+
+def build_store(path, events, minutes=None, min_minutes=270, stint_table=None, **meta):
+    """
+    build a DistributionStore from the events of a league (one or more matches)
+
+    Arg
+    ------
+    path : str store directory
+    events : raw events (or MatchEvents) of the matches
+    minutes, stint_table : see per90_tables (minutes default to the lineup stints)
+    min_minutes : players with fewer minutes in a position group are left out of it
+    meta : extra json values kept in meta.json
+
+    Out
+    -------
+    store : DistributionStore
+
+    """
+
+    tables = per90_tables(events, minutes, min_minutes, stint_table)
+    return DistributionStore.build(path, tables, min_minutes=min_minutes, **meta)
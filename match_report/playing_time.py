@@ -0,0 +1,235 @@
+import numpy as np
+import pandas as pd
+
+from match_report import kpis
+from match_report.match_events import as_frame
+
+
+# events whose formation_player_name/formation_position_name rows set the players' positions
+LINEUP_EVENTS = ['Starting XI','Tactical Shift']
+
+# position group of each position (kpis.POSITION_GROUPS)
+POSITION_GROUP = {p: name for name, positions in kpis.POSITION_GROUPS.items() for p in positions}
+
+
+def rate_kpi(name):
+    # ratios (pass_%, xg/shot ...) are not scaled per 90
+    return '%' in name or '/' in name
+
+
+def per90(table, minutes):
+    """
+    scale the count kpis of a table to per 90 minutes (ratio kpis are kept)
+
+    Arg
+    ------
+    table : pandas df of kpis
+    minutes : pandas series of minutes aligned with table rows
+
+    Out
+    -------
+    df : pandas df
+
+    """
+
+    out = table.copy()
+    minutes = np.asarray(minutes, dtype=float)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        scale = np.where(minutes > 0, 90/minutes, np.nan)
+    for col in out.columns:
+        if not rate_kpi(col):
+            out[col] = out[col].to_numpy(dtype=float)*scale
+    return out
+
+
+def match_clock(events):
+    """
+    playing time in seconds since kick off, with the periods laid end to end
+    (statsbomb minutes restart at 45, 90 ... so first half stoppage time would overlap)
+
+    Arg
+    ------
+    events : pandas df (or MatchEvents) with match_id, period, minute and second
+
+    Out
+    -------
+    clock : np array of seconds, aligned with events
+    length : pandas series of playing time in seconds per match_id
+
+    """
+
+    df = as_frame(events)
+    t = pd.DataFrame({'match_id': df['match_id'].to_numpy(), 'period': df['period'].to_numpy(),
+                      't': df['minute'].to_numpy(dtype=float)*60 + df['second'].to_numpy(dtype=float)})
+    periods = t.groupby(['match_id','period'])['t'].agg(['min','max'])
+    # start of each period on the clock
+    length = periods['max'] - periods['min']
+    offset = length.groupby(level='match_id').cumsum() - length - periods['min']
+
+    idx = pd.MultiIndex.from_arrays([t['match_id'], t['period']])
+    clock = t['t'].to_numpy() + offset.reindex(idx).to_numpy()
+
+    return clock, length.groupby(level='match_id').sum()
+
+
+def stints(events):
+    """
+    on pitch intervals of every player in every position, from the lineup rows
+    (LINEUP_EVENTS formation_player_name/formation_position_name), substitutions
+    (the replacement takes the position of the player going off) and the end of the match
+
+    Arg
+    ------
+    events : pandas df (or MatchEvents) of one or more raw matches (before event_selector,
+             which keeps only one lineup row per team)
+
+    Out
+    -------
+    df : pandas df of match_id, team_name, player_name, position, start, end (match_clock
+         seconds) and minutes, one row per stint
+
+    """
+
+    df = as_frame(events)
+    clock, length = match_clock(df)
+    etype = df['event_type_name']
+    order = np.arange(len(df))*3
+
+    def changes(rows, player, position, k):
+        # player -> position from a time (position nan for leaving the pitch)
+        rows = np.asarray(rows, dtype=bool)
+        return pd.DataFrame({
+            'match_id': df['match_id'].to_numpy()[rows],
+            'team_name': np.asarray(df['team_name'], dtype=object)[rows],
+            'player_name': np.asarray(df[player], dtype=object)[rows],
+            'position': (np.asarray(df[position], dtype=object)[rows] if position is not None
+                         else np.full(rows.sum(), None, dtype=object)),
+            'start': clock[rows],
+            'order': order[rows] + k,
+        })
+
+    parts = [changes(etype.isin(LINEUP_EVENTS) & df['formation_player_name'].notna(),
+                     'formation_player_name', 'formation_position_name', 0)]
+    if 'substitution_replacement_name' in df.columns:
+        subs = (etype == 'Substitution') & df['substitution_replacement_name'].notna()
+        parts.append(changes(subs, 'player_name', None, 1))
+        parts.append(changes(subs, 'substitution_replacement_name', 'player_position_name', 2))
+
+    s = pd.concat(parts, ignore_index=True)
+    s = s[s['player_name'].notna()].sort_values(['match_id','team_name','player_name','start','order'],
+                                                kind='mergesort')
+    # a stint lasts until the player's next change, or the end of the match
+    nxt = s.groupby(['match_id','team_name','player_name'], sort=False)['start'].shift(-1)
+    s['end'] = nxt.fillna(s['match_id'].map(length))
+    s = s[s['position'].notna() & (s['end'] > s['start'])].drop(columns='order')
+    s['minutes'] = (s['end'] - s['start'])/60
+
+    return s.reset_index(drop=True)
+
+
+def event_positions(events, stint_table):
+    """
+    position each event's player held at the time of the event (from stints),
+    player_position_name where no stint covers the event
+
+    Arg
+    ------
+    events : pandas df (or MatchEvents)
+    stint_table : stints of the matches
+
+    Out
+    -------
+    positions : np array of position names (object), aligned with events
+
+    """
+
+    df = as_frame(events)
+    clock, _ = match_clock(df)
+
+    e = pd.DataFrame({'match_id': df['match_id'].to_numpy(),
+                      'team_name': np.asarray(df['team_name'], dtype=object),
+                      'player_name': np.asarray(df['player_name'], dtype=object),
+                      'clock': clock, 'row': np.arange(len(df))})
+    e = e[e['player_name'].notna()].sort_values('clock', kind='mergesort')
+    right = stint_table[['match_id','team_name','player_name','start','end','position']]
+    right = right.sort_values('start', kind='mergesort')
+    m = pd.merge_asof(e, right, left_on='clock', right_on='start',
+                      by=['match_id','team_name','player_name'], direction='backward')
+
+    positions = np.asarray(df['player_position_name'], dtype=object).copy()
+    found = (m['clock'] <= m['end']).to_numpy()
+    positions[m['row'].to_numpy()[found]] = m['position'].to_numpy()[found]
+
+    return positions
+
+
+def position_minutes(stint_table, by='match_id'):
+    """
+    minutes each player spent in each position group (kpis.POSITION_GROUPS)
+
+    Arg
+    ------
+    stint_table : stints of the matches
+    by : stint column(s) grouped ahead of player_name, e.g. 'match_id' or None for totals
+
+    Out
+    -------
+    minutes : pandas df, index (by, player_name), one column per position group plus
+              minutes (total on the pitch)
+
+    """
+
+    s = stint_table
+    keys = ([] if by is None else [by] if isinstance(by, str) else list(by)) + ['player_name']
+
+    group = s['position'].map(POSITION_GROUP)
+    table = (s.assign(group=group).groupby(keys+['group'], dropna=False)['minutes'].sum()
+             .unstack('group').reindex(columns=list(kpis.POSITION_GROUPS)).fillna(0))
+    table.columns.name = None
+    table['minutes'] = s.groupby(keys)['minutes'].sum()
+
+    return table
+
+
+def stint_kpis(all_events, stint_table, by='match_id', per_90=True, kpi_sets=None):
+    """
+    positional kpi tables with every event counted in the position its player held at the
+    time (lineup stints rather than player_position_name), one row per player and position,
+    for any number of matches in one pass
+
+    Arg
+    ------
+    all_events : all_events df (or MatchEvents)
+    stint_table : stints of the matches (from the raw events)
+    by : column(s) grouped ahead of player/position, e.g. 'match_id' (None for season totals)
+    per_90 : bool scale count kpis to per 90 minutes in the position
+    kpi_sets : dict of name -> (metrics, by, finish), defaults to the positional kpis.KPI_SETS
+
+    Out
+    -------
+    tables : dict of name -> pandas df of kpis plus minutes, index (by, player_name, position)
+
+    """
+
+    df = as_frame(all_events)
+    s = stint_table
+    if kpi_sets is None:
+        kpi_sets = {name: kpis.KPI_SETS[name] for name in kpis.POSITION_GROUPS}
+    outer = [] if by is None else ([by] if isinstance(by, str) else list(by))
+
+    df = df.assign(player_position_name=event_positions(df, s))
+    sums = kpis.season_sums(df, outer+['player_position_name'], None, kpi_sets)
+    tables = kpis.season_finish(sums, kpi_sets)
+
+    minutes = s.groupby(outer+['player_name','position'])['minutes'].sum()
+    out = {}
+    for name, table in tables.items():
+        table = table.reorder_levels(outer+['player_name','player_position_name'])
+        table.index = table.index.set_names(outer+['player_name','position'])
+        m = minutes.reindex(table.index).to_numpy()
+        if per_90:
+            table = per90(table, m)
+        table['minutes'] = m
+        out[name] = table.sort_index()
+
+    return out
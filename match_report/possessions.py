@@ -0,0 +1,288 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from match_report import data_loader
+from match_report.binning import PITCH_RANGE, cell_index, group_codes
+from match_report.match_events import as_frame
+from match_report.pass_net import event_seconds, possession_keys
+
+
+# possession zones, sixths of the pitch length by thirds of its width
+ZONE_BINS = (6,3)
+
+# build ups start in the own third and reach the final third
+OWN_THIRD = 40
+FINAL_THIRD = 80
+
+
+def sort_events(events):
+    """
+    events in possession order, stable so an export already in order is returned as is
+    possession table offsets are rows of this frame
+
+    Arg
+    ------
+    events : pandas df (or MatchEvents)
+
+    Out
+    -------
+    df : pandas df
+
+    """
+
+    df = as_frame(events)
+    keys = possession_keys(df)
+    order = np.lexsort([np.asarray(df[k]) for k in reversed(keys)])
+    if (order == np.arange(len(df))).all():
+        return df
+    return df.iloc[order]
+
+
+def _reduce(ufunc, values, start):
+    # per possession reduction of a row array
+    if len(start) == 0:
+        return np.zeros(0)
+    return ufunc.reduceat(np.asarray(values, dtype=float), start)
+
+
+def possession_table(events, bins=ZONE_BINS, extent=PITCH_RANGE):
+    """
+    compact possession table, one row per possession from a single pass over the events
+    locations are the possession team's own events (in its attacking direction)
+
+    Arg
+    ------
+    events : pandas df (or MatchEvents) of one or more matches in possession order
+             (see sort_events), deduplicated by event_selector
+    bins : (int,int) zone grid of start_zone / end_zone (zone = x bin * ny + y bin)
+    extent : ((x0,x1),(y0,y1))
+
+    Out
+    -------
+    df : pandas df of match_id (when in the events), possession, team_name (in possession),
+         start, end (rows [start, end) of the events), duration (seconds), events, passes,
+         passes_completed, shots, xg, shot (bool, the last own event is a shot),
+         start_x, start_y, end_x, end_y,
+         max_x (furthest x reached), start_zone and end_zone (-1 without a location)
+
+    """
+
+    df = as_frame(events)
+    keys = possession_keys(df)
+    n = len(df)
+
+    # a possession starts where any key changes
+    change = np.zeros(n, dtype=bool)
+    change[:1] = True
+    for k in keys:
+        v = np.asarray(df[k])
+        change[1:] |= v[1:] != v[:-1]
+    start = np.flatnonzero(change)
+    end = np.append(start[1:], n)[:len(start)].astype(np.int64)
+
+    team = np.asarray(df['possession_team_name'], dtype=object)
+    own = np.asarray(df['team_name'], dtype=object) == team
+    etype = np.asarray(df['event_type_name'], dtype=object)
+    is_pass = own & (etype == 'Pass')
+    is_shot = own & (etype == 'Shot')
+    completed = is_pass & np.asarray(df['outcome_name'].isnull())
+    xg = np.where(is_shot, np.nan_to_num(np.asarray(df['xg'], dtype=float)), 0.)
+    t = event_seconds(df)
+
+    x = np.asarray(df['location_x'], dtype=float)
+    y = np.asarray(df['location_y'], dtype=float)
+    located = np.flatnonzero(own & ~(np.isnan(x) | np.isnan(y)))
+    # first located row at or after start, last located row before end (-1 for none)
+    first = np.append(located, n)[np.searchsorted(located, start)]
+    first = np.where(first < end, first, -1)
+    last = np.insert(located, 0, -1)[np.searchsorted(located, end)]
+    last = np.where(last >= start, last, -1)
+    # last own row of each possession, located or not (-1 for none)
+    own_rows = np.flatnonzero(own)
+    last_own = np.insert(own_rows, 0, -1)[np.searchsorted(own_rows, end)]
+    last_own = np.where(last_own >= start, last_own, -1)
+
+    def at(values, rows):
+        out = np.full(len(rows), np.nan)
+        ok = rows >= 0
+        out[ok] = values[rows[ok]]
+        return out
+
+    xedges = np.linspace(extent[0][0], extent[0][1], bins[0]+1)
+    yedges = np.linspace(extent[1][0], extent[1][1], bins[1]+1)
+
+    def zone(px, py):
+        z = np.full(len(px), -1, dtype=np.int64)
+        ok = ~np.isnan(px)
+        z[ok] = cell_index(px[ok], py[ok], xedges, yedges)
+        return z
+
+    table = pd.DataFrame({k: np.asarray(df[k])[start] for k in keys})
+    table['team_name'] = team[start]
+    table['start'] = start
+    table['end'] = end
+    table['duration'] = _reduce(np.maximum, t, start) - _reduce(np.minimum, t, start)
+    table['events'] = end - start
+    table['passes'] = _reduce(np.add, is_pass, start).astype(np.int64)
+    table['passes_completed'] = _reduce(np.add, completed, start).astype(np.int64)
+    table['shots'] = _reduce(np.add, is_shot, start).astype(np.int64)
+    table['xg'] = _reduce(np.add, xg, start)
+    # ended in a shot, opposition events after it (keeper saves, clearances) aside
+    table['shot'] = (last_own >= 0) & (etype[np.maximum(last_own, 0)] == 'Shot')
+    table['start_x'], table['start_y'] = at(x, first), at(y, first)
+    table['end_x'], table['end_y'] = at(x, last), at(y, last)
+    max_x = _reduce(np.maximum, np.where(own, np.nan_to_num(x, nan=-np.inf), -np.inf), start)
+    table['max_x'] = np.where(np.isinf(max_x), np.nan, max_x)
+    table['start_zone'] = zone(table['start_x'].to_numpy(), table['start_y'].to_numpy())
+    table['end_zone'] = zone(table['end_x'].to_numpy(), table['end_y'].to_numpy())
+
+    if table.duplicated(keys).any():
+        raise ValueError('events are not in possession order, see sort_events')
+
+    return table
+
+
+def possession_rows(table):
+    """
+    table row of the possession of each event row (the inverse of start / end)
+
+    Out
+    -------
+    codes : np array of int64, aligned with the events the table was built from
+
+    """
+
+    return np.repeat(np.arange(len(table)), (table['end'] - table['start']).to_numpy())
+
+
+def xg_chain(events, table, by='player_name'):
+    """
+    xg chain: xg of every possession a player took part in (an own team event),
+    each possession counted once per player, from possession table lookups
+
+    Arg
+    ------
+    events : pandas df (or MatchEvents) the table was built from
+    table : possession_table of the events
+    by : column(s) to credit, e.g. 'player_name' or ['match_id','player_name']
+
+    Out
+    -------
+    df : pandas df of xg_chain, possessions and shot_possessions (ending in a shot), index by
+
+    """
+
+    df = as_frame(events)
+    if len(df) != (table['end'].iloc[-1] if len(table) else 0):
+        raise ValueError('table was not built from these events')
+
+    poss = possession_rows(table)
+    codes, groups = group_codes(df, by)
+    own = (np.asarray(df['team_name'], dtype=object)
+           == np.asarray(df['possession_team_name'], dtype=object))
+    ok = own & (codes >= 0)
+
+    # unique (group, possession) pairs
+    p = len(table)
+    pairs = np.unique(codes[ok].astype(np.int64)*p + poss[ok])
+    g, k = pairs // p, pairs % p
+    n_groups = 1 if groups is None else len(groups)
+
+    shot = table['shot'].to_numpy()[k]
+    return pd.DataFrame({
+        'xg_chain': np.bincount(g, weights=table['xg'].to_numpy()[k], minlength=n_groups),
+        'possessions': np.bincount(g, minlength=n_groups),
+        'shot_possessions': np.bincount(g[shot], minlength=n_groups),
+    }, index=groups)
+
+
+def possession_kpis(table, by='team_name'):
+    """
+    possession kpis from a possession table (no events needed)
+
+    Arg
+    ------
+    table : possession_table of one or more matches
+    by : table column(s) to group by, e.g. ['match_id','team_name']
+
+    Out
+    -------
+    df : pandas df of possessions, seconds/poss, passes/poss, pass%, shot% (ending in a
+         shot), xg, xg/poss and build_up% (own third starts reaching the final third), index by
+
+    """
+
+    t = table.assign(
+        build_up=(table['start_x'] < OWN_THIRD).astype(int),
+        reached=((table['start_x'] < OWN_THIRD) & (table['max_x'] >= FINAL_THIRD)).astype(int))
+    g = t.groupby(by)
+    s = g[['duration','passes','passes_completed','shot','xg','build_up','reached']].sum()
+
+    df = pd.DataFrame(index=s.index)
+    df['possessions'] = g.size()
+    df['seconds/poss'] = s['duration']/df['possessions']
+    df['passes/poss'] = s['passes']/df['possessions']
+    df['pass%'] = s['passes_completed']/s['passes']*100
+    df['shot%'] = s['shot']/df['possessions']*100
+    df['xg'] = s['xg']
+    df['xg/poss'] = s['xg']/df['possessions']
+    df['build_up%'] = s['reached']/s['build_up']*100
+
+    return round(df, 2)
+
+
+def possessions_path(path, cache_dir=None):
+    # possession table file kept next to the parquet event cache
+    cache = data_loader.parquet_path(path, cache_dir) if path.endswith('.csv') else path
+    return os.path.splitext(cache)[0] + '.possessions.parquet'
+
+
+def load_events(path, columns=None, cache_dir=None):
+    """
+    deduplicated events of a match file in possession order, the rows the stored
+    possession table offsets refer to (whichever columns are loaded)
+
+    Arg
+    ------
+    path : str raw csv or parquet cache file
+    columns, cache_dir : see data_loader.load_events
+
+    Out
+    -------
+    events : pandas df
+
+    """
+
+    events = data_loader.event_selector(data_loader.load_events(path, columns, cache_dir))
+    return sort_events(events).reset_index(drop=True)
+
+
+def load_table(path, cache_dir=None):
+    """
+    possession table of a match file, built once and stored next to the event cache
+    (rebuilt when the match file is newer)
+
+    Arg
+    ------
+    path : str raw csv or parquet cache file
+    cache_dir : str (defaults to the csv directory)
+
+    Out
+    -------
+    table : pandas df (see possession_table), offsets into load_events(path)
+
+    """
+
+    out = possessions_path(path, cache_dir)
+    if os.path.exists(out) and os.path.getmtime(out) >= os.path.getmtime(path):
+        return pd.read_parquet(out)
+
+    table = possession_table(load_events(path, 'possessions', cache_dir))
+    # write to a temp file first so readers never see a partial table
+    tmp = out + '.%d.tmp' % os.getpid()
+    table.to_parquet(tmp, index=False)
+    os.replace(tmp, out)
+
+    return table
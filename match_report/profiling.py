@@ -0,0 +1,338 @@
+import contextlib
+import functools
+import json
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from match_report.match_events import MatchEvents
+
+
+# profiler recording calls, None when profiling is off
+_active = None
+
+
+class _Frame:
+    # a call or stage in progress
+
+    __slots__ = ('name', 'stack', 'start', 'rows_in', 'rows_out', 'child_seconds', 'mem_start',
+                 'peak')
+
+    def __init__(self, name, stack, rows_in):
+        self.name = name
+        self.stack = stack
+        self.rows_in = rows_in
+        self.rows_out = None
+        self.child_seconds = 0.0
+        self.mem_start = None
+        self.peak = 0
+        self.start = time.perf_counter()
+
+
+class _Null:
+    # stand in for a stage when profiling is off (rows_out is discarded)
+    rows_out = None
+
+
+class Profiler:
+    """
+    records wall time, rows in/out and (optionally) peak memory of every profiled call
+    and stage while active, one record per call
+
+        with profiling.Profiler() as prof:
+            with prof.match('m1'):
+                tables = batch.match_tables(raw_csv)
+        prof.summary()
+
+    the public pipeline functions of data_loader, kpis, pass_net and utils are profiled
+    (not their small helpers, which would only add noise to the stacks), calls are only
+    timed inside a `with Profiler()` block (one active profiler per process, calls from
+    other threads are recorded too)
+
+    Arg
+    ------
+    memory : bool, record the peak memory allocated during each call with tracemalloc
+             (slows the profiled code down several times)
+
+    """
+
+    def __init__(self, memory=False):
+        self.memory = memory
+        self.records = []
+        self.match_id = None
+        self._local = threading.local()
+        self._previous = None
+        self._tracing = False
+
+    def __enter__(self):
+        global _active
+        if self.memory:
+            import tracemalloc
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._tracing = True
+        self._previous, _active = _active, self
+        return self
+
+    def __exit__(self, *exc):
+        global _active
+        _active = self._previous
+        if self._tracing:
+            import tracemalloc
+            tracemalloc.stop()
+            self._tracing = False
+        return False
+
+    @contextlib.contextmanager
+    def match(self, match_id):
+        # label the records of a block with a match
+        previous, self.match_id = self.match_id, match_id
+        try:
+            yield self
+        finally:
+            self.match_id = previous
+
+    def _stack(self):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _enter(self, name, rows_in):
+        stack = self._stack()
+        path = (stack[-1].stack + (name,)) if stack else (name,)
+        frame = _Frame(name, path, rows_in)
+        if self.memory:
+            import tracemalloc
+            current, peak = tracemalloc.get_traced_memory()
+            if stack:
+                stack[-1].peak = max(stack[-1].peak, peak)
+            tracemalloc.reset_peak()
+            frame.mem_start = current
+        stack.append(frame)
+        return frame
+
+    def _exit(self, frame, error=False):
+        seconds = time.perf_counter() - frame.start
+        stack = self._stack()
+        stack.pop()
+        if stack:
+            stack[-1].child_seconds += seconds
+
+        peak = None
+        if frame.mem_start is not None:
+            import tracemalloc
+            frame.peak = max(frame.peak, tracemalloc.get_traced_memory()[1])
+            peak = frame.peak - frame.mem_start
+            if stack:
+                stack[-1].peak = max(stack[-1].peak, frame.peak)
+
+        self.records.append({
+            'match': self.match_id,
+            'function': frame.name,
+            'stack': ';'.join(frame.stack),
+            'seconds': seconds,
+            'self_seconds': seconds - frame.child_seconds,
+            'rows_in': frame.rows_in,
+            'rows_out': frame.rows_out,
+            'peak_bytes': peak,
+            'error': error,
+        })
+
+    def summary(self, by='function'):
+        # see summary
+        return summary(self.records, by)
+
+    def folded(self):
+        # see folded
+        return folded(self.records)
+
+    def save(self, path):
+        # see save
+        return save(self.records, path)
+
+
+def _rows(value):
+    # row count of a table like value (first table of a tuple), None otherwise
+    if isinstance(value, (pd.DataFrame, pd.Series, MatchEvents, np.ndarray)):
+        return len(value)
+    if isinstance(value, tuple):
+        for v in value:
+            n = _rows(v)
+            if n is not None:
+                return n
+    return None
+
+
+def _name(func):
+    # module (without the package) and qualified name of a function
+    return '%s.%s' % (func.__module__.rsplit('.', 1)[-1], func.__qualname__)
+
+
+def profiled(func):
+    """
+    decorator recording each call of func while a Profiler is active
+    rows in are those of the first table argument, rows out those of the result
+    when no profiler is active the call costs one global lookup
+
+    Arg
+    ------
+    func : function
+
+    Out
+    -------
+    wrapper : function (same name, docstring and attributes)
+
+    """
+
+    name = _name(func)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        prof = _active
+        if prof is None:
+            return func(*args, **kwargs)
+
+        rows_in = None
+        for value in args + tuple(kwargs.values()):
+            rows_in = _rows(value)
+            if rows_in is not None:
+                break
+        frame = prof._enter(name, rows_in)
+        error = True
+        try:
+            out = func(*args, **kwargs)
+            frame.rows_out = _rows(out)
+            error = False
+            return out
+        finally:
+            prof._exit(frame, error)
+
+    return wrapper
+
+
+@contextlib.contextmanager
+def stage(name, rows_in=None):
+    """
+    context manager recording a block of code (e.g. reading a csv) as one call
+    set rows_out on the object it yields to record the rows produced
+
+        with profiling.stage('read_csv') as s:
+            raw_csv = pd.read_csv(path)
+            s.rows_out = len(raw_csv)
+
+    Arg
+    ------
+    name : str
+    rows_in : int rows going into the block (optional)
+
+    """
+
+    prof = _active
+    if prof is None:
+        yield _Null()
+        return
+
+    frame = prof._enter(name, rows_in)
+    error = True
+    try:
+        yield frame
+        error = False
+    finally:
+        prof._exit(frame, error)
+
+
+def summary(records, by='function'):
+    """
+    aggregate call records
+
+    Arg
+    ------
+    records : list of Profiler records
+    by : column(s) to group on, 'function', ['match','function'] for per match timings,
+         'match' for match totals (top level calls only)
+
+    Out
+    -------
+    df : pandas df of calls, seconds, self_seconds, rows_in, rows_out and the max
+         peak_bytes per group, slowest first
+
+    """
+
+    columns = ['match','function','stack','seconds','self_seconds','rows_in','rows_out',
+               'peak_bytes','error']
+    df = pd.DataFrame(records, columns=columns)
+    keys = [by] if isinstance(by, str) else list(by)
+    if 'function' not in keys:
+        # totals from the outermost calls, nested calls are already included
+        df = df[~df['stack'].str.contains(';', regex=False)]
+
+    df = df.astype({'seconds': float, 'self_seconds': float, 'rows_in': float, 'rows_out': float,
+                    'peak_bytes': float})
+    out = df.groupby(keys, dropna=False, sort=False).agg(
+        calls=('seconds', 'size'), seconds=('seconds', 'sum'),
+        self_seconds=('self_seconds', 'sum'), rows_in=('rows_in', 'sum'),
+        rows_out=('rows_out', 'sum'), peak_bytes=('peak_bytes', 'max'),
+        errors=('error', 'sum'))
+
+    return out.sort_values('seconds', ascending=False)
+
+
+def folded(records):
+    """
+    flame graph summary in the folded stack format (one 'a;b;c microseconds' line per stack,
+    self time only), readable by flamegraph.pl or speedscope
+    stacks start with the match when calls were labelled with one
+
+    Arg
+    ------
+    records : list of Profiler records
+
+    Out
+    -------
+    lines : list of str, largest first
+
+    """
+
+    totals = {}
+    for r in records:
+        stack = r['stack'] if r['match'] is None else '%s;%s' % (r['match'], r['stack'])
+        totals[stack] = totals.get(stack, 0.0) + r['self_seconds']
+
+    lines = sorted(totals.items(), key=lambda kv: -kv[1])
+    return ['%s %d' % (stack, round(s*1e6)) for stack, s in lines]
+
+
+def save(records, path):
+    """
+    write call records to json (with per function and per match summaries), or to the
+    folded flame format when path ends with .folded
+
+    Arg
+    ------
+    records : list of Profiler records
+    path : str
+
+    Out
+    -------
+    path : str
+
+    """
+
+    if path.endswith('.folded'):
+        with open(path, 'w') as f:
+            f.write('\n'.join(folded(records)) + '\n')
+        return path
+
+    def table(df):
+        return json.loads(df.reset_index().to_json(orient='records'))
+
+    out = {'functions': table(summary(records, 'function')),
+           'matches': table(summary(records, 'match')),
+           'records': records}
+    with open(path, 'w') as f:
+        json.dump(out, f, indent=1)
+
+    return path
@@ -0,0 +1,236 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import LineCollection, PatchCollection
+from matplotlib.figure import Figure
+from matplotlib.patches import Circle
+
+from match_report import pass_net
+
+
+# 120x80 Statsbomb pitch markings as line segments ((x0,y0),(x1,y1))
+PITCH_LINES = [
+    # outline & centre line
+    ((0,0),(0,80)), ((0,0),(120,0)), ((120,0),(120,80)), ((0,80),(120,80)), ((60,0),(60,80)),
+    # left penalty area
+    ((0,18),(18,18)), ((0,62),(18,62)), ((18,18),(18,62)),
+    # right penalty area
+    ((102,18),(120,18)), ((102,18),(102,62)), ((102,62),(120,62)),
+    # left 6-yard box
+    ((0,30),(6,30)), ((6,30),(6,50)), ((0,50),(6,50)),
+    # right 6-yard box
+    ((114,30),(120,30)), ((114,30),(114,50)), ((114,50),(120,50)),
+]
+
+# circles ((x,y), radius, filled): centre circle, centre spot, penalty spots
+PITCH_CIRCLES = [((60,40),12,False), ((60,40),0.5,True), ((12,40),0.5,True), ((108,40),0.5,True)]
+
+# axes limits around the pitch
+PITCH_EXTENT = (-2, 122, -2, 82)
+
+
+def draw_pitch(ax, opacity=0.7, color='black', background=False, fit=True):
+    """
+    draw the pitch markings in two collections (lines and circles)
+    or as a single cached pre-rendered image
+
+    Arg
+    ------
+    ax : matplotlib axes
+    opacity : float
+    color : str
+    background : bool, draw the cached raster image (fastest for png output)
+    fit : bool, set equal aspect axes limits around the pitch (otherwise autoscale)
+
+    """
+
+    if background:
+        ax.imshow(pitch_image(opacity, color), extent=PITCH_EXTENT, origin='upper',
+                  interpolation='bilinear', zorder=-10)
+    else:
+        ax.add_collection(LineCollection(PITCH_LINES, colors=color, alpha=opacity))
+        outlines = [Circle(xy, r) for xy, r, filled in PITCH_CIRCLES if not filled]
+        spots = [Circle(xy, r) for xy, r, filled in PITCH_CIRCLES if filled]
+        ax.add_collection(PatchCollection(outlines, facecolor='none', edgecolor=color, alpha=opacity))
+        ax.add_collection(PatchCollection(spots, facecolor=color, edgecolor=color, alpha=opacity))
+
+    if fit:
+        ax.set_xlim(PITCH_EXTENT[0], PITCH_EXTENT[1])
+        ax.set_ylim(PITCH_EXTENT[2], PITCH_EXTENT[3])
+        ax.set_aspect('equal')
+    else:
+        ax.autoscale_view()
+    ax.set_axis_off()
+
+
+@lru_cache(maxsize=16)
+def pitch_image(opacity=0.7, color='black', width=1240):
+    """
+    pitch markings pre-rendered once to an RGBA array (cached per opacity and colour)
+
+    Out
+    -------
+    image : np array (h, w, 4) covering PITCH_EXTENT
+
+    """
+
+    w = PITCH_EXTENT[1] - PITCH_EXTENT[0]
+    h = PITCH_EXTENT[3] - PITCH_EXTENT[2]
+    dpi = 100
+    fig = Figure(figsize=(width/dpi, width*h/w/dpi), dpi=dpi)
+    canvas = FigureCanvasAgg(fig)
+    fig.patch.set_alpha(0)
+    ax = fig.add_axes([0, 0, 1, 1])
+    draw_pitch(ax, opacity, color)
+    canvas.draw()
+    image = np.asarray(canvas.buffer_rgba()).copy()
+    image.setflags(write=False)
+
+    return image
+
+
+def pitch_figure(w, h, opacity=0.7, background=False):
+    """
+    headless (Agg) figure with a pitch, without pyplot's global figure state
+
+    Arg
+    ------
+    w : width of plot (inches)
+    h : height of plot (inches)
+    opacity : float
+    background : bool, see draw_pitch
+
+    Out
+    -------
+    fig,ax
+
+    """
+
+    fig = Figure(figsize=(w, h))
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot(111)
+    draw_pitch(ax, opacity, background=background)
+
+    return fig, ax
+
+
+def draw_events(ax, x, y, sizes=20, colors='tab:red', **kwargs):
+    # all event markers in one scatter call
+    return ax.scatter(x, y, s=sizes, c=colors, **kwargs)
+
+
+def draw_density(ax, density, xc, yc, levels=8, cmap='Reds', **kwargs):
+    """
+    filled contours of a density surface (density.kde), the lowest band left empty
+
+    Arg
+    ------
+    ax : matplotlib axes
+    density : np array (nx, ny)
+    xc, yc : np arrays of cell centres
+    levels : int number of contour levels
+    cmap : matplotlib cmap (or name)
+
+    """
+
+    top = float(np.max(density))
+    if top <= 0:
+        return None
+    return ax.contourf(xc, yc, density.T, levels=np.linspace(0, top, levels+1)[1:], cmap=cmap,
+                       **kwargs)
+
+
+def draw_passes(ax, x1, y1, x2, y2, widths=1, colors='tab:blue', arrows=False, **kwargs):
+    """
+    draw every pass in one collection
+
+    Arg
+    ------
+    ax : matplotlib axes
+    x1, y1, x2, y2 : arrays of start and end locations
+    widths : float or array of line widths
+    colors : colour or array of colours (rgba rows)
+    arrows : bool, draw arrows (single quiver call) rather than lines
+
+    """
+
+    x1, y1, x2, y2 = (np.asarray(a, dtype=float) for a in (x1, y1, x2, y2))
+    if arrows:
+        return ax.quiver(x1, y1, x2-x1, y2-y1, angles='xy', scale_units='xy', scale=1,
+                         color=colors, width=0.002*np.mean(widths), **kwargs)
+
+    segments = np.stack([np.column_stack([x1, y1]), np.column_stack([x2, y2])], axis=1)
+    return ax.add_collection(LineCollection(segments, linewidths=widths, colors=colors, **kwargs))
+
+
+def draw_pass_network(ax, player_locs, network, node_scale=8, width_scale=0.5, labels=True):
+    """
+    pass network from pass_net.player_ave_locations and pass_net.pass_network_combinations_df
+    nodes in one scatter and links in one line collection
+
+    Arg
+    ------
+    ax : matplotlib axes
+    player_locs : df with location_x, location_y, touch_count (index player names)
+    network : df with loc_x1, loc_y1, loc_x2, loc_y2, pass_count and xgc_color_r/g/b/a
+
+    """
+
+    draw_passes(ax, network['loc_x1'], network['loc_y1'], network['loc_x2'], network['loc_y2'],
+                widths=network['pass_count'].to_numpy()*width_scale,
+                colors=network[pass_net.rgba_columns('xgc_color')].to_numpy(), zorder=1)
+    ax.scatter(player_locs['location_x'], player_locs['location_y'],
+               s=player_locs['touch_count']*node_scale, edgecolors='k', facecolors='white',
+               linewidth=2, zorder=10)
+    if labels:
+        for name, x, y in zip(player_locs.index, player_locs['location_x'], player_locs['location_y']):
+            ax.annotate(str(name).split()[-1], (x+1.5, y+3), weight='bold', fontsize=12, zorder=11)
+    ax.invert_yaxis()
+
+
+def _render_job(job, out_dir, fmt, size, dpi, opacity, background):
+    # worker: draw one figure and save it
+    name, draw, kwargs = job
+    fig, ax = pitch_figure(size[0], size[1], opacity=opacity, background=background)
+    draw(ax, **kwargs)
+    path = os.path.join(out_dir, '%s.%s' % (name, fmt))
+    fig.savefig(path, dpi=dpi, bbox_inches='tight')
+    return path
+
+
+def render_batch(jobs, out_dir, fmt='png', size=(12, 8), dpi=100, opacity=0.2, background=None,
+                 workers=None):
+    """
+    render many pitch figures to files in parallel worker processes
+
+    Arg
+    ------
+    jobs : list of (name, draw, kwargs), draw(ax, **kwargs) is a module level function
+           that draws onto a pitch axes
+    out_dir : str
+    fmt : 'png' or 'svg'
+    size : (w, h) inches
+    dpi : int
+    opacity : float of the pitch markings
+    background : bool, cached raster pitch (default True for png, vector pitch for svg)
+    workers : int worker processes (None uses all cpus, 0 renders in this process)
+
+    Out
+    -------
+    paths : list of written files (in job order)
+
+    """
+
+    os.makedirs(out_dir, exist_ok=True)
+    if background is None:
+        background = fmt == 'png'
+
+    if workers == 0:
+        return [_render_job(j, out_dir, fmt, size, dpi, opacity, background) for j in jobs]
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_render_job, j, out_dir, fmt, size, dpi, opacity, background) for j in jobs]
+        return [f.result() for f in futures]
@@ -0,0 +1,385 @@
+import hashlib
+import json
+import os
+import pickle
+import sys
+import threading
+
+import numpy as np
+import pandas as pd
+
+from match_report.match_events import MatchEvents
+
+
+# file content hashes, keyed on (path, size, modified time)
+_FILE_HASHES = {}
+
+
+def file_hash(path):
+    """
+    content hash of a file (only re-read when its size or modified time changes)
+
+    Arg
+    ------
+    path : str
+
+    Out
+    -------
+    hash : str hex digest
+
+    """
+
+    path = os.path.abspath(path)
+    st = os.stat(path)
+    key = (path, st.st_size, st.st_mtime_ns)
+    if key not in _FILE_HASHES:
+        h = hashlib.blake2b(digest_size=16)
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                h.update(block)
+        _FILE_HASHES[key] = h.hexdigest()
+    return _FILE_HASHES[key]
+
+
+def code_version(func):
+    """
+    version of a function for cache keys: its cache_version attribute (default 0)
+    plus a hash of every module of its package, so any code change invalidates results
+
+    Out
+    -------
+    version : str
+
+    """
+
+    module = sys.modules.get(func.__module__)
+    path = getattr(module, '__file__', None)
+    if not path or not os.path.exists(path):
+        return str(getattr(func, 'cache_version', 0))
+
+    folder = os.path.dirname(os.path.abspath(path))
+    if '.' not in func.__module__:
+        files = [path]
+    else:
+        files = sorted(os.path.join(folder, f) for f in os.listdir(folder) if f.endswith('.py'))
+    h = hashlib.blake2b(''.join(file_hash(f) for f in files).encode(), digest_size=8)
+
+    return '%s:%s' % (getattr(func, 'cache_version', 0), h.hexdigest())
+
+
+class Source:
+    """
+    match file argument of a cached call
+    keyed on the file contents and the loader, and only loaded when the result is not cached
+
+    Arg
+    ------
+    path : str path to a match csv or parquet file
+    loader : function path -> pandas df (defaults to pd.read_csv / data_loader.load_events)
+
+    """
+
+    def __init__(self, path, loader=None):
+        self.path = path
+        self.loader = loader
+
+    def hash(self):
+        return file_hash(self.path)
+
+    def load(self):
+        if self.loader is not None:
+            return self.loader(self.path)
+        if self.path.endswith('.csv'):
+            return pd.read_csv(self.path, low_memory=False)
+        from match_report import data_loader
+        return data_loader.load_events(self.path)
+
+
+def _update(h, value):
+    # add an argument to a key hash
+    if isinstance(value, Source):
+        # the same file loaded differently (csv or typed parquet) gives different results
+        h.update(b'source' + value.hash().encode())
+        _update(h, 'default' if value.loader is None else value.loader)
+    elif isinstance(value, MatchEvents):
+        _update(h, value.frame)
+    elif isinstance(value, (pd.DataFrame, pd.Series)):
+        names = list(value.columns) if isinstance(value, pd.DataFrame) else [value.name]
+        h.update(repr((type(value).__name__, names, value.shape)).encode())
+        h.update(pd.util.hash_pandas_object(value, index=True).to_numpy().tobytes())
+    elif isinstance(value, np.ndarray):
+        h.update(repr((value.dtype.str, value.shape)).encode())
+        h.update(np.ascontiguousarray(value).tobytes())
+    elif isinstance(value, (list, tuple)):
+        h.update(b'(')
+        for v in value:
+            _update(h, v)
+        h.update(b')')
+    elif isinstance(value, dict):
+        for k in sorted(value, key=repr):
+            h.update(repr(k).encode())
+            _update(h, value[k])
+    elif isinstance(value, ResultCache):
+        h.update(b'cache')
+    elif callable(value) and hasattr(value, '__qualname__'):
+        h.update(('%s.%s' % (value.__module__, value.__qualname__)).encode())
+    else:
+        r = repr(value)
+        if ' at 0x' in r:
+            # default repr changes every run (e.g. a cmap object), key on the pickled value
+            h.update(pickle.dumps(value, protocol=4))
+        else:
+            h.update(r.encode())
+
+
+class ResultCache:
+    """
+    content addressed on-disk cache of analysis results
+    a result is keyed on the function, its code version and its arguments, where match files
+    (Source) are keyed on their contents and dataframes on their values, so unchanged reruns
+    load results instead of recomputing them
+
+    dataframes are stored as parquet (when pyarrow is installed), arrays as npz and anything
+    else pickled, each with a json file of the match file paths it was computed from.
+    the least recently used results are evicted beyond max_bytes
+
+    Arg
+    ------
+    cache_dir : str
+    max_bytes : int size bound of the cache directory
+
+    """
+
+    def __init__(self, cache_dir, max_bytes=1 << 30):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def key(self, func, args=(), kwargs=None):
+        """
+        cache file name stem of a call: <function>-<source hash>-<call hash>
+
+        Out
+        -------
+        key : str
+
+        """
+
+        kwargs = kwargs or {}
+        sources = [v for v in list(args)+list(kwargs.values()) if isinstance(v, Source)]
+        src = hashlib.blake2b(''.join(s.hash() for s in sources).encode(),
+                              digest_size=8).hexdigest() if sources else 'none'
+
+        h = hashlib.blake2b(digest_size=16)
+        h.update(code_version(func).encode())
+        _update(h, args)
+        _update(h, kwargs)
+
+        return '%s.%s-%s-%s' % (func.__module__, func.__qualname__, src, h.hexdigest())
+
+    def _entries(self):
+        # (path, size, last used) of every cached result
+        entries = []
+        for e in os.scandir(self.cache_dir):
+            if e.is_file() and not e.name.endswith(('.tmp', '.json')):
+                st = e.stat()
+                entries.append((e.path, st.st_size, st.st_mtime))
+        return entries
+
+    def _path(self, key):
+        for ext in ('.parquet', '.npz', '.pkl'):
+            path = os.path.join(self.cache_dir, key + ext)
+            if os.path.exists(path):
+                return path
+        return None
+
+    def _remove(self, path):
+        # a result file and its meta data
+        for p in (path, os.path.splitext(path)[0] + '.json'):
+            try:
+                os.remove(p)
+            except FileNotFoundError:
+                pass
+
+    def sources(self, path):
+        """
+        absolute paths of the match files a cached result was computed from
+
+        Arg
+        ------
+        path : str cached result file
+
+        Out
+        -------
+        paths : list of str (empty when the meta data is missing)
+
+        """
+
+        try:
+            with open(os.path.splitext(path)[0] + '.json') as f:
+                return json.load(f)['sources']
+        except (OSError, ValueError, KeyError):
+            return []
+
+    def get(self, key):
+        """
+        cached result of a key
+
+        Out
+        -------
+        found : bool
+        value : the result (None if not found)
+
+        """
+
+        path = self._path(key)
+        if path is None:
+            return False, None
+        try:
+            if path.endswith('.parquet'):
+                value = pd.read_parquet(path)
+            elif path.endswith('.npz'):
+                with np.load(path, allow_pickle=False) as f:
+                    value = f['value'] if list(f.keys()) == ['value'] else dict(f)
+            else:
+                with open(path, 'rb') as f:
+                    value = pickle.load(f)
+        except (OSError, ValueError, EOFError, pickle.UnpicklingError):
+            # partial or corrupt file, recompute
+            return False, None
+        # mark as recently used
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+        return True, value
+
+    def put(self, key, value, sources=()):
+        """
+        store a result and evict the least recently used results beyond max_bytes
+
+        Arg
+        ------
+        key : str
+        value : result
+        sources : list of match file paths the result was computed from (see invalidate)
+
+        Out
+        -------
+        path : str of the stored file
+
+        """
+
+        stem = os.path.join(self.cache_dir, key)
+        # unique per process and thread (the ingestion service runs calls in threads)
+        tmp = stem + '.%d.%d.tmp' % (os.getpid(), threading.get_ident())
+        # meta data first, so every result has it
+        with open(tmp, 'w') as f:
+            json.dump({'sources': [os.path.abspath(p) for p in sources]}, f)
+        os.replace(tmp, stem + '.json')
+
+        path = None
+        if isinstance(value, pd.DataFrame):
+            try:
+                value.to_parquet(tmp)
+                # only keep parquet when it round trips exactly
+                pd.testing.assert_frame_equal(pd.read_parquet(tmp), value)
+                path = stem + '.parquet'
+            except Exception:
+                path = None
+        elif isinstance(value, np.ndarray) and value.dtype != object:
+            with open(tmp, 'wb') as f:
+                np.savez(f, value=value)
+            path = stem + '.npz'
+        elif (isinstance(value, dict) and value and 'value' not in value
+              and all(isinstance(v, np.ndarray) and v.dtype != object for v in value.values())):
+            with open(tmp, 'wb') as f:
+                np.savez(f, **value)
+            path = stem + '.npz'
+        if path is None:
+            with open(tmp, 'wb') as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            path = stem + '.pkl'
+        # readers never see a partial file
+        os.replace(tmp, path)
+
+        self.evict()
+        return path
+
+    def evict(self, max_bytes=None):
+        # remove least recently used results until the cache fits in max_bytes
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        entries = sorted(self._entries(), key=lambda e: e[2])
+        total = sum(e[1] for e in entries)
+        for path, size, _ in entries:
+            if total <= max_bytes:
+                break
+            self._remove(path)
+            total -= size
+
+    def invalidate(self, func=None, source=None):
+        """
+        remove cached results of a function and/or a match file (everything if both None)
+
+        Arg
+        ------
+        func : function
+        source : str path or Source, results of calls on this file (by path, so results of
+                 earlier versions of the file are removed too)
+
+        Out
+        -------
+        n : int number of removed results
+
+        """
+
+        name = None if func is None else '%s.%s-' % (func.__module__, func.__qualname__)
+        if source is not None:
+            source = os.path.abspath(source.path if isinstance(source, Source) else source)
+
+        n = 0
+        for path, _, _ in self._entries():
+            if name is not None and not os.path.basename(path).startswith(name):
+                continue
+            if source is not None and source not in self.sources(path):
+                continue
+            self._remove(path)
+            n += 1
+        return n
+
+    def clear(self):
+        return self.invalidate()
+
+    def call(self, func, *args, **kwargs):
+        """
+        cached func(*args, **kwargs), Source arguments are loaded only on a miss
+
+        Out
+        -------
+        result of func
+
+        """
+
+        key = self.key(func, args, kwargs)
+        found, value = self.get(key)
+        if found:
+            self.hits += 1
+            return value
+
+        self.misses += 1
+        sources = [v.path for v in list(args)+list(kwargs.values()) if isinstance(v, Source)]
+        args = [a.load() if isinstance(a, Source) else a for a in args]
+        kwargs = {k: v.load() if isinstance(v, Source) else v for k, v in kwargs.items()}
+        value = func(*args, **kwargs)
+        self.put(key, value, sources)
+        return value
+
+    def wrap(self, func):
+        # func with its calls cached
+        def cached(*args, **kwargs):
+            return self.call(func, *args, **kwargs)
+        cached.__name__ = func.__name__
+        cached.__doc__ = func.__doc__
+        return cached
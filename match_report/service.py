@@ -0,0 +1,346 @@
+"""
+ingestion service: watches a drop folder for match csvs and publishes their report tables
+
+    python -m match_report.service ./drop -o ./live_output --workers 4
+"""
+import argparse
+import asyncio
+import collections
+import glob
+import json
+import logging
+import os
+import signal
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+
+from match_report import batch
+
+
+logger = logging.getLogger(__name__)
+
+
+def publish(result, out_dir):
+    """
+    write the tables of a process_match result to out_dir/<match>/<table>.csv
+    each file is replaced atomically and result.json is written last, so a reader that
+    finds result.json sees complete tables, a failed result keeps the last good tables
+
+    Arg
+    ------
+    result : dict from batch.process_match
+    out_dir : str output store directory
+
+    Out
+    -------
+    path : str match directory
+
+    """
+
+    match_dir = os.path.join(out_dir, result['match'])
+    os.makedirs(match_dir, exist_ok=True)
+
+    def write(name, save):
+        tmp = os.path.join(match_dir, '.%s.%d.%d.tmp' % (name, os.getpid(), threading.get_ident()))
+        save(tmp)
+        os.replace(tmp, os.path.join(match_dir, name))
+
+    names = set()
+    for name, table in result['tables'].items():
+        names.add(name + '.csv')
+        # keep named index levels as columns, drop a plain row index (as batch.write_tables)
+        write(name + '.csv', lambda p, t=table: t.reset_index(drop=t.index.names == [None])
+              .to_csv(p, index=False))
+
+    # tables from an earlier version of the file that were not produced this time
+    # (a failed run keeps the last good tables)
+    if result['error'] is None:
+        for f in os.listdir(match_dir):
+            if f.endswith('.csv') and f not in names:
+                os.remove(os.path.join(match_dir, f))
+
+    meta = {k: result[k] for k in ('match', 'path', 'rows', 'seconds', 'error')}
+    meta['tables'] = sorted(result['tables'])
+    meta['published'] = time.time()
+
+    def save_meta(p):
+        with open(p, 'w') as f:
+            json.dump(meta, f, indent=1)
+
+    write('result.json', save_meta)
+
+    return match_dir
+
+
+class IngestService:
+    """
+    asyncio service computing the batch report tables (event_selector, kpis, pass_net via
+    batch.process_match) for every match csv dropped into a directory
+
+    files are queued once their size and modified time are unchanged between two scans
+    (so partially copied files are not read), a changed file is processed again
+    the queue is bounded: when it is full the watcher (or submit) waits, so a burst of
+    files never queues more than max_queue matches ahead of the workers
+    at most `workers` matches are computed at once, in a process pool
+
+    Arg
+    ------
+    watch_dir : str drop folder (None to only take files from submit)
+    out_dir : str output store (see publish), metrics.json is kept up to date here
+    workers : int matches computed at once
+    max_queue : int matches waiting for a worker
+    poll : float seconds between scans of watch_dir
+    color_scale : matplotlib cmap name for the pass network colours
+    cache_dir : str parquet cache directory (see batch.process_match)
+    result_dir : str ResultCache directory (see batch.process_match)
+    threads : bool compute in a thread pool instead of processes
+    on_result : callable(result, metrics) called after each match is published
+
+    """
+
+    def __init__(self, watch_dir, out_dir, workers=2, max_queue=8, poll=1.0, color_scale='cool',
+                 cache_dir=None, result_dir=None, threads=False, on_result=None):
+        self.watch_dir = watch_dir
+        self.out_dir = out_dir
+        self.workers = workers
+        self.max_queue = max_queue
+        self.poll = poll
+        self.color_scale = color_scale
+        self.cache_dir = cache_dir
+        self.result_dir = result_dir
+        self.threads = threads
+        self.on_result = on_result
+
+        self.queue = None
+        self.in_flight = 0
+        self.processed = 0
+        self.failed = 0
+        self.events = 0
+        self.started = None
+        # seconds from a file being queued to its tables being published
+        self.latencies = collections.deque(maxlen=1000)
+        self.compute_seconds = collections.deque(maxlen=1000)
+
+        self._stopping = None
+        # path -> (size, mtime) of files queued or done, and of files seen once
+        self._done = {}
+        self._pending = {}
+
+    def scan(self):
+        """
+        new or changed csvs of the watch directory that are ready to be read
+
+        Out
+        -------
+        paths : list of str
+
+        """
+
+        if self.watch_dir is None:
+            return []
+
+        ready = []
+        current = {}
+        for path in sorted(glob.glob(os.path.join(self.watch_dir, '*.csv'))):
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue
+            sig = (st.st_size, st.st_mtime_ns)
+            if self._done.get(path) == sig:
+                continue
+            if self._pending.get(path) == sig:
+                ready.append(path)
+                self._done[path] = sig
+            else:
+                current[path] = sig
+        # files still being written are checked again on the next scan
+        self._pending = current
+
+        return ready
+
+    async def submit(self, path):
+        # queue a match file (waits while the queue is full)
+        await self.queue.put((path, time.perf_counter()))
+
+    async def _watch(self):
+        while not self._stopping.is_set():
+            for path in self.scan():
+                await self.submit(path)
+                if self._stopping.is_set():
+                    break
+            try:
+                await asyncio.wait_for(self._stopping.wait(), self.poll)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _work(self, pool):
+        loop = asyncio.get_running_loop()
+        while True:
+            path, queued = await self.queue.get()
+            self.in_flight += 1
+            try:
+                result = await loop.run_in_executor(pool, batch.process_match, path,
+                                                    self.color_scale, self.cache_dir,
+                                                    self.result_dir)
+                await loop.run_in_executor(None, publish, result, self.out_dir)
+            except Exception as e:
+                # worker died (e.g. out of memory) or the store could not be written
+                result = {'match': os.path.splitext(os.path.basename(path))[0], 'path': path,
+                          'tables': {}, 'rows': 0, 'seconds': 0.0, 'error': repr(e)}
+            self.in_flight -= 1
+
+            try:
+                result['latency'] = time.perf_counter() - queued
+                self.latencies.append(result['latency'])
+                self.compute_seconds.append(result['seconds'])
+                if result['error'] is None:
+                    self.processed += 1
+                    self.events += result['rows']
+                else:
+                    self.failed += 1
+                metrics = self.metrics()
+                self._write_metrics(metrics)
+                if self.on_result is not None:
+                    self.on_result(result, metrics)
+            except Exception:
+                # a failing callback or metrics write must not stop the worker
+                logger.exception('bookkeeping failed for %s', path)
+            finally:
+                self.queue.task_done()
+
+    def metrics(self):
+        """
+        current service metrics
+
+        Out
+        -------
+        metrics : dict of queue_depth, in_flight, processed, failed, events, uptime,
+                  matches_per_sec, events_per_sec and latency / compute time percentiles
+                  (seconds, over the last 1000 matches)
+
+        """
+
+        uptime = 0.0 if self.started is None else time.perf_counter() - self.started
+        out = {
+            'queue_depth': 0 if self.queue is None else self.queue.qsize(),
+            'in_flight': self.in_flight,
+            'processed': self.processed,
+            'failed': self.failed,
+            'events': self.events,
+            'uptime': uptime,
+            'matches_per_sec': self.processed/uptime if uptime > 0 else 0.0,
+            'events_per_sec': self.events/uptime if uptime > 0 else 0.0,
+        }
+        for name, values in (('latency', self.latencies), ('compute', self.compute_seconds)):
+            v = np.asarray(values, dtype=float)
+            out[name + '_p50'] = float(np.percentile(v, 50)) if len(v) else None
+            out[name + '_p95'] = float(np.percentile(v, 95)) if len(v) else None
+            out[name + '_max'] = float(v.max()) if len(v) else None
+
+        return out
+
+    def _write_metrics(self, metrics):
+        path = os.path.join(self.out_dir, 'metrics.json')
+        tmp = path + '.%d.tmp' % os.getpid()
+        with open(tmp, 'w') as f:
+            json.dump(metrics, f, indent=1)
+        os.replace(tmp, path)
+
+    def stop(self):
+        # stop watching, matches already queued are finished
+        if self._stopping is not None:
+            self._stopping.set()
+
+    async def run(self, until_idle=False):
+        """
+        run the service until stop() (or, with until_idle, until the watch directory has
+        been scanned and every queued match is published)
+
+        Arg
+        ------
+        until_idle : bool
+
+        Out
+        -------
+        metrics : dict (see metrics)
+
+        """
+
+        os.makedirs(self.out_dir, exist_ok=True)
+        self.queue = asyncio.Queue(self.max_queue)
+        self._stopping = asyncio.Event()
+        self.started = time.perf_counter()
+
+        executor = ThreadPoolExecutor if self.threads else ProcessPoolExecutor
+        with executor(max_workers=self.workers) as pool:
+            workers = [asyncio.create_task(self._work(pool)) for _ in range(self.workers)]
+            if until_idle:
+                # a file is ready when unchanged between two scans
+                self.scan()
+                await asyncio.sleep(self.poll)
+                for path in self.scan():
+                    await self.submit(path)
+            else:
+                await self._watch()
+            await self.queue.join()
+            for w in workers:
+                w.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+        return self.metrics()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='match_report.service',
+        description='Compute report tables for every match csv dropped into a directory')
+    parser.add_argument('watch', help='drop folder of match csv files')
+    parser.add_argument('-o', '--out', default='match_report_live', help='output store directory')
+    parser.add_argument('-w', '--workers', type=int, default=2, help='matches computed at once')
+    parser.add_argument('--queue', type=int, default=8, help='matches waiting for a worker')
+    parser.add_argument('--poll', type=float, default=1.0, help='seconds between folder scans')
+    parser.add_argument('--cmap', default='cool', help='matplotlib cmap for pass network colours')
+    parser.add_argument('--cache', default=None, help='parquet cache directory for the loaded matches')
+    parser.add_argument('--results', default=None,
+                        help='result cache directory, unchanged matches are not recomputed')
+    parser.add_argument('--threads', action='store_true', help='compute in threads, not processes')
+    parser.add_argument('--once', action='store_true',
+                        help='process the files in the folder and exit')
+    parser.add_argument('-q', '--quiet', action='store_true', help='no per match progress')
+    args = parser.parse_args(argv)
+
+    def progress(result, metrics):
+        status = 'ok' if result['error'] is None else 'FAILED'
+        print('%s %s (%.2fs, latency %.2fs, queue %d)' % (
+            result['match'], status, result['seconds'], result['latency'], metrics['queue_depth']),
+            flush=True)
+
+    service = IngestService(args.watch, args.out, workers=args.workers, max_queue=args.queue,
+                            poll=args.poll, color_scale=args.cmap, cache_dir=args.cache,
+                            result_dir=args.results, threads=args.threads,
+                            on_result=None if args.quiet else progress)
+
+    async def serve():
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, service.stop)
+            except (NotImplementedError, RuntimeError):
+                pass
+        return await service.run(until_idle=args.once)
+
+    metrics = asyncio.run(serve())
+    print('%d matches (%d failed): %.2f matches/s, %.0f events/s' % (
+        metrics['processed'] + metrics['failed'], metrics['failed'],
+        metrics['matches_per_sec'], metrics['events_per_sec']))
+
+    return 1 if metrics['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
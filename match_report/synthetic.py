@@ -0,0 +1,271 @@
+import numpy as np
+import pandas as pd
+
+
+# 4-4-2 starting positions and rough average locations (x along the pitch, attacking right)
+FORMATION = [
+    ('Goalkeeper', 5, 40),
+    ('Right Back', 35, 70), ('Right Center Back', 25, 52), ('Left Center Back', 25, 28),
+    ('Left Back', 35, 10),
+    ('Right Midfield', 60, 72), ('Right Center Midfield', 50, 50),
+    ('Left Center Midfield', 50, 30), ('Left Midfield', 60, 8),
+    ('Right Center Forward', 80, 48), ('Left Center Forward', 80, 32),
+]
+
+# event types within a possession and their relative frequency
+ON_BALL_EVENTS = ['Pass','Carries','Dribble','Miscontrol','Foul Won']
+ON_BALL_P = [0.62, 0.28, 0.04, 0.03, 0.03]
+
+DEFENSIVE_EVENTS = ['Pressure','Duel','Interception','Clearance','Block','Ball Recovery']
+DEFENSIVE_P = [0.55, 0.15, 0.08, 0.1, 0.04, 0.08]
+
+
+def _timestamp(seconds):
+    # statsbomb timestamps restart each period
+    ms = np.round(seconds*1000).astype(np.int64)
+    return ['%02d:%02d:%02d.%03d' % (m//3600000, m//60000 % 60, m//1000 % 60, m % 1000) for m in ms]
+
+
+def synthetic_match(match_id=1, n_events=3500, seed=None, home='Home FC', away='Away FC',
+                    competition='Synthetic League', duplicate_rate=0.01):
+    """
+    synthetic Statsbomb style events for one match
+    starting XI and substitution rows, two periods, possessions of passes/carries ending
+    in a turnover or shot (with xg), opposition pressure and defensive events
+
+    Arg
+    ------
+    match_id : int
+    n_events : int approximate number of on-pitch events
+    seed : int random seed (defaults to match_id)
+    home, away : str team names
+    competition : str
+    duplicate_rate : float fraction of rows repeated, as in raw exports
+
+    Out
+    -------
+    events : pandas df
+
+    """
+
+    rng = np.random.default_rng(match_id if seed is None else seed)
+    teams = [home, away]
+
+    # squads of 11 starters plus 3 substitutes
+    squads = {t: ['%s %s' % (t, n) for n in
+                  rng.choice(['Smith','Jones','Brown','Evans','Wilson','Taylor','Walker','Wright',
+                              'Hall','Green','Clarke','Wood','King','Baker','Hill','Scott',
+                              'Adams','Ward','Moore','Lewis'], 14, replace=False)]
+              for t in teams}
+
+    # substitutions (player off, player on, minute), a different outfield slot for each
+    subs = {t: [(int(off), 11+i, int(rng.integers(55, 88)))
+                for i, off in enumerate(rng.choice(np.arange(1, 11), 3, replace=False))]
+            for t in teams}
+
+    def on_pitch(team, minute):
+        # squad index of the player in each formation slot at a minute
+        players = list(range(11))
+        for off, on, m in subs[team]:
+            if minute >= m:
+                players[off] = on
+        return players
+
+    rows = []
+    def add(**kw):
+        rows.append(kw)
+
+    for period, start in ((1, 0.0), (2, 45*60.0)):
+        for i, t in enumerate(teams):
+            add(period=period, clock=0.0, minute=start//60, second=0, team_name=t,
+                possession_team_name=t, event_type_name='Half Start', possession=0)
+
+    for i, t in enumerate(teams):
+        for slot, (pos, x, y) in enumerate(FORMATION):
+            add(period=1, clock=0.0, minute=0, second=0, team_name=t, possession_team_name=t,
+                event_type_name='Starting XI', formation_player_name=squads[t][slot],
+                formation_position_name=pos, possession=0)
+
+    # possessions
+    possession = 1
+    per_period = n_events // 2
+    for period, start in ((1, 0.0), (2, 45*60.0)):
+        clock = 0.0
+        count = 0
+        length = 45*60 + rng.integers(60, 300)
+        team = rng.integers(0, 2)
+        while clock < length and count < per_period:
+            t, opp = teams[team], teams[1-team]
+            minute = (start + clock)//60
+            players = on_pitch(t, minute)
+            opp_players = on_pitch(opp, minute)
+            x = rng.uniform(10, 50)
+            n = rng.geometric(0.18)
+            holder = rng.integers(1, 11)
+            for k in range(n):
+                clock += rng.exponential(2.5)
+                minute = (start + clock)//60
+                pos, hx, hy = FORMATION[holder]
+                x = float(np.clip(x + rng.normal(6, 9), 0, 120))
+                y = float(np.clip(hy + rng.normal(0, 12), 0, 80))
+                last = k == n-1
+                if last and x > 85 and rng.random() < 0.6:
+                    xg = float(np.clip(rng.beta(1.2, 9)*(1.6 if x > 102 else 0.7), 0.01, 0.95))
+                    outcome = 'Goal' if rng.random() < xg else rng.choice(['Saved','Off T','Blocked','Wayward'])
+                    add(period=period, clock=clock, minute=minute, second=int(clock % 60),
+                        team_name=t, possession_team_name=t, player_name=squads[t][players[holder]],
+                        player_position_name=pos, event_type_name='Shot', location_x=x, location_y=y,
+                        end_location_x=120.0, end_location_y=float(rng.normal(40, 4)), xg=xg,
+                        outcome_name=outcome, possession=possession, play_pattern_name='Regular Play',
+                        duration=float(rng.uniform(0.1, 1)))
+                    count += 1
+                    break
+                etype = rng.choice(ON_BALL_EVENTS, p=ON_BALL_P)
+                pressed = rng.random() < 0.25
+                if pressed:
+                    d = rng.integers(1, 11)
+                    dpos = FORMATION[d][0]
+                    add(period=period, clock=clock, minute=minute, second=int(clock % 60),
+                        team_name=opp, possession_team_name=t, player_name=squads[opp][opp_players[d]],
+                        player_position_name=dpos, event_type_name='Pressure',
+                        location_x=120-x, location_y=80-y, possession=possession,
+                        counterpress=True if rng.random() < 0.2 else None,
+                        play_pattern_name='Regular Play', duration=float(rng.uniform(0.2, 2.5)))
+                    count += 1
+                row = dict(period=period, clock=clock, minute=minute, second=int(clock % 60),
+                           team_name=t, possession_team_name=t, player_name=squads[t][players[holder]],
+                           player_position_name=pos, event_type_name=etype, location_x=x, location_y=y,
+                           possession=possession, play_pattern_name='Regular Play',
+                           under_pressure=True if pressed else None,
+                           duration=float(rng.uniform(0.2, 3)))
+                if etype == 'Pass':
+                    r = rng.choice([s for s in range(11) if s != holder])
+                    ex = float(np.clip(x + rng.normal(8, 14), 0, 120))
+                    ey = float(np.clip(FORMATION[r][2] + rng.normal(0, 8), 0, 80))
+                    failed = last or rng.random() < 0.12
+                    row.update(end_location_x=ex, end_location_y=ey,
+                               pass_recipient_name=squads[t][players[r]],
+                               pass_cross=True if (ex > 100 and (y < 18 or y > 62)) else None,
+                               pass_height_name=rng.choice(['Ground Pass','Low Pass','High Pass'], p=[.7,.1,.2]),
+                               outcome_name='Incomplete' if failed else None)
+                    add(**row)
+                    count += 1
+                    if not failed:
+                        clock += rng.exponential(1.0)
+                        add(period=period, clock=clock, minute=(start+clock)//60, second=int(clock % 60),
+                            team_name=t, possession_team_name=t, player_name=squads[t][players[r]],
+                            player_position_name=FORMATION[r][0], event_type_name='Ball Receipt*',
+                            location_x=ex, location_y=ey, possession=possession,
+                            play_pattern_name='Regular Play')
+                        count += 1
+                        holder = r
+                        x = ex
+                elif etype == 'Carries':
+                    row.update(end_location_x=float(np.clip(x + rng.normal(5, 5), 0, 120)),
+                               end_location_y=float(np.clip(y + rng.normal(0, 5), 0, 80)))
+                    add(**row)
+                    count += 1
+                elif etype == 'Dribble':
+                    row.update(outcome_name='Complete' if rng.random() < 0.6 else 'Incomplete')
+                    add(**row)
+                    count += 1
+                else:
+                    add(**row)
+                    count += 1
+                    if etype == 'Miscontrol':
+                        break
+            # turnover by the defending team
+            d = rng.integers(1, 11)
+            ev = rng.choice(DEFENSIVE_EVENTS, p=DEFENSIVE_P)
+            clock += rng.exponential(1.5)
+            row = dict(period=period, clock=clock, minute=(start+clock)//60, second=int(clock % 60),
+                       team_name=opp, possession_team_name=opp,
+                       player_name=squads[opp][on_pitch(opp, (start+clock)//60)[d]],
+                       player_position_name=FORMATION[d][0], event_type_name=ev,
+                       location_x=float(120-x), location_y=float(80-y), possession=possession+1,
+                       play_pattern_name='Regular Play')
+            if ev == 'Duel':
+                row.update(type_name=rng.choice(['Tackle','Aerial Lost']),
+                           aerial_won=True if rng.random() < 0.3 else None)
+            add(**row)
+            count += 1
+            possession += 1
+            team = 1 - team
+
+        for t in teams:
+            add(period=period, clock=clock, minute=(start+clock)//60, second=int(clock % 60),
+                team_name=t, possession_team_name=t, event_type_name='Half End', possession=possession)
+
+    for t in teams:
+        for off, on, m in subs[t]:
+            period_clock = m*60.0 - 45*60
+            add(period=2, clock=period_clock, minute=m, second=0, team_name=t,
+                possession_team_name=t, player_name=squads[t][off],
+                player_position_name=FORMATION[off][0], event_type_name='Substitution',
+                substitution_replacement_name=squads[t][on], possession=0)
+
+    df = pd.DataFrame(rows)
+    df = df.sort_values(['period','clock'], kind='mergesort').reset_index(drop=True)
+    df['timestamp'] = _timestamp(df['clock'].to_numpy())
+    df['minute'] = df['minute'].astype(int)
+    df['index'] = np.arange(1, len(df)+1)
+    df['match_id'] = match_id
+    df['competition_name'] = competition
+    df = df.drop(columns='clock')
+
+    columns = ['match_id','competition_name','index','period','timestamp','minute','second',
+               'possession','possession_team_name','play_pattern_name','team_name','player_name',
+               'player_position_name','event_type_name','type_name','location_x','location_y',
+               'end_location_x','end_location_y','duration','under_pressure','counterpress',
+               'outcome_name','xg','pass_recipient_name','pass_cross','pass_height_name',
+               'aerial_won','substitution_replacement_name','formation_player_name',
+               'formation_position_name']
+    df = df.reindex(columns=columns)
+
+    # raw exports repeat some rows
+    if duplicate_rate > 0:
+        dups = df.sample(frac=duplicate_rate, random_state=int(rng.integers(1 << 31)))
+        df = pd.concat([df, dups]).sort_index(kind='mergesort').reset_index(drop=True)
+
+    return df
+
+
+def synthetic_season(n_leagues=1, teams_per_league=20, rounds=None, n_events=3500, seed=0):
+    """
+    synthetic events for every fixture of one or more leagues
+
+    Arg
+    ------
+    n_leagues : int
+    teams_per_league : int
+    rounds : int number of matchweeks per league (None plays every fixture home and away)
+    n_events : int approximate events per match
+    seed : int
+
+    Out
+    -------
+    events : pandas df of all matches (unique match_id per match)
+
+    """
+
+    return pd.concat(list(synthetic_matches(n_leagues, teams_per_league, rounds, n_events, seed)),
+                     ignore_index=True)
+
+
+def synthetic_matches(n_leagues=1, teams_per_league=20, rounds=None, n_events=3500, seed=0):
+    # generate synthetic_season one match at a time
+    match_id = 0
+    for league in range(n_leagues):
+        competition = 'Synthetic League %d' % (league+1)
+        teams = ['L%d Team%02d FC' % (league+1, i+1) for i in range(teams_per_league)]
+        # round robin (circle method)
+        order = list(range(teams_per_league))
+        n_rounds = 2*(teams_per_league-1) if rounds is None else rounds
+        for r in range(n_rounds):
+            for i in range(teams_per_league//2):
+                a, b = order[i], order[-1-i]
+                home, away = (a, b) if (r // (teams_per_league-1)) % 2 == 0 else (b, a)
+                match_id += 1
+                yield synthetic_match(match_id, n_events, seed=seed*100003+match_id,
+                                      home=teams[home], away=teams[away], competition=competition)
+            order = [order[0]] + [order[-1]] + order[1:-1]
@@ -1,9 +1,15 @@
-import matplotlib.pyplot as plt
-import seaborn as sns
-import pandas as pd
 import numpy as np
 
+from match_report import binning
+from match_report.pass_net import TOUCH_EVENTS, event_seconds
+from match_report.match_events import as_frame
+from match_report.profiling import profiled
 
+# matplotlib, seaborn and render are imported in the plotting functions, so the
+# pass network tables can be computed without the plotting libraries
+
+
+@profiled
 def statsbomb_pitch_plot(w,h,opacity=0.7):
     """
     Plot football pitch using 120x80 Statsbomb dimensions
@@ -19,51 +25,17 @@ def statsbomb_pitch_plot(w,h,opacity=0.7):
     """
     
     
+    import matplotlib.pyplot as plt
+    from match_report import render
+
     fig,ax = plt.subplots(figsize=(w,h))
-    #Pitch Outline & Centre Line
-    _=ax.plot([0,0],[0,80], color="black",alpha=opacity) # left touchline
-    _=ax.plot([0,120],[0,0], color="black",alpha=opacity) # top touchline
-    _=ax.plot([120,120],[0,80], color="black",alpha=opacity) # right touchline
-    _=ax.plot([0,120],[80,80], color="black",alpha=opacity) # bottom touchline
-    _=ax.plot([60,60],[0,80], color="black",alpha=opacity) # centre line
-
-    #Left Penalty Area
-    _=ax.plot([0,18],[18,18],color="black",alpha=opacity) # top
-    _=ax.plot([0,18],[62,62],color="black",alpha=opacity) #  bottom
-    _=ax.plot([18,18],[18,62],color="black",alpha=opacity)
-
-    #Right Penalty Area
-    _=ax.plot([102,120],[18,18],color="black",alpha=opacity)
-    _=ax.plot([102,102],[18,62],color="black",alpha=opacity)
-    _=ax.plot([102,120],[62,62],color="black",alpha=opacity)
-
-    #Left 6-yard Box
-    _=ax.plot([0,6],[30,30],color="black",alpha=opacity)
-    _=ax.plot([6,6],[30,50],color="black",alpha=opacity)
-    _=ax.plot([0,6],[50,50],color="black",alpha=opacity)
-
-    #Right 6-yard Box
-    _=ax.plot([114,120],[30,30],color="black",alpha=opacity)
-    _=ax.plot([114,114],[30,50],color="black",alpha=opacity)
-    _=ax.plot([114,120],[50,50],color="black",alpha=opacity)
-
-    #Prepare Circles
-    centreCircle = plt.Circle((60,40),12,color="black",fill=False,alpha=opacity)
-    centreSpot = plt.Circle((60,40),0.5,color="black",alpha=opacity)
-    leftPenSpot = plt.Circle((12,40),0.5,color="black",alpha=opacity) # penspot
-    rightPenSpot = plt.Circle((108,40),0.5,color="black",alpha=opacity) # penspot
-
-    #Draw Circles
-    _=ax.add_patch(centreCircle)
-    _=ax.add_patch(centreSpot)
-    _=ax.add_patch(leftPenSpot)
-    _=ax.add_patch(rightPenSpot)
-
-    _=ax.set_axis_off()
+    # pitch lines and circles drawn as collections (see render for headless/batch plotting)
+    render.draw_pitch(ax,opacity,fit=False)
     
     return fig,ax
 
 
+@profiled
 def cumulative_event_line(events,hist_bins,figsize,colour):
     """
     plot cumulative event line across pitch dimensions
@@ -81,26 +53,19 @@ def cumulative_event_line(events,hist_bins,figsize,colour):
     
     """
     
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    # zone counts and bin edges (locations on the pitch), binned once
+    counts, press_zones, _ = binning.zone_counts(events,hist_bins)
+
     #  press count frequency
-    press_counts = np.sum(np.histogram2d(events["location_x"],
-                                         events["location_y"],
-                                         bins=hist_bins)[0],
-                          axis=1)
-    
+    press_counts = counts.sum(axis=1)
     total_press_counts = np.hstack((0,press_counts)) # add in zero at start
     
-    
-    # bin edges (locations on the pitch)
-    press_zones = np.histogram2d(events["location_x"],
-                                 events["location_y"],
-                                 bins=hist_bins)[1]
-
-    # df of locations and frequency
-    presses = pd.DataFrame([total_press_counts,press_zones])
-    
     # plot
     fig,ax = plt.subplots(figsize=figsize)
-    _=ax.plot(presses.iloc[1,:],presses.iloc[0,:],c=colour)
+    _=ax.plot(press_zones,total_press_counts,c=colour)
     _=ax.set(xlim=[0,120])
     _=ax.plot([60,60],[0,np.amax(total_press_counts)],ls='--',c='k')
     _=plt.annotate('Halfway',(61,4),rotation=90)
@@ -109,6 +74,7 @@ def cumulative_event_line(events,hist_bins,figsize,colour):
     return
 
 
+@profiled
 def event_2dhist(events,hist_bins,colour):
     """
     plot 2d histogram across pitch dimensions
@@ -125,11 +91,11 @@ def event_2dhist(events,hist_bins,colour):
     
     """
     
-    _=plt.hist2d(events["location_x"],
-             events["location_y"],
-             bins=hist_bins,
-            cmin = 1,  #sets below 0 to white 
-            cmap=colour) 
+    import matplotlib.pyplot as plt
+
+    counts, xedges, yedges = binning.zone_counts(events,hist_bins)
+    h = np.where(counts >= 1, counts, np.nan) #sets below 1 to white
+    _=plt.pcolormesh(xedges,yedges,h.T,cmap=colour)
     _=plt.ylim([0,80])
     _=plt.xlim([0,120])
     _=plt.colorbar()
@@ -137,7 +103,53 @@ def event_2dhist(events,hist_bins,colour):
     return
 
 
-def radar_plot(data,player1,player2):
+@profiled
+def pass_density(events,bw='scott',levels=8,colour='Reds'):
+    """
+    plot kde density of event locations across pitch dimensions
+    evaluated on the fixed 120x80 grid of density.kde (no refit per render)
+    
+    Arg
+    --------
+    events : pandas df
+    bw : float bandwidth (pitch units) or 'scott'
+    levels : int number of contour levels
+    colour : string (matplot.cmap args)
+    
+    Return
+    ---------
+    fig
+    
+    """
+    
+    import matplotlib.pyplot as plt
+    from match_report import density, render
+
+    surface, xc, yc = density.kde(events,bw)
+    _=render.draw_density(plt.gca(),surface,xc,yc,levels,colour)
+    _=plt.ylim([0,80])
+    _=plt.xlim([0,120])
+    
+    return
+
+
+@profiled
+def radar_plot(data,*players):
+    """
+    radar plot of kpis for any number of players
+    
+    Arg
+    --------
+    data : pandas df of kpis, one row per player
+    players : player names (rows of data)
+    
+    Return
+    ---------
+    ax
+    
+    """
+    
+    import matplotlib.pyplot as plt
     
     # ------- PART 1: Create background
     # number of variable
@@ -160,24 +172,16 @@ def radar_plot(data,player1,player2):
 
     # Draw ylabels
     ax.set_rlabel_position(0)
-    #_=plt.yticks(np.percentile(data,[20,40,60,80,100]),['20%','40%','60%','80%','100%'],color="k",size=7) 
 
     # ------- PART 2: Add plots
 
     # Plot each individual = each line of the data
-    # I don't do a loop, because plotting more than 3 groups makes the chart unreadable
-
-    # Ind1
-    values=data.loc[player1,:].values.tolist()
-    values += values[:1]
-    ax.plot(angles, values, linewidth=1, linestyle='solid', label=player1)
-    ax.fill(angles, values, 'b', alpha=0.1)
-
-    # Ind2
-    values=data.loc[player2,:].values.tolist()
-    values += values[:1]
-    ax.plot(angles, values, linewidth=1, linestyle='solid', label=player2)
-    ax.fill(angles, values, 'r', alpha=0.1)
+    fills = ['b','r']
+    for i,player in enumerate(players):
+        values=data.loc[player,:].values.tolist()
+        values += values[:1]
+        line, = ax.plot(angles, values, linewidth=1, linestyle='solid', label=player)
+        ax.fill(angles, values, fills[i] if i < len(fills) else line.get_color(), alpha=0.1)
 
     # Add legend
     _=plt.legend(loc='upper right', bbox_to_anchor=(0.1, 0.1)) #
@@ -185,77 +189,125 @@ def radar_plot(data,player1,player2):
     return ax
 
 
-
-def pass_network(df):
+@profiled
+def percentile_radar(store,position,players):
     """
-    return pass network data points
-    uses average touches for player locations
-    completed passes for pass links
-    input df for a team and half (not sure would make sense for whole game)
+    radar plot of player kpis as percentiles of a league distribution
+    (percentiles.DistributionStore), no events are needed
     
     Arg
-    -----------
-    df : df of events for a team
+    --------
+    store : percentiles.DistributionStore
+    position : string position group ('fwds','wb','cm','cb')
+    players : list of player names in the store, or pandas df of per 90 kpis
+              (one row per player)
+    
+    Return
+    ---------
+    ax
     
     """
     
-    # team name and plyrs
-    team_name = list(df['possession_team_name'].unique())
-    lineup = list(df['player_name'].unique())
+    import matplotlib.pyplot as plt
+
+    pct = store.percentiles(position,players)
+    ax = radar_plot(pct,*pct.index)
+    ax.set_ylim(0,100)
+    _=plt.yticks([20,40,60,80,100],['20%','40%','60%','80%','100%'],color="k",size=7)
     
+    return ax
+
+
+def _pass_network_table(df,keys):
+    # pass network rows for each group of keys (empty list for one network)
+    df = as_frame(df)
+
+    d = df[keys+['event_type_name','outcome_name','location_x','location_y']].copy()
+    d['player_name'] = np.asarray(df['player_name'],dtype=object)
+    d['pass_recipient_name'] = np.asarray(df['pass_recipient_name'],dtype=object)
+
     # ave location of plyrs (based on touches)
-    touch_events = ['Pass','Ball Receipt*','Carries','Shot','Ball Recovery','Clearance','Block',
-               'Goal Keeper','Miscontrol','Dribble','Interception']
-    touches = df[df['event_type_name'].isin(touch_events)]
-    player_locs = touches.groupby('player_name')[['location_x','location_y']].mean()
-    
-     # completed passes
-    team_pass = df[(df['event_type_name']=='Pass')&
-                   (df['outcome_name'].isnull())]
-    # for given players
-    player_pass = team_pass[team_pass['player_name'].isin(lineup)]
-    
+    touches = d[d['event_type_name'].isin(TOUCH_EVENTS)]
+    player_locs = touches.groupby(keys+['player_name'],observed=True)[['location_x','location_y']].mean()
+
+    # completed passes
+    team_pass = d[(d['event_type_name']=='Pass')&
+                  (d['outcome_name'].isnull())]
+
     # x and y average locations of complete passes made
-    x_ave = (
-        player_pass.groupby(['player_name'])['location_x'].sum()
-        /player_pass.groupby(['player_name'])['location_x'].count()
-    )
-
-    y_ave = (
-        player_pass.groupby(['player_name'])['location_y'].sum()
-        /player_pass.groupby(['player_name'])['location_y'].count()
-    )
-    
-    # create the df of passes made and counts
-    players = []
-    for i in lineup:
-        players.append(player_pass[player_pass['player_name']==i]
-                       .groupby(['player_name','pass_recipient_name'])['pass_recipient_name'].count())
-        
-    list_dfs = []
-    for i in range(len(players)):
-        list_dfs.append(pd.DataFrame(players[i]))
-        list_dfs[i].columns = ['passes']
-        list_dfs[i] = list_dfs[i].reset_index()
-
-    passes_df = pd.concat(list_dfs)
-    
+    ave = team_pass.groupby(keys+['player_name'],observed=True)[['location_x','location_y']].mean()
+
+    # passes made and counts
+    passes_df = (team_pass.groupby(keys+['player_name','pass_recipient_name'],observed=True)
+                 .size().rename('passes').reset_index())
+
     # add locations into pass df
-    for i in x_ave.index:
-        passes_df.loc[(passes_df['player_name']==i),'x start (ave)']= x_ave[i]
-        passes_df.loc[(passes_df['player_name']==i),'y start (ave)']= y_ave[i]
-        passes_df.loc[(passes_df['pass_recipient_name']==i),'x end (ave)']= x_ave[i]
-        passes_df.loc[(passes_df['pass_recipient_name']==i),'y end (ave)']= y_ave[i]
-        passes_df.loc[(passes_df['player_name']==i),'x loc (ave)']= player_locs.loc[i]['location_x']
-        passes_df.loc[(passes_df['player_name']==i),'y loc (ave)']= player_locs.loc[i]['location_y']
-    
-    
-    
+    start = ave.rename(columns={'location_x':'x start (ave)','location_y':'y start (ave)'})
+    end = ave.rename(columns={'location_x':'x end (ave)','location_y':'y end (ave)'})
+    end.index = end.index.set_names(keys+['pass_recipient_name'])
+    locs = player_locs.rename(columns={'location_x':'x loc (ave)','location_y':'y loc (ave)'})
+
+    passes_df = (passes_df.join(start,on=keys+['player_name'])
+                 .join(end,on=keys+['pass_recipient_name'])
+                 .join(locs,on=keys+['player_name']))
+
+    # players in order of first appearance (in each group)
+    d['order'] = np.arange(len(d))
+    first = d.groupby(keys+['player_name'],observed=True)['order'].min()
+    passes_df = passes_df.join(first,on=keys+['player_name'])
+    passes_df = passes_df.sort_values(keys+['order'],kind='mergesort').drop(columns='order')
+
     return passes_df.reset_index(drop=True)
 
 
+@profiled
+def pass_network(df):
+    """
+    return pass network data points
+    uses average touches for player locations
+    completed passes for pass links
+    input df for a team and half (not sure would make sense for whole game)
+    for several teams, halves or time windows see pass_network_windows
 
+    Arg
+    -----------
+    df : df of events for a team
+
+    """
 
+    return _pass_network_table(df,[])
 
 
+@profiled
+def pass_network_windows(df,windows=None):
+    """
+    pass network data points for every team and window in one call
+
+    Arg
+    -----------
+    df : df of events
+    windows : list of (start, end) minute tuples (end exclusive, may overlap)
+              None gives one network per team per period
+
+    Out
+    -----------
+    df : long df of pass_network rows keyed by team_name and period
+         (or window_start, window_end)
+
+    """
 
+    df = as_frame(df)
+    if windows is None:
+        return _pass_network_table(df,['team_name','period'])
+
+    # rows of every window they fall in, gathered once
+    minute = np.floor(event_seconds(df)/60)
+    rows = [np.flatnonzero((minute >= start) & (minute < end)) for start, end in windows]
+    sizes = [len(r) for r in rows]
+    cols = ['team_name','event_type_name','outcome_name','location_x','location_y',
+            'player_name','pass_recipient_name']
+    windowed = df[cols].iloc[np.concatenate(rows) if rows else []].reset_index(drop=True)
+    windowed['window_start'] = np.repeat([w[0] for w in windows], sizes)
+    windowed['window_end'] = np.repeat([w[1] for w in windows], sizes)
+
+    return _pass_network_table(windowed,['team_name','window_start','window_end'])
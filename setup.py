@@ -8,6 +8,19 @@ setup(
     description="A package for creating football match reports using Statsbomb spatio-temporal event data",
     url="https://github.com/frasere/match-report",
     packages=find_packages(),
+    # tracemalloc.reset_peak (profiling) needs 3.9
+    python_requires=">=3.9",
+    # compute only install, plotting libraries are in the plot extra
+    install_requires=["numpy", "pandas"],
+    extras_require={
+        "parquet": ["pyarrow"],
+        "plot": ["matplotlib", "seaborn"],
+        "all": ["pyarrow", "matplotlib", "seaborn"],
+    },
+    entry_points={
+        "console_scripts": ["match-report=match_report.batch:main",
+                            "match-report-service=match_report.service:main"],
+    },
     classifiers=(
         "Programming Language :: Python :: 3",
     ),
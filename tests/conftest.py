@@ -0,0 +1,35 @@
+import pytest
+
+from match_report import batch, data_loader, synthetic
+
+
+# team names the original team_kpi was written for
+HOME = 'Fleetwood Town'
+AWAY = 'Wycombe Wanderers'
+
+
+@pytest.fixture(scope='session')
+def raw_match():
+    # one synthetic match, with duplicate rows as in raw exports
+    return synthetic.synthetic_match(match_id=1, n_events=2000, home=HOME, away=AWAY)
+
+
+@pytest.fixture(scope='session')
+def all_events(raw_match):
+    return data_loader.event_selector(raw_match)
+
+
+@pytest.fixture(scope='session')
+def network_inputs(raw_match, all_events):
+    # lineup, events and completed passes of the home team, as batch.match_tables
+    lineup = batch.starting_lineup(raw_match, HOME)
+    events = all_events[(all_events['possession_team_name']==HOME)&
+                        (all_events['player_name'].isin(lineup['formation_player_name']))]
+    passes = events[(events['event_type_name']=='Pass')&(events['outcome_name'].isnull())]
+    return passes, events, lineup
+
+
+@pytest.fixture(scope='session')
+def raw_season():
+    # a few rounds of a small league
+    return synthetic.synthetic_season(teams_per_league=4, rounds=2, n_events=1500, seed=3)
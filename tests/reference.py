@@ -0,0 +1,527 @@
+"""
+frozen copies of the original pandas implementations (before the vectorised rewrites),
+the reference outputs the tests compare the package against
+"""
+import itertools
+
+import pandas as pd
+
+
+# data_loader
+
+def event_selector(raw_csv,event_type=None):
+    """
+    select specified event from raw csv. drop duplicate data
+    
+    Arg
+    ------
+    event_type : str
+    
+    Out
+    -------
+    events : pandas df
+    
+    """
+    
+    if event_type != None:
+        events =raw_csv[raw_csv['event_type_name']==event_type].reset_index()
+
+        # drop duplicates
+        events.drop_duplicates(subset=['timestamp','player_name',
+                                       'event_type_name','location_x', 'location_y'],
+                               inplace=True)
+    elif event_type == None:
+        events = raw_csv.drop_duplicates(subset=['timestamp',
+                                                 'player_name','event_type_name',
+                                                 'location_x', 'location_y'])
+    else:
+        raise KeyError('Enter properly')
+    
+    return events
+
+
+# kpis
+
+def fwds_kpis(cfs):
+    """
+    calulate kpis for forwards
+    
+    Arg
+    ------
+    cfs : pandas df of forward events
+    
+    Out
+    -------
+    df : pandas df of kpis
+    
+    """
+    
+    cfs_df = cfs[['xg','event_type_name','play_pattern_name','player_name',
+       'player_position_name', 'location_x', 'location_y', 'end_location_x',
+       'end_location_y','under_pressure', 'outcome_name','counterpress','aerial_won']]
+    
+    # xg,shots, box_touches, pressures, aerials
+    xg = cfs_df.groupby(['player_name'])['xg'].sum()
+    shots = cfs_df[cfs_df['event_type_name']=='Shot'].groupby(['player_name'])['event_type_name'].count()
+    box_touches = cfs_df[(cfs_df['location_x']>=99.6)
+      &(cfs_df['location_y']>=17.67)
+      &(cfs_df['location_y']<=65.75)
+      &(cfs_df['event_type_name']!='Pressure')].groupby(['player_name'])['player_name'].count()
+    
+    pressures = (cfs_df[(cfs_df['event_type_name']=='Pressure')].
+                 groupby(['player_name'])['event_type_name'].count())
+    
+    aerials = cfs_df[(cfs_df['aerial_won']>0)].groupby(['player_name'])['aerial_won'].count()
+    
+    dribbles = (cfs_df[(cfs_df['event_type_name']=='Dribble')
+                      &(cfs_df['outcome_name']=='Complete')]
+                .groupby(['player_name'])['player_name'].count())
+    
+    df = pd.concat([xg,shots,box_touches,pressures,dribbles,aerials],axis=1)
+    df.columns = ['xg','shots','box_touches','pressures','succ. dribbles','aerials_won']
+    df['shot_touch%'] = (df['shots']/df['box_touches'])*100
+    df['xg/shot'] = df['xg']/df['shots']
+    df['goals'] = [0,1]
+    
+    df = df.fillna(0)
+    df = df[['goals','xg','shots','xg/shot','shot_touch%','box_touches','pressures','succ. dribbles','aerials_won']]
+    
+    return round(df,2)
+
+def wb_kpis(wbs):
+    # calc kpis for wb
+    
+    cfs_df = wbs[['xg','event_type_name','type_name','play_pattern_name','player_name',
+       'player_position_name', 'location_x', 'location_y', 'end_location_x','pass_cross',
+       'end_location_y','under_pressure', 'outcome_name','counterpress','aerial_won']]
+    
+    # xg,shots, box_touches, pressures, aerials
+    tackles = cfs_df[cfs_df['type_name']=='Tackle'].groupby(['player_name'])['type_name'].count()
+    intercepts = (cfs_df[cfs_df['event_type_name']=='Interception']
+                  .groupby(['player_name'])['event_type_name'].count())
+    
+    pressures = (cfs_df[(cfs_df['event_type_name']=='Pressure')].
+             groupby(['player_name'])['event_type_name'].count())
+    
+    crosses = (cfs_df[(cfs_df['event_type_name']=='Pass')&
+                     (cfs_df['pass_cross']==True)].
+             groupby(['player_name'])['event_type_name'].count())
+    
+    # passes carries dribbles into final 3rd
+    deep_prog = (cfs_df[(cfs_df['event_type_name']=='Pass')
+                        |(cfs_df['event_type_name']=='Dribble')
+                       |(cfs_df['event_type_name']=='Carries')
+                       &(cfs_df['location_x']>=80)].
+             groupby(['player_name'])['event_type_name'].count())
+    
+    pass_complete =  (cfs_df[(cfs_df['event_type_name']=='Pass')&
+                     (cfs_df['outcome_name'].isnull())].
+             groupby(['player_name'])['event_type_name'].count())
+    
+    pass_incomp = (cfs_df[(cfs_df['event_type_name']=='Pass')&
+                     (cfs_df['outcome_name']=='Incomplete')].
+             groupby(['player_name'])['event_type_name'].count())
+
+    dribbles = (cfs_df[(cfs_df['event_type_name']=='Dribble')
+                      &(cfs_df['outcome_name']=='Complete')]
+                .groupby(['player_name'])['player_name'].count())
+    
+    aerials = cfs_df[(cfs_df['aerial_won']>0)].groupby(['player_name'])['aerial_won'].count()
+    
+    fouls = (cfs_df[(cfs_df['event_type_name']=='Foul Won')]
+                .groupby(['player_name'])['player_name'].count())
+    
+    # create df    
+    df = pd.concat([tackles,pressures,crosses,deep_prog,pass_complete
+                    ,pass_incomp,dribbles,aerials,fouls],axis=1)
+    df.columns = ['tack','pressures','crosses','deep_prog','pass_comp',
+                  'pass_incomp','succ. dribbles','aerials_won','fouls_won']
+    df['pass_%'] = (df['pass_comp']/(df['pass_incomp']+df['pass_comp']))*100
+    df = df.fillna(0)
+    
+    df = df[['tack','pressures','crosses','deep_prog','pass_%','succ. dribbles','aerials_won','fouls_won']]
+    
+    return round(df,2)
+
+
+def cm_kpis(cms):
+    # calc kpis for wb
+    
+    cfs_df = cms[['xg','event_type_name','type_name','play_pattern_name','player_name',
+       'player_position_name', 'location_x', 'location_y', 'end_location_x','pass_cross',
+       'end_location_y','under_pressure', 'outcome_name','counterpress','aerial_won']]
+    
+    # xg,shots, box_touches, pressures, aerials
+    pass_complete =  (cfs_df[(cfs_df['event_type_name']=='Pass')&
+                     (cfs_df['outcome_name'].isnull())].
+             groupby(['player_name'])['event_type_name'].count())
+    
+    pass_incomp = (cfs_df[(cfs_df['event_type_name']=='Pass')&
+                     (cfs_df['outcome_name']=='Incomplete')].
+             groupby(['player_name'])['event_type_name'].count())
+    
+    # passes carries dribbles into final 3rd
+    deep_prog = (cfs_df[(cfs_df['event_type_name']=='Pass')
+                        |(cfs_df['event_type_name']=='Dribble')
+                       |(cfs_df['event_type_name']=='Carries')
+                       &(cfs_df['location_x']>=80)].
+             groupby(['player_name'])['event_type_name'].count())
+    
+    dribbles = (cfs_df[(cfs_df['event_type_name']=='Dribble')
+                      &(cfs_df['outcome_name']=='Complete')]
+                .groupby(['player_name'])['player_name'].count())
+    
+    fouls = (cfs_df[(cfs_df['event_type_name']=='Foul Won')]
+            .groupby(['player_name'])['player_name'].count())
+
+    pressures = (cfs_df[(cfs_df['event_type_name']=='Pressure')].
+             groupby(['player_name'])['event_type_name'].count())
+    
+    
+    tackles = cfs_df[cfs_df['type_name']=='Tackle'].groupby(['player_name'])['type_name'].count()
+    intercepts = (cfs_df[cfs_df['event_type_name']=='Interception']
+                  .groupby(['player_name'])['event_type_name'].count())
+    
+    
+    # create df    
+    df = pd.concat([pass_complete,pass_incomp,deep_prog,dribbles,fouls
+                    ,pressures,tackles,intercepts],axis=1)
+    df.columns = ['pass_comp','pass_incomp','deep prog.','succ. dribbles','fouls_won',
+                 'pressures','tack','int']
+    df['pass_%'] = (df['pass_comp']/(df['pass_incomp']+df['pass_comp']))*100
+    
+    df = df.fillna(0)
+    df = df[['pass_%','deep prog.','succ. dribbles','fouls_won','pressures','tack']]
+    
+    return round(df,2)
+
+
+def cb_kpis(cbs):
+    # calc kpis for wb
+    
+    cfs_df = cbs[['xg','event_type_name','type_name','play_pattern_name','player_name',
+       'player_position_name', 'location_x', 'location_y', 'end_location_x','pass_cross',
+       'end_location_y','under_pressure', 'outcome_name','counterpress','aerial_won',
+                 'pass_height_name','under_pressure']]
+    
+    # xg,shots, box_touches, pressures, aerials
+    pass_complete =  (cfs_df[(cfs_df['event_type_name']=='Pass')&
+                     (cfs_df['outcome_name'].isnull())].
+             groupby(['player_name'])['event_type_name'].count())
+    
+    pass_incomp = (cfs_df[(cfs_df['event_type_name']=='Pass')&
+                     (cfs_df['outcome_name']=='Incomplete')].
+             groupby(['player_name'])['event_type_name'].count())
+    
+    pressures = (cfs_df[(cfs_df['event_type_name']=='Pressure')].
+         groupby(['player_name'])['event_type_name'].count())
+    
+    fouls = (cfs_df[(cfs_df['event_type_name']=='Foul Won')]
+        .groupby(['player_name'])['player_name'].count())
+    
+    tackles = cfs_df[cfs_df['type_name']=='Tackle'].groupby(['player_name'])['player_name'].count()
+    intercepts = (cfs_df[cfs_df['event_type_name']=='Interception']
+                  .groupby(['player_name'])['event_type_name'].count())
+    
+    aerials = cfs_df[(cfs_df['aerial_won']>0)].groupby(['player_name'])['aerial_won'].count()   
+    
+    clear = (cfs_df[(cfs_df['event_type_name']=='Clearance')]
+        .groupby(['player_name'])['player_name'].count())
+    
+#     # create df    
+    df = pd.concat([pass_complete,pass_incomp,pressures,fouls,
+                    tackles,intercepts,aerials,clear],axis=1)
+    df.columns = ['pass_comp','pass_incomp','pressures','fouls_won',
+                 'tack','int','aerials_won','clearances']
+    df['pass_%'] = (df['pass_comp']/(df['pass_incomp']+df['pass_comp']))*100
+    
+    df = df.fillna(0)
+    
+    df = df[['pass_%','pressures','fouls_won',
+                 'tack','aerials_won','clearances']]
+    
+    return round(df,2)
+
+def team_kpi(all_events):
+    """
+    calulate kpis for each team across the whol match
+    
+    Arg
+    ------
+    all_events : all_events df
+    
+    Out
+    -------
+    df : pandas df
+    
+    """
+    
+    teams_df = all_events[((all_events['team_name']=='Fleetwood Town')
+                 |(all_events['team_name']=='Wycombe Wanderers'))]
+    
+    # calculate kpis
+    pressures = (teams_df[(teams_df['event_type_name']=='Pressure')].
+         groupby(['team_name'])['event_type_name'].count())
+
+    crosses = (teams_df[(teams_df['event_type_name']=='Pass')&
+                     (teams_df['pass_cross']==True)].
+             groupby(['team_name'])['event_type_name'].count())
+
+    # passes carries dribbles into final 3rd
+    deep_prog = (teams_df[(teams_df['event_type_name']=='Pass')
+                        |(teams_df['event_type_name']=='Dribble')
+                       |(teams_df['event_type_name']=='Carries')
+                       &(teams_df['location_x']>=80)].
+             groupby(['team_name'])['event_type_name'].count())
+
+    pass_complete =  (teams_df[(teams_df['event_type_name']=='Pass')&
+                     (teams_df['outcome_name'].isnull())].
+             groupby(['team_name'])['event_type_name'].count())
+
+    pass_incomp = (teams_df[(teams_df['event_type_name']=='Pass')&
+                     (teams_df['outcome_name']=='Incomplete')].
+             groupby(['team_name'])['event_type_name'].count())
+
+    xg = teams_df.groupby(['team_name'])['xg'].sum()
+
+    shots = teams_df[teams_df['event_type_name']=='Shot'].groupby(['team_name'])['event_type_name'].count()
+
+    box_touches = teams_df[(teams_df['location_x']>=99.6)
+      &(teams_df['location_y']>=17.67)
+      &(teams_df['location_y']<=65.75)
+      &(teams_df['event_type_name']!='Pressure')].groupby(['team_name'])['team_name'].count()
+    
+    
+    # combine kpis
+    df = pd.concat([xg,shots,box_touches,pressures,deep_prog,crosses,pass_complete,pass_incomp],axis=1)
+    df.columns = ['xg','shots','box_touches','pressures','deep prog','crosses','pass comp','pass incomp']
+
+    df['shot_touch%'] = (df['shots']/df['box_touches'])*100
+    df['xg/shot'] = df['xg']/df['shots']
+    df['pass%'] = (df['pass comp']/(df['pass comp']+df['pass incomp']))*100
+    
+    df = round(df[['xg','shots','xg/shot','box_touches','shot_touch%','deep prog'
+          ,'crosses','pressures','pass%']].transpose(),2)
+    
+    return df
+
+
+# pass_net
+
+def combination_finder(df):
+    # search all combinations of list
+    
+    lineup = list(df['formation_player_name'].unique())
+    
+    combs = []
+    for c in itertools.combinations(lineup,2):
+        combs.append(c)
+    
+    return combs
+
+
+def pass_combination_counts(passes,lineup):
+    
+    combs = combination_finder(lineup)
+    
+    # pass counts
+    pass_combs= []   
+    for p1,p2 in combs:
+        p = (passes[((passes['player_name']==p1)&
+           (passes['pass_recipient_name']==p2))|
+          ((passes['player_name']==p2)&
+           (passes['pass_recipient_name']==p1))])[['player_name','pass_recipient_name','event_type_name']]
+        df = pd.DataFrame({'player1':p1,
+                  'player2':p2,
+                  'pass_count':len(p)},
+                 index=[0])
+        pass_combs.append(df)
+    
+    passes_df = pd.concat(pass_combs).reset_index(drop=True)
+
+
+    return passes_df
+
+
+def pass_xgc(df):
+    # xg contribution for pass combinations
+    
+    # shot possessions
+    shot_possessions = df[df['event_type_name']=='Shot']['possession'].unique()
+    
+    # xg contribution per pass for each possession
+    xgc = []
+    for poss in shot_possessions:
+        d = df[df['possession']==poss].copy()
+        xg = d['xg'].sum()
+        passes = d.groupby(['player_name','pass_recipient_name'])['pass_recipient_name'].count()
+        xgc.append((xg/passes.sum())*passes)
+    
+    f = pd.concat(xgc).groupby(['player_name','pass_recipient_name']).sum()
+    f.name = 'xgc'
+    
+    return pd.DataFrame(f).reset_index()
+
+
+
+def pass_combination_xgc(events,lineup):
+    
+    df = pass_xgc(events)
+    combs = combination_finder(lineup)
+    # pass counts
+    pass_combs= []   
+    for p1,p2 in combs:
+        p = (df[((df['player_name']==p1)&
+           (df['pass_recipient_name']==p2))|
+          ((df['player_name']==p2)&
+           (df['pass_recipient_name']==p1))])
+        d = pd.DataFrame({'player1':p1,
+                  'player2':p2,
+                  'xgc':p['xgc'].sum()},
+                 index=[0])
+        pass_combs.append(d)
+    
+    passes_df = pd.concat(pass_combs).reset_index(drop=True)
+    
+    
+    return passes_df
+
+
+def linear_color_scale(series,cmap,vmin,vmax):
+    import matplotlib.cm as cm
+    import matplotlib.colors as colors
+    norm = colors.Normalize(vmin, vmax, clip=True)
+    mapper = cm.ScalarMappable(norm,cmap)
+    # convert to rgba
+    c = []
+    for i in series:
+        c.append(mapper.to_rgba(i))
+    return c
+
+
+
+def player_ave_locations(df,color_scale):
+    # locations based on average touches
+    
+    # team name and plyrs
+    team_name = list(df['possession_team_name'].unique())
+    lineup = list(df['player_name'].unique())
+    
+    # ave location of plyrs (based on touches)
+    touch_events = ['Pass','Ball Receipt*','Carries','Shot','Ball Recovery','Clearance','Block',
+               'Goal Keeper','Miscontrol','Dribble','Interception']
+    touches = df[df['event_type_name'].isin(touch_events)]
+    player_locs = touches.groupby('player_name')[['location_x','location_y']].mean()
+    player_touches = touches.groupby('player_name')['player_name'].count()
+    player_touches.name = 'touch_count'
+    
+    # xg 
+    player_locs['xg'] = df.groupby(['player_name'])['xg'].sum()
+    
+    # linear color scale
+    player_locs['xg_colors'] = linear_color_scale(player_locs['xg'],color_scale,
+                                                  player_locs['xg'].min(),
+                                                  player_locs['xg'].max())
+    
+    return player_locs.join(player_touches)
+
+
+def pass_network_combinations_df(passes,events,lineup,color_scale):
+    # pass net counts, xgc and locations
+    
+    # pass counts
+    passes = pass_combination_counts(passes,lineup)
+    pass_df = passes[passes['pass_count']>0]
+    # xg
+    pass_xgc = pass_combination_xgc(events,lineup)
+    xgc_df = pass_xgc[pass_xgc['xgc']>0]
+    
+    # join with xgc info
+    joined_df = pass_df.merge(xgc_df,on=['player1','player2'],how='outer').fillna(0)
+    
+    # master df
+    plyr_locs = player_ave_locations(events,color_scale)
+    master_df = (
+    joined_df.merge(plyr_locs[['location_x','location_y']].reset_index().rename(columns={'player_name':'player1',
+                                                                             'location_x':'loc_x1',
+                                                                             'location_y':'loc_y1'})
+            ).merge(plyr_locs[['location_x','location_y']].reset_index().rename(columns={'player_name':'player2',
+                                                                             'location_x':'loc_x2',
+                                                                             'location_y':'loc_y2'}))
+    )
+    master_df['xgc_colors'] = linear_color_scale(master_df['xgc'],
+                                                 color_scale,
+                                                 master_df['xgc'].min(),
+                                                 master_df['xgc'].max())
+    
+    return master_df
+
+
+# utils
+
+def pass_network(df):
+    """
+    return pass network data points
+    uses average touches for player locations
+    completed passes for pass links
+    input df for a team and half (not sure would make sense for whole game)
+    
+    Arg
+    -----------
+    df : df of events for a team
+    
+    """
+    
+    # team name and plyrs
+    team_name = list(df['possession_team_name'].unique())
+    lineup = list(df['player_name'].unique())
+    
+    # ave location of plyrs (based on touches)
+    touch_events = ['Pass','Ball Receipt*','Carries','Shot','Ball Recovery','Clearance','Block',
+               'Goal Keeper','Miscontrol','Dribble','Interception']
+    touches = df[df['event_type_name'].isin(touch_events)]
+    player_locs = touches.groupby('player_name')[['location_x','location_y']].mean()
+    
+     # completed passes
+    team_pass = df[(df['event_type_name']=='Pass')&
+                   (df['outcome_name'].isnull())]
+    # for given players
+    player_pass = team_pass[team_pass['player_name'].isin(lineup)]
+    
+    # x and y average locations of complete passes made
+    x_ave = (
+        player_pass.groupby(['player_name'])['location_x'].sum()
+        /player_pass.groupby(['player_name'])['location_x'].count()
+    )
+
+    y_ave = (
+        player_pass.groupby(['player_name'])['location_y'].sum()
+        /player_pass.groupby(['player_name'])['location_y'].count()
+    )
+    
+    # create the df of passes made and counts
+    players = []
+    for i in lineup:
+        players.append(player_pass[player_pass['player_name']==i]
+                       .groupby(['player_name','pass_recipient_name'])['pass_recipient_name'].count())
+        
+    list_dfs = []
+    for i in range(len(players)):
+        list_dfs.append(pd.DataFrame(players[i]))
+        list_dfs[i].columns = ['passes']
+        list_dfs[i] = list_dfs[i].reset_index()
+
+    passes_df = pd.concat(list_dfs)
+    
+    # add locations into pass df
+    for i in x_ave.index:
+        passes_df.loc[(passes_df['player_name']==i),'x start (ave)']= x_ave[i]
+        passes_df.loc[(passes_df['player_name']==i),'y start (ave)']= y_ave[i]
+        passes_df.loc[(passes_df['pass_recipient_name']==i),'x end (ave)']= x_ave[i]
+        passes_df.loc[(passes_df['pass_recipient_name']==i),'y end (ave)']= y_ave[i]
+        passes_df.loc[(passes_df['player_name']==i),'x loc (ave)']= player_locs.loc[i]['location_x']
+        passes_df.loc[(passes_df['player_name']==i),'y loc (ave)']= player_locs.loc[i]['location_y']
+    
+    
+    
+    return passes_df.reset_index(drop=True)
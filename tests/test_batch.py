@@ -0,0 +1,44 @@
+import os
+
+import pandas as pd
+import pytest
+
+from match_report import batch
+
+pytest.importorskip('matplotlib')
+
+
+@pytest.fixture
+def match_csv(raw_match, tmp_path):
+    path = str(tmp_path / 'm1.csv')
+    raw_match.to_csv(path, index=False)
+    return path
+
+
+def test_write_tables_keeps_named_indexes_only(match_csv, tmp_path):
+    result = batch.process_match(match_csv)
+    assert result['error'] is None
+    paths = batch.write_tables([result], str(tmp_path / 'out'))
+
+    for name, table in result['tables'].items():
+        written = pd.read_csv(paths[name])
+        assert 'index' not in written.columns
+        assert list(written.columns[:1]) == ['match']
+        assert len(written) == len(table)
+    assert list(pd.read_csv(paths['wb_kpis']).columns[:2]) == ['match', 'player_name']
+    assert list(pd.read_csv(paths['team_kpis']).columns[:2]) == ['match', 'team_name']
+    network = pd.read_csv(paths['pass_network'])
+    assert list(network.columns[1:]) == list(result['tables']['pass_network'].columns)
+
+
+def test_failed_match_is_reported(match_csv, tmp_path):
+    bad = str(tmp_path / 'm2.csv')
+    with open(bad, 'w') as f:
+        f.write('a,b\n1,2\n')
+    results = [batch.process_match(match_csv), batch.process_match(bad)]
+    assert results[0]['error'] is None and results[1]['error'] is not None
+
+    out = str(tmp_path / 'out')
+    batch.write_tables(results, out)
+    failures = pd.read_csv(os.path.join(out, 'failures.csv'))
+    assert list(failures['match']) == ['m2']
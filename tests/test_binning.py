@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+from match_report import binning
+
+
+def _xy(events):
+    d = events.dropna(subset=['location_x','location_y'])
+    return d['location_x'].to_numpy(dtype=float), d['location_y'].to_numpy(dtype=float)
+
+
+@pytest.mark.parametrize('bins, extent', [((5,5), None), ((12,8), binning.PITCH_RANGE),
+                                          (([0, 18, 60, 102, 120], [0, 18, 62, 80]), None)])
+def test_zone_counts_equal_histogram2d(all_events, bins, extent):
+    binning._CACHE.clear()
+    counts, xedges, yedges = binning.zone_counts(all_events, bins, extent)
+    x, y = _xy(all_events)
+    expected, ex, ey = np.histogram2d(x, y, bins=bins, range=extent)
+    np.testing.assert_array_equal(counts, expected)
+    np.testing.assert_allclose(xedges, ex)
+    np.testing.assert_allclose(yedges, ey)
+
+    # memoised, read only
+    assert binning.zone_counts(all_events, bins, extent)[0] is counts
+    assert not counts.flags.writeable
+
+
+def test_points_on_the_last_edge():
+    x = np.array([0., 60., 120., 120.])
+    y = np.array([0., 40., 80., 0.])
+    edges = np.linspace(0, 120, 7), np.linspace(0, 80, 5)
+    idx = binning.cell_index(x, y, *edges)
+    expected, _, _ = np.histogram2d(x, y, bins=edges)
+    np.testing.assert_array_equal(np.bincount(idx, minlength=24).reshape(6, 4), expected)
+    assert binning.cell_index(np.array([121.]), np.array([10.]), *edges)[0] == -1
+
+
+def test_zone_counts_by_equal_one_histogram_per_group(all_events):
+    counts, groups, xedges, yedges = binning.zone_counts_by(all_events, ['team_name','period'],
+                                                            (6,4))
+    assert len(groups) == all_events.groupby(['team_name','period']).ngroups
+    for i, key in enumerate(groups):
+        d = all_events[(all_events['team_name']==key[0])&(all_events['period']==key[1])]
+        expected, _, _ = np.histogram2d(*_xy(d), bins=(6,4), range=binning.PITCH_RANGE)
+        np.testing.assert_array_equal(counts[i], expected)
+
+
+def test_zone_stats_shares(all_events):
+    table = binning.zone_stats(all_events, (6,4), by='team_name')
+    assert len(table) == all_events['team_name'].nunique()*24
+    np.testing.assert_allclose(table.groupby('team_name')['share'].sum(), 1)
+    counts, groups, _, _ = binning.zone_counts_by(all_events, 'team_name', (6,4))
+    np.testing.assert_array_equal(table['count'], counts.ravel())
+
+
+def test_group_codes_skip_rows_missing_a_key(all_events):
+    for by in ['player_name', ['team_name','player_name']]:
+        codes, groups = binning.group_codes(all_events, by)
+        keys = [by] if isinstance(by, str) else by
+        missing = all_events[keys].isna().any(axis=1).to_numpy()
+        assert missing.any()
+        assert (codes[missing] == -1).all() and (codes[~missing] >= 0).all()
+        assert len(groups) == all_events.groupby(keys).ngroups
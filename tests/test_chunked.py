@@ -0,0 +1,48 @@
+import pandas as pd
+import pytest
+
+from match_report import chunked, data_loader, kpis
+
+
+@pytest.fixture(scope='module')
+def season_csv(raw_season, tmp_path_factory):
+    path = str(tmp_path_factory.mktemp('export') / 'season.csv')
+    raw_season.to_csv(path, index=False)
+    return path
+
+
+def test_chunked_tables_match_season_kpis(season_csv):
+    raw = pd.read_csv(season_csv, low_memory=False)
+    # duplicates are per match
+    events = pd.concat([data_loader.event_selector(m) for _, m in raw.groupby('match_id', sort=False)])
+    expected = kpis.season_kpis(events)
+
+    tables = chunked.season_tables(season_csv, chunksize=997)
+    for name in expected:
+        pd.testing.assert_frame_equal(tables[name], expected[name], check_dtype=False,
+                                      check_names=False)
+
+    passes = events[(events['event_type_name']=='Pass')&(events['outcome_name'].isnull())]
+    counts = (passes.groupby(['match_id','team_name','player_name','pass_recipient_name'])
+              .size().rename('pass_count').reset_index())
+    pd.testing.assert_frame_equal(tables['pass_counts'], counts, check_dtype=False)
+
+
+def test_chunk_size_does_not_change_the_tables(season_csv):
+    small = chunked.season_tables(season_csv, chunksize=101)
+    large = chunked.season_tables(season_csv, chunksize=10**6)
+    for name in large:
+        pd.testing.assert_frame_equal(small[name], large[name])
+
+
+def test_chunked_tables_of_an_empty_export(raw_season, tmp_path):
+    path = str(tmp_path / 'empty.csv')
+    raw_season.iloc[:0].to_csv(path, index=False)
+    tables = chunked.season_tables(path)
+    expected = kpis.season_kpis(data_loader.event_selector(raw_season.iloc[:0]))
+    for name in expected:
+        assert len(tables[name]) == 0
+        assert list(tables[name].columns) == list(expected[name].columns)
+    assert len(tables['pass_counts']) == 0
+    assert list(tables['pass_counts'].columns) == ['match_id','team_name','player_name',
+                                                   'pass_recipient_name','pass_count']
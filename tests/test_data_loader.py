@@ -0,0 +1,75 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import reference
+from match_report import data_loader
+
+
+@pytest.fixture
+def match_csv(raw_match, tmp_path):
+    path = str(tmp_path / 'm1.csv')
+    raw_match.to_csv(path, index=False)
+    return path
+
+
+def test_parquet_round_trip(match_csv, tmp_path):
+    pytest.importorskip('pyarrow')
+    cache_dir = str(tmp_path / 'cache')
+    events = data_loader.load_events(match_csv, cache_dir=cache_dir)
+    assert os.path.exists(os.path.join(cache_dir, 'm1.parquet'))
+
+    raw = pd.read_csv(match_csv, low_memory=False)
+    assert list(events.columns) == list(raw.columns)
+    for col in data_loader.CATEGORICAL_COLUMNS:
+        if col in raw.columns:
+            assert isinstance(events[col].dtype, pd.CategoricalDtype)
+    for col in data_loader.FLOAT32_COLUMNS:
+        assert events[col].dtype == np.float32
+        np.testing.assert_allclose(events[col], raw[col], rtol=1e-6)
+
+    # same values as the csv, only the dtypes differ
+    typed = data_loader.optimise_dtypes(raw)
+    columns = [c for c in typed.columns if c in data_loader.CATEGORICAL_COLUMNS
+               or pd.api.types.is_numeric_dtype(typed[c])]
+    pd.testing.assert_frame_equal(events[columns], typed[columns])
+
+
+def test_column_projection(match_csv, tmp_path):
+    pytest.importorskip('pyarrow')
+    cache_dir = str(tmp_path / 'cache')
+    events = data_loader.load_events(match_csv, 'kpis', cache_dir)
+    assert list(events.columns) == list(dict.fromkeys(data_loader.ANALYSIS_COLUMNS['kpis']))
+
+    # columns the file does not have are skipped
+    events = data_loader.load_events(match_csv, ['player_name', 'not_a_column'], cache_dir)
+    assert list(events.columns) == ['player_name']
+
+
+def test_cache_is_rebuilt_for_a_newer_csv(match_csv, raw_match, tmp_path):
+    pytest.importorskip('pyarrow')
+    cache_dir = str(tmp_path / 'cache')
+    cache = os.path.join(cache_dir, 'm1.parquet')
+    data_loader.load_events(match_csv, cache_dir=cache_dir)
+    # the cache is reused while the csv is unchanged
+    os.utime(cache, (1, 1))
+    os.utime(match_csv, (0, 0))
+    data_loader.load_events(match_csv, cache_dir=cache_dir)
+    assert os.path.getmtime(cache) == 1
+
+    raw_match.iloc[:100].to_csv(match_csv, index=False)
+    assert len(data_loader.load_events(match_csv, cache_dir=cache_dir)) == 100
+
+
+def test_event_selector_matches_reference(raw_match):
+    pd.testing.assert_frame_equal(data_loader.event_selector(raw_match),
+                                  reference.event_selector(raw_match))
+    pd.testing.assert_frame_equal(data_loader.event_selector(raw_match, 'Pass'),
+                                  reference.event_selector(raw_match, 'Pass'))
+    # several types in one pass
+    both = data_loader.event_selector(raw_match, ['Pass','Shot'])
+    expected = pd.concat([reference.event_selector(raw_match, t) for t in ('Pass','Shot')])
+    pd.testing.assert_frame_equal(both.sort_values('index').reset_index(drop=True),
+                                  expected.sort_values('index').reset_index(drop=True))
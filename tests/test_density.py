@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from match_report import density
+
+# cell area of the default grid, one square pitch unit
+CELL_AREA = 1.0
+
+
+def _points(xy, **columns):
+    xy = np.asarray(xy, dtype=float)
+    return pd.DataFrame({'location_x': xy[:, 0], 'location_y': xy[:, 1], **columns})
+
+
+def test_surfaces_integrate_to_one(all_events):
+    passes = all_events[all_events['event_type_name']=='Pass']
+    surfaces, groups, xc, yc = density.kde_by(passes, ['team_name','period'])
+    assert len(groups) == passes.groupby(['team_name','period']).ngroups
+    np.testing.assert_allclose(surfaces.sum(axis=(1, 2))*CELL_AREA, 1)
+
+    # also near the touchlines, where kernel mass falls off the pitch
+    corner = _points([[0.5, 0.5], [119, 79], [1, 40]])
+    surface, xc, yc = density.kde(corner, bw=10)
+    assert surface.sum()*CELL_AREA == pytest.approx(1)
+
+
+def test_matches_a_direct_gaussian_kde():
+    # points on cell centres, where linear binning is exact
+    xy = np.array([[30.5, 20.5], [60.5, 40.5], [62.5, 41.5], [90.5, 70.5]])
+    surface, xc, yc = density.kde(_points(xy), bw=6)
+    gx, gy = np.meshgrid(xc, yc, indexing='ij')
+    direct = sum(np.exp(-0.5*((gx - x)**2 + (gy - y)**2)/36) for x, y in xy)
+    direct = direct/(direct.sum()*CELL_AREA)
+    np.testing.assert_allclose(surface, direct, atol=1e-12)
+
+
+def test_single_point_gets_a_minimum_bandwidth():
+    surface, xc, yc = density.kde(_points([[60.5, 40.5]]))
+    assert surface.sum()*CELL_AREA == pytest.approx(1)
+    assert np.unravel_index(surface.argmax(), surface.shape) == (60, 40)
+    # spread over more than one cell
+    assert (surface > 1e-3).sum() > 4
+
+    # a group of points at one location, as a single point
+    same, _, _ = density.kde(_points([[60.5, 40.5]]*3))
+    np.testing.assert_allclose(same, surface)
+
+
+def test_groups_and_weights():
+    df = _points([[20, 20], [30, 25], [100, 60], [90, 50], [95, 55]],
+                 team_name=['a', 'a', 'b', 'b', 'b'], xg=[1, 1, 2, 1, 0.5])
+    surfaces, groups, _, _ = density.kde_by(df, 'team_name', bw=5)
+    assert list(groups) == ['a', 'b']
+    for k, team in enumerate(groups):
+        single, _, _ = density.kde(df[df['team_name']==team], bw=5)
+        np.testing.assert_allclose(surfaces[k], single)
+
+    # a weight of 2 counts a point twice
+    weighted, _, _ = density.kde(df.iloc[2:4], bw=5, weights='xg')
+    doubled, _, _ = density.kde(df.iloc[[2, 2, 3]], bw=5)
+    np.testing.assert_allclose(weighted, doubled)
+
+
+def test_empty_group_is_zero():
+    df = _points([[20, 20], [np.nan, 30]], team_name=['a', 'b'])
+    surfaces, groups, _, _ = density.kde_by(df, 'team_name')
+    assert surfaces[1].sum() == 0
+    assert surfaces[0].sum()*CELL_AREA == pytest.approx(1)
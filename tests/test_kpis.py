@@ -0,0 +1,60 @@
+import pandas as pd
+import pytest
+
+import reference
+from match_report import data_loader, kpis
+
+
+def _position_events(events, name):
+    return events[events['player_position_name'].isin(kpis.POSITION_GROUPS[name])]
+
+
+@pytest.mark.parametrize('name', ['wb','cm','cb'])
+def test_positional_kpis_match_reference(all_events, name):
+    events = _position_events(all_events, name)
+    # same rows in the same order
+    pd.testing.assert_frame_equal(getattr(kpis, name+'_kpis')(events),
+                                  getattr(reference, name+'_kpis')(events),
+                                  check_dtype=False, check_names=False)
+
+
+def test_fwds_kpis_match_reference(all_events):
+    events = _position_events(all_events, 'fwds')
+    # the original goals column was a placeholder for two players
+    events = events[events['player_name'].isin(events['player_name'].unique()[:2])]
+    pd.testing.assert_frame_equal(kpis.fwds_kpis(events).drop(columns='goals'),
+                                  reference.fwds_kpis(events).drop(columns='goals'),
+                                  check_dtype=False, check_names=False)
+
+
+def test_team_kpi_matches_reference(all_events):
+    pd.testing.assert_frame_equal(kpis.team_kpi(all_events), reference.team_kpi(all_events),
+                                  check_dtype=False, check_names=False)
+
+
+def test_custom_kpi_set_finish(all_events):
+    # a kpi set's finish is applied to the grouped rows of any grouping
+    kpi_sets = {'shots': ([kpis.Metric('shots', lambda m: m.eq('event_type_name', 'Shot'), None)],
+                          'team_name', lambda df: df*2)}
+    tables = kpis.season_kpis(all_events, by=None, kpi_sets=kpi_sets)
+    expected = all_events[all_events['event_type_name']=='Shot'].groupby('team_name').size()*2
+    pd.testing.assert_series_equal(tables['shots']['shots'], expected, check_dtype=False,
+                                   check_names=False)
+
+
+def test_season_kpis_match_per_match_tables(raw_season):
+    events = pd.concat([data_loader.event_selector(m) for _, m in raw_season.groupby('match_id')])
+    tables = kpis.season_kpis(events)
+    for name in kpis.POSITION_GROUPS:
+        parts = []
+        for match_id, m in events.groupby('match_id'):
+            t = getattr(kpis, name+'_kpis')(_position_events(m, name))
+            t.index = pd.MultiIndex.from_product([[match_id], t.index], names=['match_id','player_name'])
+            parts.append(t)
+        pd.testing.assert_frame_equal(tables[name], pd.concat(parts).sort_index(), check_dtype=False)
+
+    teams = kpis.team_kpi(events, by=['match_id','team_name']).transpose()
+    pd.testing.assert_frame_equal(tables['team'], teams, check_dtype=False, check_names=False)
+    for match_id, m in events.groupby('match_id'):
+        pd.testing.assert_frame_equal(tables['team'].loc[match_id], kpis.team_kpi(m).transpose(),
+                                      check_dtype=False, check_names=False)
@@ -0,0 +1,34 @@
+import numpy as np
+import pandas as pd
+
+from match_report import data_loader, kpis
+from match_report.live import LiveKpis
+
+
+def test_live_tables_match_season_kpis(raw_match):
+    live = LiveKpis()
+    # batches of the raw events, with every batch replayed once
+    for batch in np.array_split(np.arange(len(raw_match)), 7):
+        live.update(raw_match.iloc[batch])
+        assert live.update(raw_match.iloc[batch]) == 0
+
+    events = data_loader.event_selector(raw_match)
+    assert live.n_events == len(events)
+    expected = kpis.season_kpis(events, by=None)
+    for name in kpis.POSITION_GROUPS:
+        pd.testing.assert_frame_equal(live.table(name), expected[name], check_dtype=False,
+                                      check_names=False)
+    # one column per team, as team_kpi
+    pd.testing.assert_frame_equal(live.table('team'), kpis.team_kpi(events), check_dtype=False,
+                                  check_names=False)
+
+
+def test_single_events_and_empty_tables(raw_match):
+    live = LiveKpis()
+    assert len(live.table('wb')) == 0
+
+    events = data_loader.event_selector(raw_match).iloc[:100]
+    for _, row in events.iterrows():
+        live.update(row)
+    pd.testing.assert_frame_equal(live.table('team'), kpis.team_kpi(events), check_dtype=False,
+                                  check_names=False)
@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+
+from match_report import data_loader, kpis
+from match_report.match_events import MatchEvents
+
+
+def test_rows_match_boolean_masks(raw_match):
+    events = MatchEvents(raw_match)
+    mask = ((raw_match['event_type_name'] == 'Pass') & raw_match['outcome_name'].isna()
+            & (raw_match['team_name'] == 'Fleetwood Town')).to_numpy()
+    rows = events.rows(event_type_name='Pass', outcome_name=None, team_name='Fleetwood Town')
+    assert np.array_equal(rows, np.flatnonzero(mask))
+
+
+def test_repeated_values_do_not_duplicate_rows(raw_match):
+    events = MatchEvents(raw_match)
+    passes = events.rows(event_type_name='Pass')
+    assert np.array_equal(events.rows(event_type_name=['Pass','Pass']), passes)
+    assert np.array_equal(events.rows(outcome_name=[None, np.nan]), events.rows(outcome_name=None))
+
+    nested = events.select(event_type_name=['Pass','Pass']).select(team_name=['Fleetwood Town','Fleetwood Town'])
+    expected = events.rows(event_type_name='Pass', team_name='Fleetwood Town')
+    assert np.array_equal(nested.positions, expected)
+    assert len(nested.frame) == len(expected)
+
+
+def test_empty_value_list(raw_match):
+    events = MatchEvents(raw_match)
+    assert len(events.rows(event_type_name=[])) == 0
+
+
+def test_kpi_tables_are_the_same_from_match_events(all_events):
+    events = MatchEvents(all_events)
+    pd.testing.assert_frame_equal(kpis.team_kpi(events), kpis.team_kpi(all_events))
+    wb = kpis.POSITION_GROUPS['wb']
+    pd.testing.assert_frame_equal(
+        kpis.wb_kpis(events.select(player_position_name=wb)),
+        kpis.wb_kpis(all_events[all_events['player_position_name'].isin(wb)]))
+
+
+def test_event_selector_of_match_events(raw_match):
+    events = MatchEvents(raw_match)
+    pd.testing.assert_frame_equal(data_loader.event_selector(events).frame,
+                                  data_loader.event_selector(raw_match))
+    columns = list(raw_match.columns)
+    pd.testing.assert_frame_equal(
+        data_loader.event_selector(events, ['Pass','Shot']).frame[columns].reset_index(drop=True),
+        data_loader.event_selector(raw_match, ['Pass','Shot'])[columns].reset_index(drop=True))
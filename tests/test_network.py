@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from match_report import network
+
+
+def _passes(team, links):
+    return pd.DataFrame({'team_name': team, 'player_name': [a for a, b in links],
+                         'pass_recipient_name': [b for a, b in links]})
+
+
+@pytest.fixture
+def passes():
+    # g1: A-B, B-C, C-D, B-D, D-E (C-D both ways, B-C twice, one pass to self)
+    g1 = _passes('g1', [('A','B'), ('B','C'), ('B','C'), ('C','D'), ('D','C'), ('D','B'),
+                        ('E','D'), ('A','A')])
+    # g2: a square A-B-C-D-A
+    g2 = _passes('g2', [('A','B'), ('B','C'), ('C','D'), ('D','A')])
+    return pd.concat([g1, g2], ignore_index=True)
+
+
+def test_adjacency(passes):
+    A, players, groups = network.adjacency(passes, 'team_name')
+    assert list(groups) == ['g1','g2']
+    assert list(players[0]) == ['A','B','C','D','E']
+    assert list(players[1]) == ['A','B','C','D',None]
+    assert A[0, 1, 2] == 2 and A[0, 2, 3] == 1 and A[0, 3, 2] == 1
+    # passes to self are dropped
+    assert A[0, 0, 0] == 0 and A[0].sum() == 7
+    assert A[1].sum() == 4 and A[1, :, 4].sum() == 0
+
+
+def test_clustering_and_betweenness_of_hand_built_graphs(passes):
+    A, players, groups = network.adjacency(passes, 'team_name')
+    np.testing.assert_allclose(network.clustering(A[0]), [0, 1/3, 1, 1/3, 0])
+    np.testing.assert_allclose(network.clustering(A[1]), [0, 0, 0, 0, 0])
+
+    # shortest paths through B: A-C, A-D, A-E; through D: A-E, B-E, C-E, of 6 pairs
+    np.testing.assert_allclose(network.betweenness(A[0]), [0, 0.5, 0, 0.5, 0])
+    # two shortest paths between opposite corners of the square, one through each other corner
+    np.testing.assert_allclose(network.betweenness(A[1]), [1/6, 1/6, 1/6, 1/6, 0])
+    # batched networks give the same values
+    np.testing.assert_allclose(network.betweenness(A)[0], network.betweenness(A[0]))
+
+
+def test_shortest_paths(passes):
+    A, players, groups = network.adjacency(passes, 'team_name')
+    dist, sigma = network.shortest_paths(A[1, :4, :4])
+    np.testing.assert_array_equal(dist[0], [0, 1, 2, 1])
+    np.testing.assert_array_equal(sigma[0], [1, 1, 2, 1])
+    dist, sigma = network.shortest_paths(np.array([[0, 1, 0], [0, 0, 0], [0, 0, 0]]))
+    assert np.isinf(dist[0, 2]) and sigma[0, 2] == 0
+
+
+def test_network_metrics(passes):
+    players, teams = network.network_metrics(passes, 'team_name')
+    g1 = players[players['team_name']=='g1'].set_index('player_name')
+    assert list(g1['degree_out']) == [1, 1, 1, 2, 1]
+    assert list(g1['strength_out']) == [1, 2, 1, 2, 1]
+    assert list(g1['strength_in']) == [0, 2, 3, 2, 0]
+    np.testing.assert_allclose(g1['betweenness'], [0, 0.5, 0, 0.5, 0])
+    # eigenvector centrality of a symmetric network: equal for the square
+    g2 = players[players['team_name']=='g2']
+    np.testing.assert_allclose(g2['eigenvector'], 0.5)
+
+    assert list(teams['players']) == [5, 4]
+    assert list(teams['links']) == [6, 4]
+    assert list(teams['passes']) == [7, 4]
+    np.testing.assert_allclose(teams['density'], [6/20, 4/12])
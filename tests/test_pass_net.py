@@ -0,0 +1,131 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import reference
+from match_report import data_loader, pass_net, utils
+
+
+def test_pass_combination_counts_match_reference(network_inputs):
+    passes, events, lineup = network_inputs
+    pd.testing.assert_frame_equal(pass_net.pass_combination_counts(passes, lineup),
+                                  reference.pass_combination_counts(passes, lineup),
+                                  check_dtype=False)
+
+
+def test_pass_combination_counts_without_passes(network_inputs):
+    passes, events, lineup = network_inputs
+    pd.testing.assert_frame_equal(pass_net.pass_combination_counts(passes.iloc[:0], lineup),
+                                  reference.pass_combination_counts(passes.iloc[:0], lineup),
+                                  check_dtype=False)
+
+
+def _sorted(df, by):
+    return df.sort_values(by).reset_index(drop=True)
+
+
+def test_pass_xgc_matches_reference(network_inputs):
+    passes, events, lineup = network_inputs
+    keys = ['player_name','pass_recipient_name']
+    table = _sorted(pass_net.pass_xgc(events), keys)
+    expected = _sorted(reference.pass_xgc(events), keys)
+    pd.testing.assert_frame_equal(table.astype({k: object for k in keys}),
+                                  expected.astype({k: object for k in keys}), check_dtype=False)
+
+    pd.testing.assert_frame_equal(pass_net.pass_combination_xgc(events, lineup),
+                                  reference.pass_combination_xgc(events, lineup), check_dtype=False)
+
+
+def test_decay_model_shares_the_same_xg(network_inputs):
+    passes, events, lineup = network_inputs
+    equal = pass_net.pass_xgc(events)
+    decay = pass_net.pass_xgc(events, model='decay', half_life=5.0)
+    # the weights only move xg between the passes of a possession
+    np.testing.assert_allclose(decay['xgc'].sum(), equal['xgc'].sum())
+    assert not np.allclose(_sorted(decay, ['player_name','pass_recipient_name'])['xgc'],
+                           _sorted(equal, ['player_name','pass_recipient_name'])['xgc'])
+
+    # without decay every pass gets the same share
+    flat = pass_net.pass_xgc(events, model='decay', half_life=1e12)
+    np.testing.assert_allclose(flat['xgc'], equal['xgc'])
+
+    with pytest.raises(ValueError):
+        pass_net.pass_xgc(events, model='linear')
+
+
+def _colours(df, name):
+    # numeric colour columns as the rgba tuples of the original tables
+    return [tuple(c) for c in df[pass_net.rgba_columns(name)].to_numpy()]
+
+
+def test_linear_color_scale_matches_reference():
+    pytest.importorskip('matplotlib')
+    values = pd.Series([0., 0.1, 0.25, np.nan, 0.9, 1.5])
+    np.testing.assert_allclose(pass_net.linear_color_scale(values, 'cool', 0, 1),
+                               reference.linear_color_scale(values, 'cool', 0, 1))
+
+
+def test_player_ave_locations_match_reference(network_inputs):
+    pytest.importorskip('matplotlib')
+    passes, events, lineup = network_inputs
+    table = pass_net.player_ave_locations(events, 'cool')
+    expected = reference.player_ave_locations(events, 'cool')
+    columns = ['location_x','location_y','xg','touch_count']
+    pd.testing.assert_frame_equal(table[columns], expected[columns], check_dtype=False,
+                                  check_index_type=False)
+    np.testing.assert_allclose(_colours(table, 'xg_color'), list(expected['xg_colors']))
+
+
+def test_pass_network_combinations_match_reference(network_inputs):
+    pytest.importorskip('matplotlib')
+    passes, events, lineup = network_inputs
+    table = pass_net.pass_network_combinations_df(passes, events, lineup, 'cool')
+    expected = reference.pass_network_combinations_df(passes, events, lineup, 'cool')
+    columns = ['player1','player2','pass_count','xgc','loc_x1','loc_y1','loc_x2','loc_y2']
+    pd.testing.assert_frame_equal(table[columns], expected[columns], check_dtype=False)
+    np.testing.assert_allclose(_colours(table, 'xgc_color'), list(expected['xgc_colors']))
+
+
+def test_full_match_window_equals_the_network(network_inputs):
+    pytest.importorskip('matplotlib')
+    passes, events, lineup = network_inputs
+    timeline = pass_net.pass_network_timeline(passes, events, lineup, 'cool', windows=[(0, 200)])
+    network = pass_net.pass_network_combinations_df(passes, events, lineup, 'cool')
+    keys = ['player1','player2']
+    t = _sorted(timeline[timeline['pass_count'] > 0], keys)
+    n = _sorted(network[network['pass_count'] > 0], keys)
+    pd.testing.assert_frame_equal(t[keys+['pass_count']], n[keys+['pass_count']], check_dtype=False)
+    np.testing.assert_allclose(t['xgc'], n['xgc'])
+
+
+def test_stoppage_time_does_not_overlap_the_next_period():
+    # first half stoppage time at 45:30 and 47:10, second half kick off at 45:00
+    df = pd.DataFrame({'match_id': [1, 1, 1, 1, 2, 2],
+                       'period': [1, 1, 1, 2, 1, 2],
+                       'minute': [0, 45, 47, 45, 10, 50],
+                       'second': [0, 30, 10, 0, 0, 0],
+                       'timestamp': ['00:00:00', '00:45:30', '00:47:10', '00:00:00',
+                                     '00:10:00', '00:05:00']})
+    clock = pass_net.event_seconds(df)
+    np.testing.assert_allclose(clock, [0, 45.5*60, (47+1/6)*60, (47+1/6)*60, 600, 50*60])
+    # the same clock from timestamps
+    np.testing.assert_allclose(pass_net.event_seconds(df.drop(columns=['minute','second'])), clock)
+
+    with pytest.raises(ValueError):
+        pass_net.event_seconds(df.drop(columns=['minute','second','period']))
+
+
+def test_timestamp_clock_matches_minutes(all_events):
+    # the 'pass_net' column projection without minute/second, timestamps restart each period
+    clock = pass_net.event_seconds(all_events.drop(columns=['minute','second']))
+    np.testing.assert_allclose(clock, pass_net.event_seconds(all_events), atol=1)
+    second_half = (all_events['period'] == 2).to_numpy()
+    assert clock[second_half].min() >= clock[~second_half].max()
+
+
+def test_pass_network_windows_without_minutes(all_events):
+    windows = [(0, 15), (10, 30), (45, 60), (60, 200)]
+    projected = all_events[list(dict.fromkeys(data_loader.ANALYSIS_COLUMNS['pass_net']))]
+    table = utils.pass_network_windows(projected.drop(columns=['minute','second']), windows)
+    pd.testing.assert_frame_equal(table, utils.pass_network_windows(all_events, windows))
+    assert set(table['window_start']) == {0, 10, 45, 60}
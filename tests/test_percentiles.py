@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from match_report import data_loader, kpis, percentiles
+
+
+@pytest.fixture(scope='module')
+def tables(raw_season):
+    return percentiles.per90_tables(raw_season)
+
+
+def test_duplicates_are_dropped_within_each_match(raw_match):
+    # the same match twice: twice the events in twice the minutes
+    twice = pd.concat([raw_match, raw_match.assign(match_id=2)], ignore_index=True)
+    single = percentiles.per90_tables(raw_match)
+    double = percentiles.per90_tables(twice)
+    for name in single:
+        # kpis are rounded before the per 90 scaling
+        pd.testing.assert_frame_equal(double[name].drop(columns='minutes'),
+                                      single[name].drop(columns='minutes'), rtol=0.02, atol=0.01)
+        np.testing.assert_allclose(double[name]['minutes'], 2*single[name]['minutes'])
+
+
+def test_stints_need_the_raw_lineups(raw_match):
+    with pytest.raises(ValueError):
+        percentiles.per90_tables(data_loader.event_selector(raw_match))
+
+
+def test_estimate_minutes(all_events):
+    minutes = percentiles.estimate_minutes(all_events, by=None)
+    t = all_events['minute'] + all_events['second']/60
+    for name, positions in kpis.POSITION_GROUPS.items():
+        rows = all_events['player_position_name'].isin(positions)
+        span = t[rows].groupby(all_events['player_name'][rows]).agg(lambda v: v.max() - v.min())
+        np.testing.assert_allclose(minutes.loc[span.index, name], span)
+
+
+def _rank_percentiles(values, x):
+    # percentileofscore(kind='mean') from plain comparisons
+    values = np.asarray(values)
+    return np.array([((values < v).sum() + (values <= v).sum())/2/len(values)*100 for v in x])
+
+
+def test_store_percentiles_match_ranks(tables, tmp_path):
+    store = percentiles.DistributionStore.build(str(tmp_path / 'store'), tables, season='test')
+    assert store.meta['season'] == 'test'
+    for name, table in tables.items():
+        pd.testing.assert_frame_equal(store.players(name), table, check_dtype=False)
+
+        columns = store.kpis(name)
+        players = list(table.index[:5])
+        pct = store.percentiles(name, players)
+        for c in columns:
+            # ranks of the stored players within their own distribution
+            rank = table[c].rank(method='min') - 1 + table[c].rank(method='max')
+            np.testing.assert_allclose(pct[c], (rank/2/len(table)*100)[players])
+
+        # new per 90 values, e.g. of one match
+        values = table[columns].iloc[:3]*1.1
+        pct = store.percentiles(name, values)
+        for c in columns:
+            np.testing.assert_allclose(pct[c], _rank_percentiles(table[c], values[c]))
+
+
+def test_build_store_min_minutes(raw_season, tmp_path):
+    store = percentiles.build_store(str(tmp_path / 'store'), raw_season, min_minutes=100)
+    for name in percentiles.POSITIONS:
+        assert (store.players(name)['minutes'] >= 100).all()
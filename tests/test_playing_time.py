@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from match_report import data_loader, kpis, playing_time
+
+
+@pytest.fixture(scope='module')
+def season_stints(raw_season):
+    return playing_time.stints(raw_season)
+
+
+def test_stint_minutes_add_up_to_eleven_players(raw_season, season_stints):
+    _, length = playing_time.match_clock(raw_season)
+    team_minutes = season_stints.groupby(['match_id','team_name'])['minutes'].sum()
+    expected = 11*length.reindex(team_minutes.index.get_level_values('match_id')).to_numpy()/60
+    np.testing.assert_allclose(team_minutes, expected)
+
+    # eleven starters per team, no player in two places at once
+    starters = season_stints[season_stints['start'] == 0].groupby(['match_id','team_name']).size()
+    assert (starters == 11).all()
+    s = season_stints.sort_values(['match_id','team_name','player_name','start'])
+    nxt = s.groupby(['match_id','team_name','player_name'])['start'].shift(-1)
+    assert (nxt.isna() | (s['end'] <= nxt)).all()
+
+
+def test_replacement_takes_the_position_of_the_player_off(raw_match):
+    s = playing_time.stints(raw_match)
+    clock, length = playing_time.match_clock(raw_match)
+    subs = raw_match[(raw_match['event_type_name']=='Substitution')
+                     & raw_match['substitution_replacement_name'].notna()]
+    assert len(subs)
+    for row, sub in subs.iterrows():
+        t = clock[raw_match.index.get_loc(row)]
+        off = s[(s['player_name']==sub['player_name']) & (s['end']==t)]
+        on = s[(s['player_name']==sub['substitution_replacement_name']) & (s['start']==t)]
+        assert len(off) == 1
+        if t < length[sub['match_id']]:
+            assert len(on) == 1
+            assert on['position'].iloc[0] == off['position'].iloc[0]
+        else:
+            # on at the final whistle, no playing time
+            assert len(on) == 0
+
+
+def test_match_clock_lays_periods_end_to_end(raw_season):
+    clock, length = playing_time.match_clock(raw_season)
+    t = pd.DataFrame({'match_id': raw_season['match_id'], 'period': raw_season['period'],
+                      'clock': clock})
+    span = t.groupby(['match_id','period'])['clock'].agg(['min','max'])
+    for match_id, periods in span.groupby(level='match_id'):
+        assert periods['min'].iloc[0] == 0
+        # each period starts where the previous one ended
+        np.testing.assert_allclose(periods['min'].iloc[1:], periods['max'].iloc[:-1])
+        assert length[match_id] == pytest.approx(periods['max'].iloc[-1])
+
+
+def test_position_minutes(season_stints):
+    minutes = playing_time.position_minutes(season_stints)
+    np.testing.assert_allclose(minutes['minutes'],
+                               season_stints.groupby(['match_id','player_name'])['minutes'].sum())
+    groups = minutes[list(kpis.POSITION_GROUPS)].sum(axis=1)
+    assert (groups <= minutes['minutes'] + 1e-9).all()
+
+
+def test_per90_keeps_ratios():
+    table = pd.DataFrame({'tack': [3., 1.], 'pass_%': [80., 70.], 'xg/shot': [0.1, 0.2]})
+    out = playing_time.per90(table, [45, 0])
+    np.testing.assert_allclose(out['tack'], [6., np.nan])
+    pd.testing.assert_frame_equal(out[['pass_%','xg/shot']], table[['pass_%','xg/shot']])
+
+
+def test_stint_kpis_count_events_in_the_position_held(raw_match):
+    s = playing_time.stints(raw_match)
+    events = data_loader.event_selector(raw_match)
+    tables = playing_time.stint_kpis(events, s, by=None, per_90=False)
+
+    positioned = events.assign(player_position_name=playing_time.event_positions(events, s))
+    wb = positioned[positioned['player_position_name'].isin(kpis.POSITION_GROUPS['wb'])]
+    minutes = s.groupby(['player_name','position'])['minutes'].sum()
+    for (player, position), d in wb.groupby(['player_name','player_position_name']):
+        row = tables['wb'].loc[(player, position)]
+        expected = kpis.wb_kpis(d).iloc[0]
+        pd.testing.assert_series_equal(row.drop('minutes'), expected, check_names=False,
+                                       check_dtype=False)
+        assert row['minutes'] == pytest.approx(minutes[(player, position)])
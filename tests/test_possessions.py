@@ -0,0 +1,102 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from match_report import data_loader, possessions
+
+
+@pytest.fixture(scope='module')
+def season_events(raw_season):
+    # two leagues of matches, possession ids restart each match
+    return possessions.sort_events(data_loader.event_selector(raw_season)).reset_index(drop=True)
+
+
+@pytest.fixture(scope='module')
+def table(season_events):
+    return possessions.possession_table(season_events)
+
+
+def test_sort_events_keeps_an_ordered_frame(season_events):
+    assert possessions.sort_events(season_events) is season_events
+    shuffled = season_events.sample(frac=1, random_state=0)
+    out = possessions.sort_events(shuffled)
+    keys = out[['match_id','possession']].to_numpy()
+    assert (np.diff(keys[:, 0]) >= 0).all()
+    assert ((np.diff(keys[:, 0]) > 0) | (np.diff(keys[:, 1]) >= 0)).all()
+
+
+def test_counts_and_xg_equal_a_groupby(season_events, table):
+    df = season_events
+    own = df['team_name'] == df['possession_team_name']
+    d = df.assign(passes=own & (df['event_type_name']=='Pass'),
+                  passes_completed=own & (df['event_type_name']=='Pass') & df['outcome_name'].isnull(),
+                  shots=own & (df['event_type_name']=='Shot'))
+    d['xg'] = np.where(d['shots'], d['xg'].fillna(0), 0.)
+    g = d.groupby(['match_id','possession'])
+    expected = g[['passes','passes_completed','shots','xg']].sum()
+    expected['events'] = g.size()
+    expected['team_name'] = g['possession_team_name'].first()
+
+    t = table.set_index(['match_id','possession'])
+    for col in ['passes','passes_completed','shots','events']:
+        np.testing.assert_array_equal(t[col], expected[col])
+    np.testing.assert_allclose(t['xg'], expected['xg'])
+    np.testing.assert_array_equal(t['team_name'], expected['team_name'])
+
+
+def test_shot_is_the_last_own_event(season_events, table):
+    df = season_events
+    own = df[df['team_name'] == df['possession_team_name']]
+    last = own.groupby(['match_id','possession'])['event_type_name'].last() == 'Shot'
+    t = table.set_index(['match_id','possession'])['shot']
+    np.testing.assert_array_equal(t, last.reindex(t.index, fill_value=False))
+    assert t.any()
+    assert (table.loc[table['shot'], 'shots'] > 0).all()
+
+
+def test_rows_index_the_events(season_events, table):
+    rows = possessions.possession_rows(table)
+    np.testing.assert_array_equal(table['possession'].to_numpy()[rows], season_events['possession'])
+    np.testing.assert_array_equal(table['match_id'].to_numpy()[rows], season_events['match_id'])
+
+
+def test_events_out_of_order_raise(season_events):
+    with pytest.raises(ValueError):
+        # the first possession split in two
+        possessions.possession_table(season_events.iloc[np.r_[1:len(season_events), 0]])
+
+
+def test_xg_chain_and_kpis(season_events, table):
+    chain = possessions.xg_chain(season_events, table, by=['match_id','player_name'])
+    df = season_events[(season_events['team_name'] == season_events['possession_team_name'])
+                       & season_events['player_name'].notna()]
+    pairs = df[['match_id','player_name','possession']].drop_duplicates()
+    pairs = pairs.merge(table[['match_id','possession','xg','shot']], on=['match_id','possession'])
+    expected = pairs.groupby(['match_id','player_name']).agg(
+        xg_chain=('xg','sum'), possessions=('xg','size'), shot_possessions=('shot','sum'))
+    # players with only opposition possession events have no chain
+    expected = expected.reindex(chain.index, fill_value=0)
+    np.testing.assert_allclose(chain['xg_chain'], expected['xg_chain'])
+    np.testing.assert_array_equal(chain['possessions'], expected['possessions'])
+    np.testing.assert_array_equal(chain['shot_possessions'], expected['shot_possessions'])
+
+    k = possessions.possession_kpis(table, by=['match_id','team_name'])
+    g = table.groupby(['match_id','team_name'])
+    np.testing.assert_array_equal(k['possessions'], g.size())
+    np.testing.assert_allclose(k['shot%'], (g['shot'].mean()*100).round(2))
+    np.testing.assert_allclose(k['xg'], g['xg'].sum().round(2))
+
+
+def test_load_table_is_stored_next_to_the_cache(raw_match, tmp_path):
+    pytest.importorskip('pyarrow')
+    path = str(tmp_path / 'm1.csv')
+    raw_match.to_csv(path, index=False)
+
+    table = possessions.load_table(path)
+    assert os.path.exists(possessions.possessions_path(path))
+    events = possessions.load_events(path)
+    pd.testing.assert_frame_equal(table, possessions.possession_table(events), check_dtype=False)
+    # read back from the stored file
+    pd.testing.assert_frame_equal(possessions.load_table(path), table)
@@ -0,0 +1,91 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from match_report import profiling
+
+
+@profiling.profiled
+def inner(df):
+    return df.iloc[:10]
+
+
+@profiling.profiled
+def outer(df):
+    with profiling.stage('copy', len(df)) as s:
+        big = np.ones(1_000_000)
+        s.rows_out = len(big)
+    return inner(df), inner(df.iloc[:50])
+
+
+@profiling.profiled
+def fails(df):
+    raise ValueError('bad input')
+
+
+def test_no_records_outside_a_profiler():
+    with profiling.Profiler() as prof:
+        pass
+    outer(pd.DataFrame({'a': range(100)}))
+    assert prof.records == []
+
+
+def test_records_of_a_nested_call():
+    df = pd.DataFrame({'a': range(100)})
+    with profiling.Profiler() as prof, prof.match('m1'):
+        outer(df)
+
+    records = prof.records
+    # inner calls finish first
+    assert [r['stack'] for r in records] == ['test_profiling.outer;copy',
+                                             'test_profiling.outer;test_profiling.inner',
+                                             'test_profiling.outer;test_profiling.inner',
+                                             'test_profiling.outer']
+    assert [(r['rows_in'], r['rows_out']) for r in records] == [(100, 1_000_000), (100, 10),
+                                                                 (50, 10), (100, 10)]
+    assert all(r['match'] == 'm1' and not r['error'] for r in records)
+    top = records[-1]
+    children = sum(r['seconds'] for r in records[:-1])
+    assert top['self_seconds'] == pytest.approx(top['seconds'] - children)
+
+    table = profiling.summary(records)
+    assert table.loc['test_profiling.inner', 'calls'] == 2
+    assert profiling.summary(records, 'match').loc['m1', 'calls'] == 1
+
+
+def test_folded_output():
+    with profiling.Profiler() as prof, prof.match('m1'):
+        outer(pd.DataFrame({'a': range(100)}))
+
+    lines = prof.folded()
+    stacks = {line.rsplit(' ', 1)[0]: int(line.rsplit(' ', 1)[1]) for line in lines}
+    assert set(stacks) == {'m1;test_profiling.outer', 'm1;test_profiling.outer;copy',
+                           'm1;test_profiling.outer;test_profiling.inner'}
+    # self times add up to the outer call
+    total = prof.records[-1]['seconds']*1e6
+    assert sum(stacks.values()) == pytest.approx(total, abs=len(stacks))
+    values = [int(line.rsplit(' ', 1)[1]) for line in lines]
+    assert values == sorted(values, reverse=True)
+
+
+def test_errors_and_memory(tmp_path):
+    with profiling.Profiler(memory=True) as prof:
+        outer(pd.DataFrame({'a': range(100)}))
+        with pytest.raises(ValueError):
+            fails(pd.DataFrame({'a': range(5)}))
+
+    copy = [r for r in prof.records if r['function'] == 'copy'][0]
+    assert copy['peak_bytes'] >= 8_000_000
+    assert prof.records[-1]['error'] and prof.records[-1]['rows_out'] is None
+
+    path = prof.save(str(tmp_path / 'profile.json'))
+    with open(path) as f:
+        saved = json.load(f)
+    assert len(saved['records']) == len(prof.records)
+    assert {r['function'] for r in saved['functions']} == {'test_profiling.outer',
+                                                           'test_profiling.inner', 'copy',
+                                                           'test_profiling.fails'}
+    with open(prof.save(str(tmp_path / 'profile.folded'))) as f:
+        assert f.read().splitlines() == prof.folded()
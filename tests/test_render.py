@@ -0,0 +1,70 @@
+import os
+
+import numpy as np
+import pytest
+
+pytest.importorskip('matplotlib')
+
+import matplotlib.pyplot as plt
+from matplotlib.collections import LineCollection, PatchCollection
+
+from match_report import render
+
+
+def _draw_line(ax, x=(10, 110)):
+    # module level, so worker processes can run it
+    render.draw_passes(ax, [x[0]], [40], [x[1]], [40])
+
+
+def test_pitch_figure_is_headless():
+    figures = plt.get_fignums()
+    fig, ax = render.pitch_figure(6, 4)
+    assert plt.get_fignums() == figures
+
+    lines = [c for c in ax.collections if isinstance(c, LineCollection)]
+    patches = [c for c in ax.collections if isinstance(c, PatchCollection)]
+    assert len(lines) == 1 and len(lines[0].get_segments()) == len(render.PITCH_LINES)
+    assert sum(len(p.get_paths()) for p in patches) == len(render.PITCH_CIRCLES)
+    assert (ax.get_xlim(), ax.get_ylim()) == (render.PITCH_EXTENT[:2], render.PITCH_EXTENT[2:])
+
+
+def test_pitch_image_is_cached_and_read_only():
+    render.pitch_image.cache_clear()
+    image = render.pitch_image(0.5, width=620)
+    assert render.pitch_image(0.5, width=620) is image
+    assert image.shape[1] == 620 and image.shape[2] == 4
+    assert not image.flags.writeable
+    # markings are drawn on a transparent background
+    alpha = image[..., 3]
+    assert alpha.min() == 0 and alpha.max() > 0
+
+
+def test_draw_passes_in_one_collection():
+    fig, ax = render.pitch_figure(6, 4)
+    x1, y1, x2, y2 = np.array([[0, 10, 20], [5, 5, 5], [30, 40, 50], [60, 70, 80]], dtype=float)
+    lines = render.draw_passes(ax, x1, y1, x2, y2, widths=[1, 2, 3])
+    segments = np.array(lines.get_segments())
+    np.testing.assert_array_equal(segments[:, 0], np.column_stack([x1, y1]))
+    np.testing.assert_array_equal(segments[:, 1], np.column_stack([x2, y2]))
+    np.testing.assert_array_equal(lines.get_linewidths(), [1, 2, 3])
+
+
+def test_draw_density_skips_an_empty_surface():
+    fig, ax = render.pitch_figure(6, 4)
+    xc, yc = np.arange(12)*10+5., np.arange(8)*10+5.
+    assert render.draw_density(ax, np.zeros((12, 8)), xc, yc) is None
+    surface = np.zeros((12, 8))
+    surface[3, 4] = 1
+    assert render.draw_density(ax, surface, xc, yc) is not None
+
+
+@pytest.mark.parametrize('workers', [0, 2])
+def test_render_batch_writes_files_in_job_order(tmp_path, workers):
+    jobs = [('a', _draw_line, {}), ('b', _draw_line, {'x': (20, 100)})]
+    paths = render.render_batch(jobs, str(tmp_path), dpi=20, workers=workers)
+    assert paths == [os.path.join(str(tmp_path), name + '.png') for name in ('a', 'b')]
+    assert all(os.path.getsize(p) > 0 for p in paths)
+
+    paths = render.render_batch(jobs[:1], str(tmp_path), fmt='svg', workers=workers)
+    with open(paths[0]) as f:
+        assert f.read().lstrip().startswith('<?xml')
@@ -0,0 +1,102 @@
+import os
+import threading
+
+import pandas as pd
+import pytest
+
+from match_report import data_loader, kpis
+from match_report.result_cache import ResultCache, Source
+
+
+@pytest.fixture
+def match_csv(raw_match, tmp_path):
+    path = str(tmp_path / 'm1.csv')
+    raw_match.to_csv(path, index=False)
+    return path
+
+
+def _load(path):
+    return data_loader.event_selector(pd.read_csv(path, low_memory=False))
+
+
+def _load_typed(path):
+    return data_loader.event_selector(data_loader.optimise_dtypes(pd.read_csv(path, low_memory=False)))
+
+
+def test_hit_after_miss(match_csv, tmp_path):
+    cache = ResultCache(str(tmp_path / 'cache'))
+    first = cache.call(kpis.team_kpi, Source(match_csv, _load))
+    second = cache.call(kpis.team_kpi, Source(match_csv, _load))
+    assert (cache.misses, cache.hits) == (1, 1)
+    pd.testing.assert_frame_equal(first, second)
+
+    # a new cache on the same directory reuses the stored result
+    other = ResultCache(str(tmp_path / 'cache'))
+    other.call(kpis.team_kpi, Source(match_csv, _load))
+    assert (other.misses, other.hits) == (0, 1)
+
+
+def test_changed_file_arguments_or_loader_miss(match_csv, raw_match, tmp_path):
+    cache = ResultCache(str(tmp_path / 'cache'))
+    cache.call(kpis.team_kpi, Source(match_csv, _load))
+    cache.call(kpis.team_kpi, Source(match_csv, _load), ['Fleetwood Town'])
+    cache.call(kpis.team_kpi, Source(match_csv, _load_typed))
+    assert cache.misses == 3
+
+    raw_match.iloc[:-50].to_csv(match_csv, index=False)
+    cache.call(kpis.team_kpi, Source(match_csv, _load))
+    assert (cache.misses, cache.hits) == (4, 0)
+
+
+def test_invalidate_and_clear(match_csv, all_events, tmp_path):
+    cache = ResultCache(str(tmp_path / 'cache'))
+    cache.call(kpis.team_kpi, Source(match_csv, _load))
+    cache.call(kpis.wb_kpis, Source(match_csv, _load))
+    cache.call(kpis.team_kpi, all_events)
+
+    assert cache.invalidate(func=kpis.wb_kpis) == 1
+    assert cache.invalidate(source=match_csv) == 1
+    cache.call(kpis.team_kpi, Source(match_csv, _load))
+    assert cache.misses == 4
+
+    assert cache.clear() == 2
+    assert os.listdir(cache.cache_dir) == []
+    cache.call(kpis.team_kpi, all_events)
+    assert (cache.misses, cache.hits) == (5, 0)
+
+
+def test_invalidate_results_of_earlier_file_versions(match_csv, raw_match, tmp_path):
+    cache = ResultCache(str(tmp_path / 'cache'))
+    cache.call(kpis.team_kpi, Source(match_csv, _load))
+    raw_match.iloc[:-50].to_csv(match_csv, index=False)
+    cache.call(kpis.team_kpi, Source(match_csv, _load))
+
+    assert cache.invalidate(source=Source(match_csv)) == 2
+    assert os.listdir(cache.cache_dir) == []
+
+
+def test_eviction_removes_meta_data(all_events, tmp_path):
+    cache = ResultCache(str(tmp_path / 'cache'), max_bytes=0)
+    cache.call(kpis.team_kpi, all_events)
+    assert os.listdir(cache.cache_dir) == []
+
+
+def test_puts_from_threads(tmp_path):
+    cache = ResultCache(str(tmp_path / 'cache'))
+    frame = pd.DataFrame({'a': range(1000)})
+    errors = []
+
+    def put():
+        try:
+            for _ in range(20):
+                cache.put('same-key', frame)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=put) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert errors == []
+    pd.testing.assert_frame_equal(cache.get('same-key')[1], frame)
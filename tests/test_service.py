@@ -0,0 +1,77 @@
+import asyncio
+import json
+import os
+
+import pandas as pd
+import pytest
+
+from match_report import service
+
+pytest.importorskip('matplotlib')
+
+
+def _run(svc):
+    # the run must finish on its own, a hang fails the test
+    return asyncio.run(asyncio.wait_for(svc.run(until_idle=True), 120))
+
+
+@pytest.fixture
+def drop(raw_match, tmp_path):
+    path = tmp_path / 'drop'
+    path.mkdir()
+    raw_match.to_csv(path / 'm1.csv', index=False)
+    return str(path)
+
+
+def test_tables_are_published(drop, tmp_path):
+    out = str(tmp_path / 'out')
+    metrics = _run(service.IngestService(drop, out, workers=1, poll=0.05, threads=True))
+    assert (metrics['processed'], metrics['failed']) == (1, 0)
+
+    files = os.listdir(os.path.join(out, 'm1'))
+    assert {'team_kpis.csv', 'pass_network.csv', 'result.json'} <= set(files)
+    with open(os.path.join(out, 'metrics.json')) as f:
+        assert json.load(f)['processed'] == 1
+
+
+def test_failing_callback_does_not_stop_the_service(drop, tmp_path):
+    seen = []
+
+    def on_result(result, metrics):
+        seen.append(result['match'])
+        raise RuntimeError('callback failed')
+
+    with open(os.path.join(drop, 'm2.csv'), 'w') as f:
+        f.write('a,b\n1,2\n')
+    svc = service.IngestService(drop, str(tmp_path / 'out'), workers=1, poll=0.05, threads=True,
+                                on_result=on_result)
+    metrics = _run(svc)
+    assert sorted(seen) == ['m1', 'm2']
+    assert (metrics['processed'], metrics['failed']) == (1, 1)
+
+
+def test_failed_reprocess_keeps_the_last_good_tables(drop, tmp_path):
+    out = str(tmp_path / 'out')
+    _run(service.IngestService(drop, out, workers=1, poll=0.05, threads=True))
+    match_dir = os.path.join(out, 'm1')
+    tables = sorted(f for f in os.listdir(match_dir) if f.endswith('.csv'))
+
+    # the file is replaced by one that cannot be processed
+    with open(os.path.join(drop, 'm1.csv'), 'w') as f:
+        f.write('a,b\n1,2\n')
+    metrics = _run(service.IngestService(drop, out, workers=1, poll=0.05, threads=True))
+    assert metrics['failed'] == 1
+
+    assert sorted(f for f in os.listdir(match_dir) if f.endswith('.csv')) == tables
+    with open(os.path.join(match_dir, 'result.json')) as f:
+        assert json.load(f)['error'] is not None
+
+
+def test_plain_row_index_is_not_written(tmp_path):
+    tables = {'named': pd.DataFrame({'x': [1, 2]}, index=pd.Index(['a', 'b'], name='player_name')),
+              'plain': pd.DataFrame({'x': [1, 2]})}
+    result = {'match': 'm1', 'path': 'm1.csv', 'rows': 2, 'seconds': 0.0, 'error': None,
+              'tables': tables}
+    service.publish(result, str(tmp_path))
+    assert list(pd.read_csv(tmp_path / 'm1' / 'named.csv').columns) == ['player_name', 'x']
+    assert list(pd.read_csv(tmp_path / 'm1' / 'plain.csv').columns) == ['x']
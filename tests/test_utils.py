@@ -0,0 +1,34 @@
+import numpy as np
+import pandas as pd
+
+import reference
+from match_report import pass_net, utils
+
+
+def test_pass_network_matches_reference(network_inputs):
+    passes, events, lineup = network_inputs
+    pd.testing.assert_frame_equal(utils.pass_network(events), reference.pass_network(events),
+                                  check_dtype=False)
+
+
+def test_windows_match_one_network_per_group(all_events):
+    # one network per team and period
+    table = utils.pass_network_windows(all_events)
+    for (team, period), d in all_events.groupby(['team_name','period']):
+        expected = reference.pass_network(d)
+        got = table[(table['team_name']==team)&(table['period']==period)]
+        pd.testing.assert_frame_equal(got.drop(columns=['team_name','period']).reset_index(drop=True),
+                                      expected, check_dtype=False)
+
+    # overlapping minute windows
+    windows = [(0, 15), (10, 30), (60, 200)]
+    table = utils.pass_network_windows(all_events, windows)
+    minute = np.floor(pass_net.event_seconds(all_events)/60)
+    for start, end in windows:
+        d = all_events[(minute >= start) & (minute < end)]
+        for team, t in d.groupby('team_name'):
+            got = table[(table['team_name']==team)&(table['window_start']==start)]
+            assert (got['window_end'] == end).all()
+            pd.testing.assert_frame_equal(
+                got.drop(columns=['team_name','window_start','window_end']).reset_index(drop=True),
+                reference.pass_network(t), check_dtype=False)